@@ -0,0 +1,45 @@
+"""管理 API 路由（SQL 剖析、慢查询、EXPLAIN 结果）"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.schemas.schemas import (
+    Message, QueryPlanResponse, RequestProfileResponse, RequestProfileSummary, SlowQueryResponse
+)
+from app.services.auth import require_admin
+from app.services.profiler import profiler
+
+router = APIRouter(prefix="/admin", tags=["管理"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiler/slow-queries", response_model=List[SlowQueryResponse])
+async def list_slow_queries(limit: int = Query(50, ge=1, le=500)):
+    """按总耗时排序的慢查询指纹"""
+    return profiler.slow_query_list(limit)
+
+
+@router.get("/profiler/plans", response_model=List[QueryPlanResponse])
+async def list_query_plans(fingerprint: Optional[str] = None):
+    """最近的 EXPLAIN (ANALYZE, BUFFERS) 结果（新的在前），可按指纹筛选"""
+    plans = [p for p in reversed(profiler.plans) if fingerprint is None or p["fingerprint"] == fingerprint]
+    return plans
+
+
+@router.get("/profiler/profiles", response_model=List[RequestProfileSummary])
+async def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """最近剖析的请求（新的在前）"""
+    return profiler.profile_list(limit)
+
+
+@router.get("/profiler/profiles/{profile_id}", response_model=RequestProfileResponse)
+async def get_profile(profile_id: str):
+    """单个请求的剖析记录（含每条语句），id 来自响应头 X-Profile-Id"""
+    profile = profiler.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="剖析记录不存在或已被淘汰")
+    return profile.as_dict()
+
+
+@router.delete("/profiler", response_model=Message)
+async def reset_profiler():
+    """清空剖析记录、慢查询统计和 EXPLAIN 结果"""
+    profiler.reset()
+    return Message(message="已清空")
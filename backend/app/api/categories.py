@@ -0,0 +1,26 @@
+"""分类 API 路由"""
+from typing import List
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.database import get_read_db
+from app.models.models import Category, FacetCount
+from app.schemas.schemas import CategoryResponse
+from app.services.http_cache import cache_control
+
+router = APIRouter(prefix="/categories", tags=["分类"])
+
+
+@router.get("", response_model=List[CategoryResponse])
+async def list_categories(response: Response, db: AsyncSession = Depends(get_read_db)):
+    """获取分类列表（model_count 来自维护的分面计数，不扫描 models 表）"""
+    result = await db.execute(
+        select(Category, FacetCount.count)
+        .outerjoin(FacetCount, (FacetCount.facet == "category") & (FacetCount.value == Category.slug))
+        .order_by(Category.sort_order, Category.name)
+    )
+    response.headers["Cache-Control"] = cache_control("list_categories")
+    return [
+        CategoryResponse.model_validate(category).model_copy(update={"model_count": count or 0})
+        for category, count in result.all()
+    ]
@@ -1,11 +1,19 @@
 """互动 API 路由（评论、点赞）"""
+from typing import Optional
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.models import Model, Comment, Like, User
-from app.schemas.schemas import CommentCreate, CommentResponse, LikeResponse, Message
+from app.schemas.schemas import CommentCreate, CommentResponse, LikeStatusResponse, LikeBatchStatusResponse, Message
 from app.services.auth import get_current_active_user, User as AuthUser
+from app.services import ratings, trending
+from app.services.cache import response_cache
+from app.services.likes import add_like, liked_model_ids, remove_like
+from app.services.pagination import decode_cursor, encode_cursor, keyset_after
+from app.services.projections import with_comment_user
+from app.services.serialization import orm_response
 
 router = APIRouter(tags=["互动"])
 
@@ -13,26 +21,39 @@ router = APIRouter(tags=["互动"])
 # ============ 评论相关 ============
 @router.get("/models/{model_id}/comments", response_model=list[CommentResponse])
 async def list_comments(
-    model_id: str,
+    model_id: UUID,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取模型评论列表"""
-    result = await db.execute(
+    """获取模型评论列表
+
+    下一页游标通过 X-Next-Cursor 响应头返回，传入 cursor 时忽略 page。
+    """
+    query = (
         select(Comment)
+        .options(with_comment_user())
         .where(Comment.model_id == model_id)
-        .order_by(Comment.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
     )
+    if cursor:
+        query = keyset_after(query, Comment.created_at, Comment.id, *decode_cursor(cursor, "latest", Comment.created_at))
+    else:
+        query = query.offset((page - 1) * page_size)
+    result = await db.execute(query.limit(page_size))
     comments = result.scalars().all()
-    return comments
+
+    headers = {}
+    if len(comments) == page_size:
+        last = comments[-1]
+        headers["X-Next-Cursor"] = encode_cursor("latest", last.created_at, last.id)
+    return orm_response(list[CommentResponse], comments, headers=headers)
 
 
 @router.post("/models/{model_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
 async def create_comment(
-    model_id: str,
+    model_id: UUID,
     comment_data: CommentCreate,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
@@ -50,22 +71,31 @@ async def create_comment(
     )
     db.add(comment)
 
-    # 更新评论计数
+    # 更新评论计数和评分聚合
     await db.execute(
         Model.__table__.update()
         .where(Model.id == model_id)
-        .values(comments_count=Model.comments_count + 1)
+        .values(
+            comments_count=Model.comments_count + 1,
+            trending_score=trending.score_after(trending.increment("comments")),
+            **ratings.rating_values(comment.rating, 1),
+        )
     )
 
     await db.commit()
-    await db.refresh(comment)
+    result = await db.execute(
+        select(Comment).options(with_comment_user()).where(Comment.id == comment.id)
+        .execution_options(populate_existing=True)
+    )
+    comment = result.scalar_one()
+    await response_cache.invalidate_model(model_id)
 
-    return comment
+    return orm_response(CommentResponse, comment, status_code=status.HTTP_201_CREATED)
 
 
 @router.delete("/comments/{comment_id}", response_model=Message)
 async def delete_comment(
-    comment_id: str,
+    comment_id: UUID,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -82,92 +112,69 @@ async def delete_comment(
     model_id = comment.model_id
     await db.delete(comment)
 
-    # 更新评论计数
+    # 更新评论计数和评分聚合（rating 为空的旧评论不计入评分聚合）
+    rating_values = ratings.rating_values(comment.rating, -1) if comment.rating is not None else {}
     await db.execute(
         Model.__table__.update()
         .where(Model.id == model_id)
-        .values(comments_count=Model.comments_count - 1)
+        .values(
+            comments_count=Model.comments_count - 1,
+            trending_score=trending.score_after(trending.increment("comments", -1, at=comment.created_at)),
+            **rating_values,
+        )
     )
 
     await db.commit()
+    await response_cache.invalidate_model(model_id)
 
     return Message(message="删除成功")
 
 
 # ============ 点赞相关 ============
-@router.post("/models/{model_id}/like", response_model=LikeResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/models/{model_id}/like", response_model=LikeStatusResponse)
 async def like_model(
-    model_id: str,
+    model_id: UUID,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """点赞模型"""
-    # 检查模型是否存在
-    result = await db.execute(select(Model).where(Model.id == model_id))
-    if not result.scalar_one_or_none():
+    """点赞模型（重复点赞不报错），返回最新点赞数"""
+    likes_count = await add_like(db, model_id, current_user.id)
+    if likes_count is None:
         raise HTTPException(status_code=404, detail="模型不存在")
+    await response_cache.invalidate_model(model_id)
 
-    # 检查是否已点赞
-    result = await db.execute(
-        select(Like).where(
-            Like.model_id == model_id,
-            Like.user_id == current_user.id
-        )
-    )
-    if result.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="已点赞")
+    return LikeStatusResponse(liked=True, likes_count=likes_count)
 
-    like = Like(model_id=model_id, user_id=current_user.id)
-    db.add(like)
-
-    # 更新点赞计数
-    await db.execute(
-        Model.__table__.update()
-        .where(Model.id == model_id)
-        .values(likes_count=Model.likes_count + 1)
-    )
 
-    await db.commit()
-    await db.refresh(like)
-
-    return like
-
-
-@router.delete("/models/{model_id}/like", response_model=Message)
+@router.delete("/models/{model_id}/like", response_model=LikeStatusResponse)
 async def unlike_model(
-    model_id: str,
+    model_id: UUID,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """取消点赞"""
-    result = await db.execute(
-        select(Like).where(
-            Like.model_id == model_id,
-            Like.user_id == current_user.id
-        )
-    )
-    like = result.scalar_one_or_none()
-
-    if not like:
-        raise HTTPException(status_code=404, detail="未点赞")
-
-    await db.delete(like)
+    """取消点赞（未点赞时不报错），返回最新点赞数"""
+    likes_count = await remove_like(db, model_id, current_user.id)
+    if likes_count is None:
+        raise HTTPException(status_code=404, detail="模型不存在")
+    await response_cache.invalidate_model(model_id)
 
-    # 更新点赞计数
-    await db.execute(
-        Model.__table__.update()
-        .where(Model.id == model_id)
-        .values(likes_count=Model.likes_count - 1)
-    )
+    return LikeStatusResponse(liked=False, likes_count=likes_count)
 
-    await db.commit()
 
-    return Message(message="取消点赞成功")
+@router.get("/likes/status", response_model=LikeBatchStatusResponse)
+async def check_like_status_batch(
+    model_ids: list[UUID] = Query(..., max_length=100),
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """批量检查点赞状态（一页模型一次查询）"""
+    liked = await liked_model_ids(db, current_user.id, model_ids)
+    return LikeBatchStatusResponse(liked=[model_id for model_id in model_ids if model_id in liked])
 
 
 @router.get("/models/{model_id}/like/status")
 async def check_like_status(
-    model_id: str,
+    model_id: UUID,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
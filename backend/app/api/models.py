@@ -1,82 +1,306 @@
 """模型 API 路由"""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pathlib import Path
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from typing import Optional
-from app.database import get_db
+from sqlalchemy import Row, and_, select
+from typing import List, Optional
+from uuid import UUID
+from starlette.concurrency import run_in_threadpool
+from app.database import get_db, get_read_db
 from app.models.models import Model, User
 from app.schemas.schemas import (
-    ModelCreate, ModelUpdate, ModelResponse, ModelListResponse, Message
+    ModelCreate, ModelUpdate, ModelResponse, ModelListResponse, ModelFileCommit, ModelFileResponse,
+    InspectionResponse, FacetsResponse, Message
 )
-from app.services.auth import get_current_active_user, User as AuthUser
+from app.services.auth import (
+    get_current_active_user, get_optional_user, optional_oauth2_scheme, User as AuthUser
+)
+from app.services import facets, search as search_engine
+from app.services.cache import LIST_NAMESPACE, detail_namespace, response_cache
+from app.services.counters import counter_buffer
+from app.services.files import (
+    ChunkedFileSource, RangeFileResponse, RangeNotSatisfiable, chunked_manifest, download_deduper, parse_range
+)
+from app.services.http_cache import (
+    body_etag, cache_control, etag_matches, json_response, make_etag, not_modified, variant_etag
+)
+from app.services.inspection import inspection_pool, mark_queued, request_inspection
+from app.services.likes import liked_model_ids
+from app.services.pagination import count_rows, decode_cursor, encode_cursor, keyset_after
+from app.services.projections import (
+    AUTHOR_FIELD, DEFAULT_LIST_FIELDS, list_columns, parse_fields, row_to_item, with_author
+)
+from app.services.serialization import FastJSONResponse, dumps, loads, orm_response
+from app.services.storage import ChunksMissing, chunk_store
+from app.services.tags import MAX_FILTER_TAGS, normalize_tags, tag_condition
 
 router = APIRouter(prefix="/models", tags=["模型"])
 
 
+# 排序方式 -> 排序列（均以 id 作为次序键，配合复合索引做游标分页）
+SORT_COLUMNS = {
+    "latest": Model.created_at,
+    "popular": Model.likes_count,
+    "downloads": Model.downloads,
+    "trending": Model.trending_score,
+    "rating": Model.rating_avg,
+}
+
+
+# 决定模型详情 ETag 的版本列：内容变化更新 updated_at，互动计数单独变化。
+# 浏览量和下载量不参与：每次访问都会改变它们，ETag 将永远无法命中；
+# 响应中的这两个计数可能滞后，直到其他版本列变化或缓存过期
+VERSION_COLUMNS = (
+    Model.updated_at,
+    Model.inspection_status,
+    Model.likes_count,
+    Model.comments_count,
+    Model.rating_sum,
+)
+
+
 @router.get("", response_model=ModelListResponse)
 async def list_models(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     category: Optional[str] = None,
     search: Optional[str] = None,
-    sort: str = Query("latest", regex="^(latest|popular|downloads)$"),
-    db: AsyncSession = Depends(get_db)
+    tags: Optional[List[str]] = Query(None, max_length=MAX_FILTER_TAGS),
+    tag_match: str = Query("all", pattern="^(any|all)$"),
+    sort: str = Query("latest", pattern="^(latest|popular|downloads|trending|rating|relevance)$"),
+    cursor: Optional[str] = None,
+    count: Optional[str] = Query(None, pattern="^(exact|estimate|none)$"),
+    fields: Optional[str] = None,
+    with_liked: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取模型列表"""
-    query = select(Model).where(Model.id.isnot(None))
+    """获取模型列表
+
+    传入 cursor（上一页返回的 next_cursor）时按游标分页，忽略 page；
+    count 控制总数统计方式，游标模式下默认不统计。
+    sort=relevance 按搜索相关度排序，未提供搜索词时等同于 latest；
+    sort=trending 按时间衰减的热度排序（点赞、评论、下载、浏览）；sort=rating 按平均评分排序。
+    with_liked=true 且已登录时，在每个条目中填充 liked_by_me。
+    tags 可重复传入（?tags=a&tags=b），tag_match=all 要求包含全部标签，any 包含任一标签。
+    fields 选择返回的字段（逗号分隔，如 fields=name,summary,author），
+    默认只返回卡片字段，不含 description、api_docs 等大文本（以 summary 代替）。
+    Accept: application/msgpack 时返回 msgpack（供内部服务调用）。
+    """
+    if count is None:
+        count = "none" if cursor else "exact"
+    params = dict(
+        page=page, page_size=page_size, category=category, search=search,
+        tags=_tags_param(tags), tag_match=tag_match, sort=sort, cursor=cursor, count=count,
+        fields=",".join(parse_fields(fields)),
+    )
+    body = await response_cache.get_or_load(
+        LIST_NAMESPACE, params, lambda: _query_models(db, **params)
+    )
+
+    # 当前用户的点赞状态（一次查询，不进入共享缓存）
+    current_user = await get_optional_user(token, db) if with_liked else None
+    if current_user is None:
+        etag = variant_etag(body_etag(body), accept)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, "list_models")
+        return json_response(body, etag, "list_models", accept)
+
+    # 在缓存的 JSON 上叠加点赞状态后重新编码（不再经过 response_model 校验）
+    data = loads(body)
+    liked = await liked_model_ids(db, current_user.id, [UUID(item["id"]) for item in data["items"]])
+    for item in data["items"]:
+        item["liked_by_me"] = UUID(item["id"]) in liked
+    return FastJSONResponse(dumps(data), headers={"Cache-Control": "private, no-cache"})
+
+
+def _tags_param(tags: Optional[List[str]]) -> Optional[str]:
+    """规范化的标签筛选参数（排序后逗号拼接，同一组标签共用缓存键）"""
+    normalized = normalize_tags(t for tag in tags or () for t in tag.split(","))
+    return ",".join(sorted(normalized)) or None
+
+
+async def _query_models(
+    db: AsyncSession,
+    page: int,
+    page_size: int,
+    category: Optional[str],
+    search: Optional[str],
+    tags: Optional[str],
+    tag_match: str,
+    sort: str,
+    cursor: Optional[str],
+    count: str,
+    fields: str,
+) -> dict:
+    """查询一页模型（只 SELECT fields 中的列）
+
+    结果行的列值已是确定的类型，直接组装为可编码的 dict（结构同 ModelListResponse），
+    不逐条构造 pydantic 对象。
+    """
+    selected = tuple(fields.split(","))
+    query = select(*list_columns(selected)).select_from(Model)
+    if AUTHOR_FIELD in selected:
+        query = query.join(User, User.id == Model.author_id)
+    sort_column = SORT_COLUMNS.get(sort)
 
     # 分类筛选
     if category:
         query = query.where(Model.category == category)
 
+    # 标签筛选
+    if tags:
+        query = query.where(tag_condition(db, tags.split(","), tag_match))
+
     # 搜索
-    if search:
-        query = query.where(
-            or_(
-                Model.name.ilike(f"%{search}%"),
-                Model.description.ilike(f"%{search}%")
-            )
-        )
+    matched = (
+        await search_engine.match(db, search, category, tags.split(",") if tags else None, tag_match)
+        if search else None
+    )
+    if matched is not None:
+        query = query.where(matched.condition)
+        if sort == "relevance":
+            sort_column = matched.rank
+    if sort_column is None:
+        sort, sort_column = "latest", Model.created_at
+
+    # 总数（搜索候选被截断时用进程内索引的完整匹配数）
+    truncated = matched is not None and matched.truncated
+    if truncated and count != "none":
+        total = matched.total
+    else:
+        total = await count_rows(db, query.with_only_columns(Model.id), count)
+
+    # 排序（附带排序键，用于生成下一页游标）
+    query = query.add_columns(sort_column.label("sort_key"))
+    query = query.order_by(sort_column.desc(), Model.id.desc())
 
-    # 排序
-    if sort == "latest":
-        query = query.order_by(Model.created_at.desc())
-    elif sort == "popular":
-        query = query.order_by(Model.likes_count.desc())
-    elif sort == "downloads":
-        query = query.order_by(Model.downloads.desc())
+    # 分页
+    if cursor:
+        query = keyset_after(query, sort_column, Model.id, *decode_cursor(cursor, sort, sort_column))
+    else:
+        query = query.offset((page - 1) * page_size)
+    rows = (await db.execute(query.limit(page_size))).all()
 
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total = (await db.execute(count_query)).scalar()
+    next_cursor = None
+    if len(rows) == page_size:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, last.sort_key, last.id)
 
-    # 分页
-    query = query.offset((page - 1) * page_size).limit(page_size)
-    result = await db.execute(query)
-    models = result.scalars().all()
-
-    return ModelListResponse(
-        items=models,
-        total=total,
-        page=page,
-        page_size=page_size
+    return {
+        "items": [row_to_item(row, selected) for row in rows],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+        "truncated": truncated,
+    }
+
+
+@router.get("/facets", response_model=FacetsResponse)
+async def model_facets(
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None, max_length=MAX_FILTER_TAGS),
+    tag_match: str = Query("all", pattern="^(any|all)$"),
+    limit: int = Query(facets.MAX_FACET_VALUES, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """分类 / 框架 / 文件格式 / 标签的模型数
+
+    不带筛选条件时读取维护好的计数表；带 category、search、tags 时按与列表相同的条件聚合。
+    """
+    tags_param = _tags_param(tags)
+
+    async def load() -> dict:
+        conditions = []
+        if category:
+            conditions.append(Model.category == category)
+        if tags_param:
+            conditions.append(tag_condition(db, tags_param.split(","), tag_match))
+        matched = (
+            await search_engine.match(db, search, category, tags_param.split(",") if tags_param else None, tag_match)
+            if search else None
+        )
+        if matched is not None:
+            conditions.append(matched.condition)
+        if not conditions:
+            body = await facets.maintained_facets(db, limit)
+        else:
+            body = await facets.filtered_facets(db, and_(*conditions), limit)
+        body["truncated"] = matched is not None and matched.truncated
+        return body
+
+    params = dict(view="facets", category=category, search=search, tags=tags_param, tag_match=tag_match, limit=limit)
+    body = await response_cache.get_or_load(LIST_NAMESPACE, params, load)
+    etag = variant_etag(body_etag(body), accept)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, "model_facets")
+    return json_response(body, etag, "model_facets", accept)
+
+
+@router.get("/trending", response_model=ModelListResponse)
+async def trending_models(
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """热度排行前 N 名（可按分类），直接读取 (category, trending_score, id) 索引"""
+    params = dict(
+        page=1, page_size=limit, category=category, search=None,
+        tags=None, tag_match="all", sort="trending", cursor=None, count="none",
+        fields=",".join(DEFAULT_LIST_FIELDS),
     )
+    body = await response_cache.get_or_load(
+        LIST_NAMESPACE, params, lambda: _query_models(db, **params)
+    )
+    etag = variant_etag(body_etag(body), accept)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, "trending_models")
+    return json_response(body, etag, "trending_models", accept)
 
 
 @router.get("/{model_id}", response_model=ModelResponse)
-async def get_model(model_id: str, db: AsyncSession = Depends(get_db)):
-    """获取模型详情"""
-    result = await db.execute(select(Model).where(Model.id == model_id))
-    model = result.scalar_one_or_none()
-
-    if not model:
+async def get_model(
+    model_id: UUID,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """获取模型详情
+
+    先只读取版本列（updated_at 和互动计数）计算 ETag，命中 If-None-Match 时直接返回 304，
+    不读取大字段、不加载关联、不序列化。响应体按 ETag 缓存；浏览量、下载量不计入 ETag，可能滞后。
+    """
+    result = await db.execute(select(*VERSION_COLUMNS).where(Model.id == model_id))
+    version = result.one_or_none()
+    if version is None:
         raise HTTPException(status_code=404, detail="模型不存在")
+    version_etag = make_etag(model_id, *version)
+    etag = variant_etag(version_etag, accept)
 
-    # 增加浏览量
-    model.views += 1
-    await db.commit()
+    # 增加浏览量（写缓冲，批量落库）
+    counter_buffer.incr(model_id, "views")
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, "get_model")
+
+    async def load() -> ModelResponse:
+        result = await db.execute(select(Model).options(with_author()).where(Model.id == model_id))
+        model = result.scalar_one_or_none()
+        if not model:
+            raise HTTPException(status_code=404, detail="模型不存在")
+        return ModelResponse.model_validate(model)
 
-    return model
+    body = await response_cache.get_or_load(detail_namespace(model_id), {"etag": version_etag}, load)
+    return json_response(body, etag, "get_model", accept)
 
 
 @router.post("", response_model=ModelResponse, status_code=status.HTTP_201_CREATED)
@@ -92,14 +316,20 @@ async def create_model(
     )
     db.add(model)
     await db.commit()
-    await db.refresh(model)
+    # 重新读取（含作者摘要），避免序列化时懒加载 author
+    result = await db.execute(
+        select(Model).options(with_author()).where(Model.id == model.id)
+        .execution_options(populate_existing=True)
+    )
+    model = result.scalar_one()
+    await response_cache.invalidate(LIST_NAMESPACE)
 
-    return model
+    return orm_response(ModelResponse, model, status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{model_id}", response_model=ModelResponse)
 async def update_model(
-    model_id: str,
+    model_id: UUID,
     model_data: ModelUpdate,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
@@ -119,14 +349,20 @@ async def update_model(
         setattr(model, key, value)
 
     await db.commit()
-    await db.refresh(model)
+    # 重新读取（含作者摘要），避免序列化时懒加载 author
+    result = await db.execute(
+        select(Model).options(with_author()).where(Model.id == model.id)
+        .execution_options(populate_existing=True)
+    )
+    model = result.scalar_one()
+    await response_cache.invalidate_model(model.id)
 
-    return model
+    return orm_response(ModelResponse, model)
 
 
 @router.delete("/{model_id}", response_model=Message)
 async def delete_model(
-    model_id: str,
+    model_id: UUID,
     current_user: AuthUser = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -140,15 +376,19 @@ async def delete_model(
     if model.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="无权删除此模型")
 
+    # 释放分块存储中的文件（提交后删除不再被引用的分块）
+    released = await chunk_store.release(db, model.file_manifest, model.id)
     await db.delete(model)
     await db.commit()
+    await chunk_store.purge(db, released)
+    await response_cache.invalidate_model(model.id)
 
     return Message(message="删除成功")
 
 
 @router.post("/{model_id}/download")
 async def download_model(
-    model_id: str,
+    model_id: UUID,
     db: AsyncSession = Depends(get_db)
 ):
     """下载模型（返回下载链接，增加下载计数）"""
@@ -158,15 +398,174 @@ async def download_model(
     if not model:
         raise HTTPException(status_code=404, detail="模型不存在")
 
-    if not model.file_url:
+    hosted = bool(model.file_manifest)
+    if not model.file_url and not hosted:
         raise HTTPException(status_code=400, detail="该模型暂无下载文件")
 
-    # 增加下载计数
-    model.downloads += 1
-    await db.commit()
+    # 本站托管的文件在实际下载时计数，外部链接在此计数（写缓冲，批量落库）
+    if hosted:
+        download_url = f"/api/models/{model.id}/file"
+    else:
+        download_url = model.file_url
+        counter_buffer.incr(model.id, "downloads")
 
     return {
-        "download_url": model.file_url,
+        "download_url": download_url,
+        "manifest_url": f"/api/models/{model.id}/file/manifest" if hosted else None,
         "file_size": model.file_size,
         "file_format": model.file_format
     }
+
+
+async def _get_hosted_file(db: AsyncSession, model_id: UUID) -> tuple[Row, ChunkedFileSource, str]:
+    """读取托管文件（只查询文件相关列），返回 (模型信息, 文件来源, ETag)"""
+    result = await db.execute(
+        select(Model.id, Model.file_manifest, Model.file_name, Model.file_sha256, Model.file_format)
+        .where(Model.id == model_id)
+    )
+    model = result.one_or_none()
+    if not model:
+        raise HTTPException(status_code=404, detail="模型不存在")
+    if not model.file_manifest:
+        raise HTTPException(status_code=404, detail="该模型没有托管文件")
+    manifest = await run_in_threadpool(chunk_store.load_manifest, model.file_manifest)
+    return model, ChunkedFileSource(chunk_store, manifest), f'"{model.file_sha256 or manifest.id}"'
+
+
+@router.api_route("/{model_id}/file", methods=["GET", "HEAD"])
+async def download_model_file(
+    model_id: UUID,
+    request: Request,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """下载托管的模型文件
+
+    支持 Range（含多区间）、If-Range 和 HEAD。续传和多连接并行下载只计一次下载：
+    只有包含文件起始字节的请求会计数，并且同一客户端在时间窗口内去重。
+    """
+    model, source, etag = await _get_hosted_file(db, model_id)
+    filename = model.file_name or f"{model.id}{model.file_format or ''}"
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control("download_model_file"),
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+    }
+    media_type = "application/octet-stream"
+
+    # If-Range 不匹配说明客户端手里的部分内容已过期，返回完整文件
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+    try:
+        ranges = parse_range(range_header, source.size)
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="请求的区间无效", headers={"Content-Range": f"bytes */{source.size}"})
+
+    if request.method == "GET" and (ranges is None or ranges[0][0] == 0):
+        client = request.client.host if request.client else ""
+        key = f"{model.id}:{etag}:{client}:{request.headers.get('user-agent', '')}"
+        if download_deduper.should_count(key):
+            counter_buffer.incr(model.id, "downloads")
+
+    return RangeFileResponse(source, ranges, media_type, headers)
+
+
+@router.get("/{model_id}/file/manifest")
+async def get_model_file_manifest(model_id: UUID, db: AsyncSession = Depends(get_db)):
+    """文件分片清单：整文件和每个分片的 sha256，供并行下载和逐片校验"""
+    model, source, _ = await _get_hosted_file(db, model_id)
+    return chunked_manifest(source.manifest, model.file_sha256)
+
+
+@router.put("/{model_id}/file", response_model=ModelFileResponse)
+async def commit_model_file(
+    model_id: UUID,
+    file_data: ModelFileCommit,
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按分块清单设置模型文件
+
+    客户端按分块存储的规则切分文件，通过 /storage/chunks/missing 查询缺失分块、
+    只上传缺失的部分，最后提交完整的分块列表。近似重复的模型只需传输变化的分块。
+    """
+    result = await db.execute(select(Model).where(Model.id == model_id))
+    model = result.scalar_one_or_none()
+
+    if not model:
+        raise HTTPException(status_code=404, detail="模型不存在")
+
+    if model.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权修改此模型")
+
+    chunks = [(chunk.sha256, chunk.length) for chunk in file_data.chunks]
+    missing = await run_in_threadpool(chunk_store.missing_chunks, chunks)
+    if missing:
+        raise HTTPException(status_code=409, detail=f"还有 {len(missing)} 个分块未上传")
+
+    manifest = await run_in_threadpool(chunk_store.write_manifest, chunks)
+    try:
+        filename = Path(file_data.filename).name if file_data.filename else None
+        released = await chunk_store.attach(db, model, manifest, None, filename)
+    except ChunksMissing as exc:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"还有 {len(exc.hashes)} 个分块未上传")
+    mark_queued(model)
+    await db.commit()
+    await chunk_store.purge(db, released)
+    await request_inspection(db, model)
+    await response_cache.invalidate_model(model.id)
+
+    return ModelFileResponse(manifest=manifest.id, size=manifest.size, chunk_count=len(chunks))
+
+
+@router.get("/{model_id}/inspection", response_model=InspectionResponse)
+async def get_model_inspection(model_id: UUID, db: AsyncSession = Depends(get_db)):
+    """文件检查状态、进度和完整结果（含张量形状）"""
+    result = await db.execute(
+        select(Model.inspection_status, Model.inspection, Model.parameter_count, Model.inspected_at)
+        .where(Model.id == model_id)
+    )
+    model = result.one_or_none()
+    if not model:
+        raise HTTPException(status_code=404, detail="模型不存在")
+
+    job = inspection_pool.get(model_id)
+    return InspectionResponse(
+        model_id=model_id,
+        status=job.status if job and job.status in ("queued", "running") else model.inspection_status,
+        progress=job.progress() if job else None,
+        parameter_count=model.parameter_count,
+        inspected_at=model.inspected_at,
+        result=model.inspection,
+    )
+
+
+@router.post("/{model_id}/inspection", response_model=InspectionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def inspect_model_file(
+    model_id: UUID,
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """重新检查模型文件（例如之前因队列已满未能入队）"""
+    result = await db.execute(select(Model).where(Model.id == model_id))
+    model = result.scalar_one_or_none()
+
+    if not model:
+        raise HTTPException(status_code=404, detail="模型不存在")
+
+    if model.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权修改此模型")
+
+    if not model.file_manifest:
+        raise HTTPException(status_code=400, detail="该模型没有托管文件")
+
+    mark_queued(model)
+    await db.commit()
+    job = await request_inspection(db, model)
+    await response_cache.invalidate_model(model.id)
+    if job is None:
+        raise HTTPException(status_code=503, detail="检查队列已满，请稍后重试", headers={"Retry-After": "60"})
+
+    return InspectionResponse(model_id=model_id, status=job.status, progress=job.progress())
@@ -0,0 +1,50 @@
+"""分块存储 API 路由（去重上传）"""
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.schemas.schemas import ChunkQuery, ChunkQueryResponse, Message
+from app.services.auth import get_current_active_user, User as AuthUser
+from app.services.storage import MAX_CHUNK_SIZE, chunk_store
+
+router = APIRouter(prefix="/storage", tags=["存储"])
+
+
+@router.post("/chunks/missing", response_model=ChunkQueryResponse)
+async def missing_chunks(
+    query: ChunkQuery,
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """查询哪些分块尚未存储（客户端只需上传这些分块）"""
+    missing = await run_in_threadpool(
+        lambda: [h for h in dict.fromkeys(query.hashes) if not chunk_store.has_chunk(h)]
+    )
+    return ChunkQueryResponse(missing=missing)
+
+
+@router.put("/chunks/{chunk_hash}", response_model=Message)
+async def upload_chunk(
+    chunk_hash: str,
+    request: Request,
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """上传一个分块（请求体为原始字节，内容必须与 sha256 一致）
+
+    分块在被某个模型文件引用之前不计引用，超过 STORAGE_GC_GRACE 仍未被引用时由存储清理回收。
+    """
+    if len(chunk_hash) != 64 or not all(c in "0123456789abcdef" for c in chunk_hash):
+        raise HTTPException(status_code=400, detail="分块 sha256 格式不正确")
+    if chunk_store.has_chunk(chunk_hash):
+        return Message(message="分块已存在")
+
+    data = bytearray()
+    async for piece in request.stream():
+        data += piece
+        if len(data) > MAX_CHUNK_SIZE:
+            raise HTTPException(status_code=413, detail=f"分块超过 {MAX_CHUNK_SIZE} 字节上限")
+    if not data:
+        raise HTTPException(status_code=400, detail="分块不能为空")
+    if hashlib.sha256(data).hexdigest() != chunk_hash:
+        raise HTTPException(status_code=400, detail="分块校验和不匹配")
+
+    await run_in_threadpool(chunk_store.write_chunk, chunk_hash, bytes(data))
+    return Message(message="分块已保存")
@@ -0,0 +1,135 @@
+"""上传 API 路由（可续传分片上传）"""
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from app.database import get_db
+from app.models.models import Model
+from app.schemas.schemas import (
+    UploadCreate, UploadStatusResponse, UploadChunkResponse, UploadComplete, UploadResultResponse, Message
+)
+from app.services.auth import get_current_active_user, User as AuthUser
+from app.services.cache import response_cache
+from app.services.inspection import mark_queued, request_inspection
+from app.services.storage import ChunksMissing, chunk_store
+from app.services.uploads import upload_manager, UploadSession
+
+router = APIRouter(prefix="/uploads", tags=["上传"])
+
+
+async def _status(session: UploadSession) -> UploadStatusResponse:
+    received = await session.received()
+    return UploadStatusResponse(
+        id=session.id,
+        filename=session.meta["filename"],
+        size=session.size,
+        chunk_size=session.chunk_size,
+        chunk_count=session.chunk_count,
+        received=session.received_ranges(received),
+        missing_chunks=[i for i in range(session.chunk_count) if i not in received],
+    )
+
+
+async def _get_model_for_author(db: AsyncSession, model_id: UUID, user_id: UUID) -> Model:
+    result = await db.execute(select(Model).where(Model.id == model_id))
+    model = result.scalar_one_or_none()
+    if not model:
+        raise HTTPException(status_code=404, detail="模型不存在")
+    if model.author_id != user_id:
+        raise HTTPException(status_code=403, detail="无权修改此模型")
+    return model
+
+
+@router.post("", response_model=UploadStatusResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload_data: UploadCreate,
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """创建上传会话（必须关联一个自己的模型，完成后文件即成为该模型的文件）"""
+    await _get_model_for_author(db, upload_data.model_id, current_user.id)
+    session = await upload_manager.create(
+        current_user.id, upload_data.filename, upload_data.size, upload_data.model_id
+    )
+    return await _status(session)
+
+
+@router.get("/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload(
+    upload_id: str,
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """查询上传进度（已接收的区间和缺失的分片）"""
+    return await _status(await upload_manager.get(upload_id, current_user.id))
+
+
+@router.put("/{upload_id}/chunks/{offset}", response_model=UploadChunkResponse)
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    x_chunk_sha256: Optional[str] = Header(None),
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """上传一个分片（请求体为原始字节，可乱序、并行）
+
+    可通过 X-Chunk-SHA256 头提供分片校验和。
+    """
+    session = await upload_manager.get(upload_id, current_user.id)
+    digest = await session.write_chunk(offset, request.stream(), x_chunk_sha256)
+    return UploadChunkResponse(offset=offset, length=session.chunk_length(offset // session.chunk_size), sha256=digest)
+
+
+@router.post("/{upload_id}/complete", response_model=UploadResultResponse)
+async def complete_upload(
+    upload_id: str,
+    complete_data: UploadComplete,
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """完成上传：校验完整性，存入分块存储并设为关联模型的文件
+
+    会话在文件存入分块存储且模型更新提交之后才删除，中途失败可直接重试。
+    """
+    session = await upload_manager.get(upload_id, current_user.id)
+    model_id = session.meta["model_id"]
+    if not model_id:
+        # 旧版本创建的未关联模型的会话
+        raise HTTPException(status_code=409, detail="上传会话未关联模型，请重新创建")
+    model = await _get_model_for_author(db, UUID(model_id), current_user.id)
+
+    # 文件切分入分块存储，与已有文件重复的分块不再占用空间
+    digest = await session.verify(complete_data.sha256)
+    manifest, _, written = await run_in_threadpool(chunk_store.ingest_file, session.data_path)
+    try:
+        released = await chunk_store.attach(db, model, manifest, digest, session.meta["filename"])
+    except ChunksMissing:
+        # 已有的分块在登记前被并发清理：重新写入后再登记一次
+        await db.rollback()
+        await db.refresh(model)
+        manifest, _, written = await run_in_threadpool(chunk_store.ingest_file, session.data_path)
+        released = await chunk_store.attach(db, model, manifest, digest, session.meta["filename"])
+    mark_queued(model)
+    await db.commit()
+    await upload_manager.discard(upload_id)
+    await chunk_store.purge(db, released)
+    await request_inspection(db, model)
+    await response_cache.invalidate_model(model.id)
+
+    return UploadResultResponse(
+        id=session.id, model_id=model_id, manifest=manifest.id, size=session.size, sha256=digest,
+        stored_bytes=written
+    )
+
+
+@router.delete("/{upload_id}", response_model=Message)
+async def cancel_upload(
+    upload_id: str,
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """取消上传并删除已接收的数据"""
+    await upload_manager.get(upload_id, current_user.id)
+    await upload_manager.discard(upload_id)
+    return Message(message="已取消上传")
@@ -0,0 +1,56 @@
+"""维护命令
+
+用法（在 backend 目录下）：
+    python -m app.cli migrate           补齐表结构（新表 / 新列 / 索引 / 点赞唯一约束）并回填
+    python -m app.cli rebuild-ratings   按评论重算评分聚合
+    python -m app.cli rebuild-facets    按模型表重算分面计数
+    python -m app.cli rebuild-trending  按点赞 / 评论 / 下载历史重算热度分数
+    python -m app.cli rebuild-search    回填搜索词元
+    python -m app.cli normalize-tags    规范化已有模型的标签
+    python -m app.cli gc-storage        清理未被引用的分块和清单文件
+"""
+import argparse
+import asyncio
+import logging
+
+from app.database import async_session_maker, close_db
+from app.services.facets import rebuild_facet_counts
+from app.services.migrations import migrate
+from app.services.ratings import rebuild_rating_aggregates
+from app.services.search import rebuild_search_documents
+from app.services.storage import chunk_store
+from app.services.tags import normalize_existing_tags
+from app.services.trending import rebuild_trending_scores
+
+COMMANDS = {
+    "migrate": (migrate, "补齐表结构（新表 / 新列 / 索引 / 点赞唯一约束）并回填"),
+    "rebuild-ratings": (rebuild_rating_aggregates, "按评论重算评分聚合"),
+    "rebuild-facets": (rebuild_facet_counts, "按模型表重算分面计数"),
+    "rebuild-trending": (rebuild_trending_scores, "按点赞 / 评论 / 下载历史重算热度分数"),
+    "rebuild-search": (rebuild_search_documents, "回填搜索词元"),
+    "normalize-tags": (normalize_existing_tags, "规范化已有模型的标签"),
+    "gc-storage": (chunk_store.collect_garbage, "清理未被引用的分块和清单文件"),
+}
+
+
+async def run(command: str) -> int:
+    task, _ = COMMANDS[command]
+    try:
+        async with async_session_maker() as session:
+            return await task(session)
+    finally:
+        await close_db()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="AI Model Hub 维护命令")
+    parser.add_argument("command", choices=COMMANDS, help=" / ".join(f"{k}: {v[1]}" for k, v in COMMANDS.items()))
+    args = parser.parse_args()
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger(migrate.__module__).setLevel(logging.INFO)  # 输出迁移步骤
+    count = asyncio.run(run(args.command))
+    print(f"{args.command}: 处理 {count} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,180 @@
-"""数据库连接"""
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+"""数据库连接
+
+写入和需要读己之写的请求使用主库（get_db）；目录类只读查询使用 get_read_db，
+在配置的只读副本间轮流分配，副本连接失败时回退主库，并在 DB_REPLICA_RETRY_AFTER 秒内跳过该副本。
+
+DATABASE_URL 为 sqlite:// 时使用嵌入式后端（aiosqlite）：每个连接开启 WAL 并设置 SQLITE_* 参数，
+WAL 模式下读不阻塞写，多个读连接可与唯一的写连接并发。
+"""
+import logging
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
 from app.config import settings
+from app.services.pool_metrics import PoolMetrics, instrument, metered_pool_class
+
+logger = logging.getLogger(__name__)
+
+
+def async_url(url: str) -> str:
+    """转换为异步驱动的 URL"""
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "journal_mode=WAL",
+        f"synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        f"cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "temp_store=MEMORY",
+        "foreign_keys=ON",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
 
+def _create_sqlite_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    """嵌入式 SQLite 引擎：内存库所有会话共用一个连接，文件库使用连接池"""
+    database = make_url(url).database
+    options = {"echo": settings.DB_ECHO}
+    if not database or database == ":memory:":
+        options["poolclass"] = metered_pool_class(StaticPool, metrics)
+    else:
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
+        options.update(
+            poolclass=metered_pool_class(AsyncAdaptedQueuePool, metrics),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    engine = create_async_engine(url, **options)
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    return engine
 
-# 转换为异步 URL
-DATABASE_URL = settings.DATABASE_URL
-if DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """按连接池配置创建引擎，并注册连接池指标"""
+    url = async_url(url)
+    metrics = PoolMetrics(name)
+    if url.startswith("sqlite+aiosqlite://"):
+        engine = _create_sqlite_engine(url, metrics)
+    else:
+        engine = _create_server_engine(url, metrics)
+    instrument(engine, metrics)
+    pool_metrics.append(metrics)
+    return engine
+
+
+def _create_server_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    """PostgreSQL 引擎（PgBouncer 模式下不保留本地连接池）"""
+    options = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg://"):
+        if settings.DB_PGBOUNCER:
+            # 事务模式下连接在事务间会换到不同的服务端会话，预编译语句不可复用
+            connect_args.update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+            )
+        else:
+            connect_args.update(
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+                prepared_statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            )
+    if settings.DB_PGBOUNCER:
+        options["poolclass"] = metered_pool_class(NullPool, metrics)
+    else:
+        options.update(
+            poolclass=metered_pool_class(AsyncAdaptedQueuePool, metrics),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return create_async_engine(url, connect_args=connect_args, **options)
+
+
+# 各引擎的连接池指标（主库在前）
+pool_metrics: list[PoolMetrics] = []
+
+engine = create_engine(settings.DATABASE_URL, "primary")
+# 嵌入式单机模式（SQLite）
+embedded = engine.dialect.name == "sqlite"
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engines = [
+    create_engine(url, f"replica-{i}") for i, url in enumerate(settings.DATABASE_REPLICA_URLS)
+]
+
+
+class ReplicaRouter:
+    """只读副本轮询分配，连接失败的副本暂时跳过"""
+
+    def __init__(self, engines: list[AsyncEngine], retry_after: float):
+        self.makers = [
+            async_sessionmaker(e, class_=AsyncSession, expire_on_commit=False) for e in engines
+        ]
+        self.retry_after = retry_after
+        self.fallbacks = 0
+        self._next = 0
+        self._down_until = [0.0] * len(engines)
+
+    def candidates(self) -> list[int]:
+        """本次请求依次尝试的副本（从轮询位置开始，跳过暂停中的副本）"""
+        count = len(self.makers)
+        if not count:
+            return []
+        start = self._next
+        self._next = (start + 1) % count
+        now = time.monotonic()
+        return [i % count for i in range(start, start + count) if self._down_until[i % count] <= now]
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + self.retry_after
+
+    async def open_session(self) -> AsyncSession:
+        """打开只读会话：先在副本上取得连接，全部失败时使用主库"""
+        for index in self.candidates():
+            session = self.makers[index]()
+            try:
+                await session.connection()
+            except (SQLAlchemyError, OSError) as exc:
+                await session.close()
+                self.mark_down(index)
+                logger.warning("只读副本 replica-%d 不可用，暂停 %.0f 秒: %s", index, self.retry_after, exc)
+                continue
+            return session
+        if self.makers:
+            self.fallbacks += 1
+        return async_session_maker()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.makers),
+            "available": sum(1 for until in self._down_until if until <= now),
+            "fallbacks": self.fallbacks,
+        }
+
+
+replica_router = ReplicaRouter(replica_engines, settings.DB_REPLICA_RETRY_AFTER)
+
 
 class Base(DeclarativeBase):
     pass
@@ -26,7 +189,28 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """获取只读会话（优先只读副本；副本可能有复制延迟，不用于读己之写）"""
+    session = await replica_router.open_session()
+    async with session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def database_stats() -> dict:
+    """连接池和副本路由指标"""
+    return {"pools": [m.snapshot() for m in pool_metrics], "routing": replica_router.stats()}
+
+
 async def init_db():
-    """初始化数据库"""
+    """初始化数据库（建表，已存在的表跳过）"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db():
+    """关闭所有引擎的连接"""
+    for e in (engine, *replica_engines):
+        await e.dispose()
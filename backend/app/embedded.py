@@ -0,0 +1,9 @@
+"""单机部署入口（嵌入式 SQLite），与 app.main 是同一个应用
+
+    DATABASE_URL=sqlite:///./data/hub.db uvicorn app.embedded:app
+
+保留这个模块以兼容已有的启动命令；新的部署直接使用 app.main:app。
+"""
+from app.main import ROUTERS, app, create_app, lifespan
+
+__all__ = ["ROUTERS", "app", "create_app", "lifespan"]
@@ -1,112 +1,101 @@
-"""AI Model Hub - 主应用（简化版）"""
+"""AI Model Hub - 主应用（app/api 下的全部路由，前缀 /api）
+
+    uvicorn app.main:app
+
+DATABASE_URL 为 SQLite 时以嵌入式模式运行：启动时建表（已存在的表跳过），不依赖 PostgreSQL / Redis
+等外部服务。PostgreSQL 部署不自动建表，已有数据库升级时运行 python -m app.cli migrate。
+"""
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-
-app = FastAPI(
-    title="AI Model Hub",
-    description="AI 模型展示平台 API",
-    version="1.0.0"
-)
-
-# CORS 配置
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-@app.get("/")
-async def root():
-    return {"message": "AI Model Hub API", "status": "running", "version": "1.0.0"}
-
-
-@app.get("/health")
-async def health():
-    return {"status": "healthy"}
-
-
-# 模拟数据 - 模型列表
-MOCK_MODELS = [
-    {
-        "id": "1",
-        "name": "GPT-4-Turbo",
-        "description": "最先进的语言模型，支持128K上下文",
-        "category": "nlp",
-        "tags": ["LLM", "ChatGPT", "Transformer"],
-        "framework": "pytorch",
-        "downloads": 125000,
-        "likes_count": 8900,
-        "version": "1.0.0"
-    },
-    {
-        "id": "2", 
-        "name": "Stable Diffusion XL",
-        "description": "高质量图像生成模型",
-        "category": "cv",
-        "tags": ["Image Generation", "Diffusion"],
-        "framework": "pytorch",
-        "downloads": 98000,
-        "likes_count": 7200,
-        "version": "1.0.0"
-    },
-    {
-        "id": "3",
-        "name": "Whisper Large V3",
-        "description": "OpenAI 多语言语音识别模型",
-        "category": "audio",
-        "tags": ["ASR", "Speech", "Multilingual"],
-        "framework": "pytorch",
-        "downloads": 45000,
-        "likes_count": 3200,
-        "version": "3.0.0"
-    },
-    {
-        "id": "4",
-        "name": "CLIP",
-        "description": "OpenAI 图文多模态模型",
-        "category": "multimodal",
-        "tags": ["Vision", "NLP", "Zero-shot"],
-        "framework": "pytorch",
-        "downloads": 78000,
-        "likes_count": 5600,
-        "version": "1.0.0"
-    }
-]
-
-
-@app.get("/api/models")
-async def list_models(page: int = 1, page_size: int = 20, category: str = None, search: str = None):
-    """获取模型列表"""
-    models = MOCK_MODELS
-    if category:
-        models = [m for m in models if m["category"] == category]
-    if search:
-        models = [m for m in models if search.lower() in m["name"].lower()]
-    return {"items": models, "total": len(models), "page": page, "page_size": page_size}
-
-
-@app.get("/api/models/{model_id}")
-async def get_model(model_id: str):
-    """获取模型详情"""
-    for m in MOCK_MODELS:
-        if m["id"] == model_id:
-            return m
-    return {"error": "Model not found"}
-
-
-@app.post("/api/models/{model_id}/like")
-async def like_model(model_id: str):
-    """点赞模型"""
-    return {"message": "Liked", "model_id": model_id}
-
-
-@app.get("/api/models/{model_id}/comments")
-async def get_comments(model_id: str):
-    """获取评论"""
-    return [
-        {"id": "1", "user": "User1", "content": "很棒的模型！", "rating": 5},
-        {"id": "2", "user": "User2", "content": "效果很好", "rating": 4}
-    ]
+from fastapi.responses import PlainTextResponse
+
+from app.api import admin, auth, categories, interactions, models, storage, uploads
+from app.config import settings
+from app.database import close_db, database_stats, embedded, init_db
+from app.services.counters import counter_buffer
+from app.services.inspection import inspection_pool
+from app.services.metrics import MetricsMiddleware, registry as metrics_registry
+from app.services.passwords import password_pool
+from app.services.profiler import ProfilerMiddleware, profiler
+from app.services.serialization import FastJSONResponse
+from app.services.storage import storage_collector
+from app.services.uploads import upload_sweeper
+
+ROUTERS = (auth, models, interactions, categories, uploads, storage, admin)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动计数器定时写回和文件检查进程池，关闭时写回剩余增量并关闭数据库连接"""
+    if embedded and settings.SQLITE_CREATE_TABLES:
+        await init_db()
+    counter_buffer.start()
+    inspection_pool.start()
+    profiler.start()
+    storage_collector.start()
+    upload_sweeper.start()
+    yield
+    await upload_sweeper.stop()
+    await storage_collector.stop()
+    await profiler.stop()
+    await inspection_pool.stop()
+    await counter_buffer.stop()
+    password_pool.shutdown()
+    await close_db()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="AI Model Hub",
+        description="AI 模型展示平台 API",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+    for module in ROUTERS:
+        app.include_router(module.router, prefix="/api")
+
+    # CORS 配置
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # SQL 剖析 / 慢查询日志的请求上下文
+    app.add_middleware(ProfilerMiddleware)
+
+    # 请求耗时 / 数据库统计（放在最外层，包含 CORS 等中间件的耗时）
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/")
+    async def root():
+        return {"message": "AI Model Hub API", "status": "running", "version": "1.0.0"}
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "healthy",
+            "embedded": embedded,
+            "pending_counters": counter_buffer.pending,
+            "inspection": inspection_pool.stats(),
+            "database": database_stats(),
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        """Prometheus 格式的指标"""
+        return PlainTextResponse(
+            metrics_registry.render(database_stats()),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    return app
+
+
+app = create_app()
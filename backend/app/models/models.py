@@ -1,17 +1,27 @@
 """数据模型"""
-from sqlalchemy import Column, String, Text, Integer, BigInteger, ForeignKey, DateTime, ARRAY
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Float, ForeignKey, DateTime, JSON, Index, UniqueConstraint, Uuid, func, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 from app.database import Base
 
+# 全文检索使用的 PostgreSQL 分词配置（词元已由应用层切分好）
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+# 可移植的列类型：Uuid 在 PostgreSQL 上是原生 UUID，SQLite 上为 CHAR(32)；
+# 标签在 PostgreSQL 上是数组（GIN 索引），SQLite 上存为 JSON 列表，筛选走 model_tags 侧表
+TagList = ARRAY(String).with_variant(JSON(), "sqlite")
+
+# 列表摘要（description 的前若干字）的长度
+SUMMARY_LENGTH = 200
+
 
 class User(Base):
     """用户模型"""
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
     username = Column(String(100), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
@@ -31,11 +41,12 @@ class Model(Base):
     """AI 模型"""
     __tablename__ = "models"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
+    summary = Column(String(SUMMARY_LENGTH), nullable=True)  # description 的开头，写入时维护，列表不读大文本
     category = Column(String(100), nullable=False, index=True)  # nlp, cv, audio, multimodal
-    tags = Column(ARRAY(String), default=list)
+    tags = Column(TagList, default=list)
     framework = Column(String(100), nullable=True)  # pytorch, tensorflow, onnx
     version = Column(String(50), default="1.0.0")
 
@@ -43,19 +54,42 @@ class Model(Base):
     file_url = Column(String(1000), nullable=True)
     file_size = Column(BigInteger, default=0)
     file_format = Column(String(50), nullable=True)  # .pt, .bin, .onnx
+    file_manifest = Column(String(64), nullable=True, index=True)  # 分块存储的清单 id
+    file_name = Column(String(255), nullable=True)  # 上传时的原始文件名（格式检测和下载文件名使用）
+    file_sha256 = Column(String(64), nullable=True)
+
+    # 文件检查结果（由 app.services.inspection 在后台写入）
+    inspection_status = Column(String(20), nullable=True)  # queued, running, done, failed, pending
+    inspection = Column(JSON, nullable=True)  # 格式、参数量、各类型参数量、张量形状或错误信息
+    parameter_count = Column(BigInteger, nullable=True)
+    inspected_at = Column(DateTime, nullable=True)
 
     # 统计
     downloads = Column(Integer, default=0)
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
     views = Column(Integer, default=0)
+    trending_score = Column(Float, default=0.0, nullable=False)  # 时间衰减热度（见 app.services.trending）
+
+    # 评分聚合（由 app.services.ratings 在发表 / 删除评论时维护）
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_count = Column(Integer, default=0, nullable=False)
+    rating_avg = Column(Float, default=0.0, nullable=False)  # 无评分时为 0
+    rating_1 = Column(Integer, default=0, nullable=False)
+    rating_2 = Column(Integer, default=0, nullable=False)
+    rating_3 = Column(Integer, default=0, nullable=False)
+    rating_4 = Column(Integer, default=0, nullable=False)
+    rating_5 = Column(Integer, default=0, nullable=False)
 
     # API 信息
     api_endpoint = Column(String(500), nullable=True)
     api_docs = Column(Text, nullable=True)
 
+    # 检索词元（由 app.services.search 在写入时生成，空格分隔）
+    search_document = Column(Text, default="")
+
     # 作者
-    author_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    author_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
 
     # 时间
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -66,14 +100,36 @@ class Model(Base):
     comments = relationship("Comment", back_populates="model", cascade="all, delete-orphan")
     likes = relationship("Like", back_populates="model", cascade="all, delete-orphan")
 
+    @property
+    def rating_histogram(self) -> list[int]:
+        """1-5 星各自的评分人数"""
+        return [self.rating_1 or 0, self.rating_2 or 0, self.rating_3 or 0, self.rating_4 or 0, self.rating_5 or 0]
+
+    # 游标分页索引：(排序键, id)
+    __table_args__ = (
+        Index("ix_models_created_at_id", "created_at", "id"),
+        Index("ix_models_likes_count_id", "likes_count", "id"),
+        Index("ix_models_downloads_id", "downloads", "id"),
+        Index("ix_models_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_models_trending_score_id", "trending_score", "id"),
+        Index("ix_models_rating_avg_id", "rating_avg", "id"),
+        Index("ix_models_tags", "tags", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_models_category_trending_score_id", "category", "trending_score", "id"),
+        Index(
+            "ix_models_search_document",
+            func.to_tsvector(TS_CONFIG, search_document),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class Comment(Base):
     """评论"""
     __tablename__ = "comments"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    model_id = Column(UUID(as_uuid=True), ForeignKey("models.id"), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    model_id = Column(Uuid, ForeignKey("models.id"), nullable=False)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     rating = Column(Integer, default=5)  # 1-5 星评分
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -83,28 +139,72 @@ class Comment(Base):
     model = relationship("Model", back_populates="comments")
     user = relationship("User", back_populates="comments")
 
+    __table_args__ = (
+        Index("ix_comments_model_created_at_id", "model_id", "created_at", "id"),
+    )
+
 
 class Like(Base):
     """点赞"""
     __tablename__ = "likes"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    model_id = Column(UUID(as_uuid=True), ForeignKey("models.id"), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    model_id = Column(Uuid, ForeignKey("models.id"), nullable=False)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # 关系
     model = relationship("Model", back_populates="likes")
     user = relationship("User", back_populates="likes")
 
+    __table_args__ = (
+        UniqueConstraint("model_id", "user_id", name="uq_likes_model_user"),
+    )
+
 
 class Category(Base):
     """分类"""
     __tablename__ = "categories"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(100), unique=True, nullable=False)
     slug = Column(String(100), unique=True, nullable=False)
     description = Column(Text, nullable=True)
     icon = Column(String(100), nullable=True)
     sort_order = Column(Integer, default=0)
+
+
+class ModelTag(Base):
+    """模型标签侧表（非 PostgreSQL 后端的标签筛选索引，由 app.services.tags 维护）"""
+    __tablename__ = "model_tags"
+
+    tag = Column(String(50), primary_key=True)
+    model_id = Column(Uuid, ForeignKey("models.id", ondelete="CASCADE"), primary_key=True)
+
+
+class FacetCount(Base):
+    """分面计数（由 app.services.facets 维护）"""
+    __tablename__ = "facet_counts"
+
+    facet = Column(String(20), primary_key=True)  # category, framework, file_format, tags
+    value = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class StorageManifest(Base):
+    """分块存储的文件清单（内容见 UPLOAD_DIR/manifests/<id>.json）"""
+    __tablename__ = "storage_manifests"
+
+    id = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    chunk_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StorageChunk(Base):
+    """分块（refcount 为引用它的清单数）"""
+    __tablename__ = "storage_chunks"
+
+    hash = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
@@ -1,9 +1,11 @@
 """Pydantic 模型"""
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_serializer
 from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
 
+from app.services.tags import normalize_tags
+
 
 # ============ 用户相关 ============
 class UserBase(BaseModel):
@@ -30,6 +32,16 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class AuthorSummary(BaseModel):
+    """内嵌在模型 / 评论中的用户信息"""
+    id: UUID
+    username: str
+    avatar: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -52,6 +64,11 @@ class ModelCreate(ModelBase):
     api_endpoint: Optional[str] = None
     api_docs: Optional[str] = None
 
+    @field_validator("tags")
+    @classmethod
+    def _normalize_tags(cls, tags: List[str]) -> List[str]:
+        return normalize_tags(tags)
+
 
 class ModelUpdate(BaseModel):
     name: Optional[str] = None
@@ -66,12 +83,36 @@ class ModelUpdate(BaseModel):
     api_endpoint: Optional[str] = None
     api_docs: Optional[str] = None
 
+    @field_validator("tags")
+    @classmethod
+    def _normalize_tags(cls, tags: Optional[List[str]]) -> Optional[List[str]]:
+        return None if tags is None else normalize_tags(tags)
+
+
+class InspectionSummary(BaseModel):
+    """文件检查结果摘要（张量明细见 /models/{id}/inspection）"""
+    format: Optional[str] = None
+    framework: Optional[str] = None
+    sha256: Optional[str] = None
+    parameter_count: Optional[int] = None
+    tensor_count: Optional[int] = None
+    dtypes: Optional[dict] = None
+    error: Optional[str] = None
+
 
 class ModelResponse(ModelBase):
     id: UUID
     file_url: Optional[str] = None
     file_size: int = 0
     file_format: Optional[str] = None
+    file_name: Optional[str] = None
+    file_sha256: Optional[str] = None
+    rating_avg: float = 0.0
+    rating_count: int = 0
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]  # 1-5 星各自的人数
+    parameter_count: Optional[int] = None
+    inspection_status: Optional[str] = None
+    inspection: Optional[InspectionSummary] = None
     downloads: int = 0
     likes_count: int = 0
     comments_count: int = 0
@@ -79,19 +120,58 @@ class ModelResponse(ModelBase):
     api_endpoint: Optional[str] = None
     api_docs: Optional[str] = None
     author_id: UUID
-    author: Optional[UserResponse] = None
+    author: Optional[AuthorSummary] = None
     created_at: datetime
     updated_at: datetime
+    liked_by_me: Optional[bool] = None  # 仅在请求 with_liked 且已登录时填充
 
     class Config:
         from_attributes = True
 
 
+class ModelSummary(BaseModel):
+    """模型列表条目：只输出查询时选择的字段（fields 参数）"""
+    id: UUID
+    name: Optional[str] = None
+    summary: Optional[str] = None  # 描述的前若干字
+    description: Optional[str] = None
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    framework: Optional[str] = None
+    version: Optional[str] = None
+    file_url: Optional[str] = None
+    file_size: Optional[int] = None
+    file_format: Optional[str] = None
+    file_sha256: Optional[str] = None
+    downloads: Optional[int] = None
+    likes_count: Optional[int] = None
+    comments_count: Optional[int] = None
+    views: Optional[int] = None
+    rating_avg: Optional[float] = None
+    rating_count: Optional[int] = None
+    parameter_count: Optional[int] = None
+    inspection_status: Optional[str] = None
+    api_endpoint: Optional[str] = None
+    api_docs: Optional[str] = None
+    author_id: Optional[UUID] = None
+    author: Optional[AuthorSummary] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    liked_by_me: Optional[bool] = None
+
+    @model_serializer(mode="wrap")
+    def _selected_only(self, handler):
+        data = handler(self)
+        return {key: value for key, value in data.items() if key in self.model_fields_set}
+
+
 class ModelListResponse(BaseModel):
-    items: List[ModelResponse]
-    total: int
+    items: List[ModelSummary]
+    total: Optional[int] = None  # count=none 时不统计
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+    truncated: bool = False  # 搜索匹配过多，只返回相关度最高的一部分（total 仍为完整匹配数）
 
 
 # ============ 评论相关 ============
@@ -108,7 +188,7 @@ class CommentResponse(CommentBase):
     id: UUID
     model_id: UUID
     user_id: UUID
-    user: Optional[UserResponse] = None
+    user: Optional[AuthorSummary] = None
     created_at: datetime
     updated_at: datetime
 
@@ -127,7 +207,108 @@ class LikeResponse(BaseModel):
         from_attributes = True
 
 
+class LikeStatusResponse(BaseModel):
+    liked: bool
+    likes_count: int
+
+
+class LikeBatchStatusResponse(BaseModel):
+    liked: List[UUID]  # 请求的模型中已点赞的 id
+
+
+# ============ 上传相关 ============
+class UploadCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=0)
+    model_id: UUID  # 完成后把文件存入分块存储并设为该模型的文件
+
+
+class UploadStatusResponse(BaseModel):
+    id: str
+    filename: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    received: List[List[int]]  # 已接收的字节区间 [start, end)
+    missing_chunks: List[int]
+
+
+class UploadChunkResponse(BaseModel):
+    offset: int
+    length: int
+    sha256: str
+
+
+class UploadComplete(BaseModel):
+    sha256: Optional[str] = None  # 客户端计算的整文件校验和
+
+
+class UploadResultResponse(BaseModel):
+    id: str
+    model_id: UUID
+    manifest: str  # 分块清单 id
+    size: int
+    sha256: str
+    stored_bytes: Optional[int] = None  # 去重后实际新写入的字节数
+
+
+# ============ 文件检查相关 ============
+class InspectionProgress(BaseModel):
+    done_bytes: int
+    total_bytes: int
+    queued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class InspectionResponse(BaseModel):
+    model_id: UUID
+    status: Optional[str] = None
+    progress: Optional[InspectionProgress] = None  # 仅本进程中最近的任务有进度
+    parameter_count: Optional[int] = None
+    inspected_at: Optional[datetime] = None
+    result: Optional[dict] = None
+
+
+# ============ 分块存储相关 ============
+class ChunkRef(BaseModel):
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+    length: int = Field(..., gt=0)
+
+
+class ChunkQuery(BaseModel):
+    hashes: List[str] = Field(..., max_length=10000)
+
+
+class ChunkQueryResponse(BaseModel):
+    missing: List[str]
+
+
+class ModelFileCommit(BaseModel):
+    chunks: List[ChunkRef] = Field(..., min_length=1)
+    filename: Optional[str] = Field(None, max_length=255)  # 原始文件名，用于识别格式（如 .onnx）
+
+
+class ModelFileResponse(BaseModel):
+    manifest: str
+    size: int
+    chunk_count: int
+
+
 # ============ 分类相关 ============
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class FacetsResponse(BaseModel):
+    category: List[FacetValue]
+    framework: List[FacetValue]
+    file_format: List[FacetValue]
+    tags: List[FacetValue]
+    truncated: bool = False  # 搜索匹配过多，只统计了相关度最高的一部分
+
+
 class CategoryBase(BaseModel):
     name: str
     slug: str
@@ -144,6 +325,52 @@ class CategoryResponse(CategoryBase):
         from_attributes = True
 
 
+# ============ 管理相关 ============
+class SlowQueryResponse(BaseModel):
+    fingerprint: str
+    sql: str  # 规范化后的语句（字面量和参数替换为 ?）
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    last_seen: float
+    last_path: Optional[str] = None
+
+
+class QueryPlanResponse(BaseModel):
+    fingerprint: str
+    sql: str
+    duration_ms: float  # 触发 EXPLAIN 的那次执行的耗时
+    explained_at: float
+    plan: Optional[list] = None  # EXPLAIN (FORMAT JSON) 的输出
+    error: Optional[str] = None
+
+
+class ProfiledStatement(BaseModel):
+    fingerprint: str
+    statement: str
+    duration_ms: float
+    rows: int
+    offset_ms: float
+
+
+class RequestProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: Optional[str] = None
+    status: Optional[int] = None
+    reason: str  # header / sample
+    started_at: float
+    duration_ms: float
+    db_time_ms: float
+    statement_count: int
+
+
+class RequestProfileResponse(RequestProfileSummary):
+    statements: List[ProfiledStatement]
+
+
 # ============ 通用响应 ============
 class Message(BaseModel):
     message: str
@@ -1,18 +1,91 @@
 """认证服务"""
+import hmac
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, select
+from sqlalchemy.orm import make_transient_to_detached
 from app.config import settings
 from app.database import get_db
 from app.models.models import User
+from app.services.metrics import metric_lines, registry as metrics_registry
+from app.services.passwords import PoolSaturated, password_pool
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+
+class PrincipalCache:
+    """已认证用户缓存（按 token subject 索引，LRU + TTL）"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, User]] = OrderedDict()
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, subject: str, user: User) -> None:
+        # 缓存脱离会话的副本，避免与原会话共享可变状态
+        snapshot = User(**{c.key: getattr(user, c.key) for c in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        self._entries[subject] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL,
+)
+
+
+def _principal_metrics():
+    stats = principal_cache.stats()
+    return [
+        *metric_lines(
+            "auth_principal_cache_requests_total", "counter", "已认证用户缓存查询次数",
+            {'result="hit"': stats["hits"], 'result="miss"': stats["misses"]},
+        ),
+        *metric_lines("auth_principal_cache_entries", "gauge", "已认证用户缓存条目数", {"": stats["size"]}),
+    ]
+
+
+metrics_registry.add_collector(_principal_metrics)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_principal(mapper, connection, target):
+    """用户资料或状态（如被禁用）变更时立即失效缓存"""
+    principal_cache.invalidate(target.email)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,6 +98,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_work(fn, *args, response: Optional[Response] = None):
+    """在密码工作池中执行哈希计算，并通过 Server-Timing 单独报告耗时"""
+    try:
+        value, elapsed = await password_pool.run(fn, *args)
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+        )
+    if response is not None:
+        response.headers.append("Server-Timing", f"pwhash;dur={elapsed * 1000:.1f}")
+    return value
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str, response: Optional[Response] = None
+) -> bool:
+    """验证密码（不阻塞事件循环）"""
+    return await _run_password_work(verify_password, plain_password, hashed_password, response=response)
+
+
+async def get_password_hash_async(password: str, response: Optional[Response] = None) -> str:
+    """生成密码哈希（不阻塞事件循环）"""
+    return await _run_password_work(get_password_hash, password, response=response)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
     to_encode = data.copy()
@@ -55,11 +155,17 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    cached = principal_cache.get(email)
+    if cached is not None:
+        # 合并到当前会话（不查询数据库），后续修改可正常提交
+        return await db.merge(cached, load=False)
+
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
 
     if user is None:
         raise credentials_exception
+    principal_cache.set(email, user)
     return user
 
 
@@ -70,3 +176,30 @@ async def get_current_active_user(
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="用户已被禁用")
     return current_user
+
+
+async def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[User]:
+    """获取当前用户（未登录、令牌无效或用户被禁用时返回 None）"""
+    if not token:
+        return None
+    try:
+        user = await get_current_user(token, db)
+    except HTTPException:
+        return None
+    return user if user.is_active else None
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """是否为有效的管理令牌（未配置 ADMIN_TOKEN 时一律无效）"""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """管理接口：校验 X-Admin-Token 请求头"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权访问管理接口")
@@ -0,0 +1,229 @@
+"""目录读取的响应缓存
+
+缓存按“命名空间 + 版本号 + 规范化查询参数”生成键。写操作只需提升相关命名空间的
+版本号（旧键自然失效并由 TTL / LRU 回收），避免与正在进行的加载产生竞争。
+未命中时同一个键只会有一个加载任务（single-flight），其余请求等待其结果；
+加载任务被取消（客户端断开）时，等待者重新发起加载而不是随之取消。
+
+加载通常在只读副本上执行（get_read_db）。配置了副本时，命名空间版本提升后的
+CACHE_REPLICA_LAG 秒内不写入缓存：此时副本可能尚未应用这次写入，
+其结果不能存到新版本号的键下（该窗口需大于副本的实际复制延迟）。
+
+后端：
+- memory：进程内 LRU + TTL（默认）
+- redis：Redis 兼容服务（可选依赖 redis，多进程共享）
+- none：关闭缓存
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlencode
+from uuid import UUID
+
+from app.config import settings
+from app.services.metrics import metric_lines, registry as metrics_registry
+from app.services.serialization import encode
+
+# 模型列表的命名空间（任一模型变化都会影响列表）
+LIST_NAMESPACE = "models"
+
+
+def detail_namespace(model_id) -> str:
+    """模型详情的命名空间（id 规范化，避免大小写不同导致失效遗漏）"""
+    return f"model:{UUID(str(model_id))}"
+
+
+class LoadAbandoned(Exception):
+    """single-flight 的加载任务被取消，等待者应自行重试"""
+
+
+class MemoryBackend:
+    """进程内 LRU + TTL 缓存"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._bumped_at: dict[str, float] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    async def bumped_at(self, namespace: str) -> float:
+        return self._bumped_at.get(namespace, 0.0)
+
+    async def bump(self, namespace: str) -> None:
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        self._bumped_at[namespace] = time.time()
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisBackend:
+    """Redis 兼容后端（需要安装 redis 包）"""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis 需要安装 redis 包")
+        self._client = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(f"cache:{key}")
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(f"cache:{key}", value, px=int(ttl * 1000))
+
+    async def version(self, namespace: str) -> int:
+        value = await self._client.get(f"ver:{namespace}")
+        return int(value) if value is not None else 0
+
+    async def bumped_at(self, namespace: str) -> float:
+        value = await self._client.get(f"ver_at:{namespace}")
+        return float(value) if value is not None else 0.0
+
+    async def bump(self, namespace: str) -> None:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.incr(f"ver:{namespace}")
+            pipe.set(f"ver_at:{namespace}", time.time())
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter("cache:*"):
+            await self._client.delete(key)
+
+
+class ResponseCache:
+    """带版本号失效和 single-flight 的响应缓存"""
+
+    def __init__(self, backend, ttl: float, replica_lag: float = 0.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.replica_lag = replica_lag
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def normalize(params: dict[str, Any]) -> str:
+        """规范化查询参数：去掉空值并按参数名排序"""
+        return urlencode(sorted((k, str(v)) for k, v in params.items() if v is not None))
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        params: dict[str, Any],
+        loader: Callable[[], Awaitable[Any]],
+    ) -> bytes:
+        """返回缓存的 JSON；未命中时调用 loader 加载（同一键并发只加载一次）
+
+        loader 返回 pydantic 对象或可直接编码的 dict / list。
+        """
+        if not self.enabled:
+            return encode(await loader())
+
+        version = await self.backend.version(namespace)
+        key = f"{namespace}:v{version}:{self.normalize(params)}"
+        if self.replica_lag and time.time() - await self.backend.bumped_at(namespace) < self.replica_lag:
+            # 刚写入过：副本上的结果可能是旧数据，直接加载、不写入缓存
+            self.misses += 1
+            return encode(await loader())
+        while True:
+            body = await self.backend.get(key)
+            if body is not None:
+                self.hits += 1
+                return body
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                return await self._load(key, loader)
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except LoadAbandoned:
+                # 加载者被取消：重新检查缓存，由第一个重试者接替加载
+                continue
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> bytes:
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            body = encode(await loader())
+            await self.backend.set(key, body, self.ttl)
+            future.set_result(body)
+            return body
+        except asyncio.CancelledError:
+            # 只取消加载者自己；等待者收到 LoadAbandoned 后重试
+            future.set_exception(LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # 无等待者时避免 “exception was never retrieved” 警告
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def invalidate(self, *namespaces: str) -> None:
+        """提升命名空间版本号，使其下的缓存全部失效"""
+        if not self.enabled:
+            return
+        for namespace in namespaces:
+            await self.backend.bump(namespace)
+
+    async def invalidate_model(self, model_id) -> None:
+        """模型变化：失效其详情和所有列表"""
+        await self.invalidate(LIST_NAMESPACE, detail_namespace(model_id))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+def _create_backend():
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL)
+    return None
+
+
+response_cache = ResponseCache(
+    _create_backend(),
+    ttl=settings.CACHE_TTL,
+    replica_lag=settings.CACHE_REPLICA_LAG if settings.DATABASE_REPLICA_URLS else 0.0,
+)
+
+
+def _cache_metrics():
+    return metric_lines(
+        "response_cache_requests_total", "counter", "响应缓存查询次数（hit / miss / coalesced）",
+        {f'result="{result}"': count for result, count in response_cache.stats().items()},
+    )
+
+
+metrics_registry.add_collector(_cache_metrics)
@@ -0,0 +1,183 @@
+"""计数器写缓冲（浏览量 / 下载量）"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import Integer, Uuid, bindparam, column, update, values
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.models import Model
+from app.services import trending
+
+logger = logging.getLogger(__name__)
+
+# 允许缓冲的计数字段
+COUNTER_FIELDS = ("views", "downloads")
+
+
+class CounterBuffer:
+    """进程内计数聚合器
+
+    读请求只在内存中累加增量，由后台任务按时间间隔或积压阈值
+    批量写回数据库（PostgreSQL 上是一条 UPDATE ... FROM (VALUES ...) 语句；
+    SQLite 不支持带列名的 VALUES 派生表，改为同一条 UPDATE 按行批量执行）。
+    写回失败（包括被取消）时增量放回缓冲；连续失败时按指数退避推迟下一次写回。
+    """
+
+    def __init__(self, flush_interval: float, flush_threshold: int, max_backoff: float):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_backoff = max_backoff
+        self._pending: dict[UUID, dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        self._pending_total = 0
+        self._task: Optional[asyncio.Task] = None
+        # 后台写回任务（阈值和定时触发，保留引用，同一时间最多一个）
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._failures = 0
+        self._retry_at = 0.0  # 退避期内不再发起后台写回
+
+    @property
+    def pending(self) -> int:
+        """等待写回的增量总数"""
+        return self._pending_total
+
+    def pending_for(self, model_id: UUID) -> dict[str, int]:
+        """某个模型尚未写回的增量"""
+        deltas = self._pending.get(model_id)
+        return dict(deltas) if deltas else dict.fromkeys(COUNTER_FIELDS, 0)
+
+    def incr(self, model_id: UUID, field: str, amount: int = 1) -> None:
+        """累加一次计数（不访问数据库）"""
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"不支持的计数字段: {field}")
+        self._pending[model_id][field] += amount
+        self._pending_total += amount
+        if self._pending_total >= self.flush_threshold and time.monotonic() >= self._retry_at:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> asyncio.Task:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        return self._flush_task
+
+    async def flush(self) -> int:
+        """把积压的增量批量写回数据库，返回写回的增量数"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+            flushed, self._pending_total = self._pending_total, 0
+            committed = False
+            try:
+                async with async_session_maker() as session:
+                    if session.bind.dialect.name == "postgresql":
+                        await session.execute(self._build_update(batch))
+                    else:
+                        await session.execute(self._build_row_update(), self._rows(batch))
+                    await session.commit()
+                    committed = True
+            except BaseException as exc:
+                if committed:
+                    raise
+                # 写回失败或被取消（如关闭时）：把增量放回缓冲，下次重试
+                for model_id, deltas in batch.items():
+                    for field, amount in deltas.items():
+                        self._pending[model_id][field] += amount
+                self._pending_total += flushed
+                if not isinstance(exc, Exception):
+                    raise
+                self._failures += 1
+                delay = min(self.max_backoff, self.flush_interval * 2 ** (self._failures - 1))
+                self._retry_at = time.monotonic() + delay
+                logger.exception("计数器写回失败，%d 个增量将在 %.1f 秒后重试", flushed, delay)
+                return 0
+            self._failures = 0
+            self._retry_at = 0.0
+            return flushed
+
+    @staticmethod
+    def _build_update(batch: dict[UUID, dict[str, int]]):
+        """构造 UPDATE models ... FROM (VALUES ...) 语句"""
+        deltas = values(
+            column("id", Uuid),
+            *(column(field, Integer) for field in COUNTER_FIELDS),
+            name="deltas",
+        ).data([
+            (model_id, *(counts[field] for field in COUNTER_FIELDS))
+            for model_id, counts in batch.items()
+        ])
+        trending_score = Model.trending_score
+        for field in COUNTER_FIELDS:
+            trending_score = trending_score + trending.increment(field, deltas.c[field])
+        return (
+            update(Model)
+            .where(Model.id == deltas.c.id)
+            .values({
+                **{field: getattr(Model, field) + deltas.c[field] for field in COUNTER_FIELDS},
+                "trending_score": trending_score,
+                # 计数变化不算内容更新，避免触发 updated_at 的 onupdate
+                "updated_at": Model.updated_at,
+            })
+        )
+
+    @staticmethod
+    def _build_row_update():
+        """按主键逐行更新的 UPDATE 语句（参数见 _rows）"""
+        table = Model.__table__
+        trending_score = table.c.trending_score
+        for field in COUNTER_FIELDS:
+            trending_score = trending_score + trending.increment(field, bindparam(f"delta_{field}", type_=Integer))
+        return (
+            update(table)
+            .where(table.c.id == bindparam("model_id", type_=Uuid))
+            .values({
+                **{field: table.c[field] + bindparam(f"delta_{field}", type_=Integer) for field in COUNTER_FIELDS},
+                "trending_score": trending_score,
+                "updated_at": table.c.updated_at,
+            })
+        )
+
+    @staticmethod
+    def _rows(batch: dict[UUID, dict[str, int]]) -> list[dict]:
+        return [
+            {"model_id": model_id, **{f"delta_{field}": counts[field] for field in COUNTER_FIELDS}}
+            for model_id, counts in batch.items()
+        ]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if time.monotonic() >= self._retry_at:
+                # 取消定时任务不会中断进行中的写回
+                await asyncio.shield(self._schedule_flush())
+
+    def start(self) -> None:
+        """启动定时写回任务"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止定时任务并写回剩余增量"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+
+counter_buffer = CounterBuffer(
+    flush_interval=settings.COUNTER_FLUSH_INTERVAL,
+    flush_threshold=settings.COUNTER_FLUSH_THRESHOLD,
+    max_backoff=settings.COUNTER_FLUSH_MAX_BACKOFF,
+)
@@ -0,0 +1,146 @@
+"""分面计数（分类 / 框架 / 文件格式 / 标签）
+
+无筛选条件时直接读取 facet_counts 表：模型新增、修改、删除时由 mapper 事件在同一事务中
+按差值 upsert 计数，读取是一次主键范围扫描。
+带筛选条件（分类、搜索词）时在匹配的行上做 GROUP BY，筛选本身走分类索引 / 搜索索引。
+"""
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import FacetCount, Model
+
+# 分面名 -> 模型字段（tags 为多值字段）
+FACET_FIELDS = ("category", "framework", "file_format", "tags")
+
+# 每个分面最多返回的取值数
+MAX_FACET_VALUES = 50
+
+
+def facet_values(field: str, value) -> list[str]:
+    """字段值 -> 参与计数的取值（空值不计数）"""
+    if field == "tags":
+        return list(dict.fromkeys(tag for tag in value or () if tag))
+    return [value] if value else []
+
+
+def model_facets(model: Model) -> Counter:
+    counts = Counter()
+    for field in FACET_FIELDS:
+        for value in facet_values(field, getattr(model, field)):
+            counts[(field, value)] += 1
+    return counts
+
+
+def _apply(connection, deltas: Counter) -> None:
+    """把计数差值 upsert 到 facet_counts（与模型写入在同一事务中）"""
+    rows = [
+        {"facet": facet, "value": value, "count": delta}
+        for (facet, value), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    insert = pg_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(FacetCount).values(rows)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["facet", "value"],
+        set_={"count": FacetCount.count + stmt.excluded.count},
+    ))
+
+
+@event.listens_for(Model, "after_insert")
+def _count_insert(mapper, connection, target):
+    _apply(connection, model_facets(target))
+
+
+@event.listens_for(Model, "after_delete")
+def _count_delete(mapper, connection, target):
+    deltas = Counter()
+    deltas.subtract(model_facets(target))
+    _apply(connection, deltas)
+
+
+@event.listens_for(Model, "after_update")
+def _count_update(mapper, connection, target):
+    state = inspect(target)
+    deltas = Counter()
+    for field in FACET_FIELDS:
+        history = state.attrs[field].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        deltas.subtract(Counter((field, v) for v in facet_values(field, old)))
+        deltas.update(Counter((field, v) for v in facet_values(field, new)))
+    _apply(connection, deltas)
+
+
+def _top(counts: Iterable[tuple[str, int]], limit: int) -> list[dict]:
+    items = sorted(((v, c) for v, c in counts if c > 0), key=lambda item: (-item[1], item[0]))
+    return [{"value": value, "count": count} for value, count in items[:limit]]
+
+
+async def maintained_facets(db: AsyncSession, limit: int = MAX_FACET_VALUES) -> dict:
+    """全部模型的分面计数（读取维护好的计数表）"""
+    result = await db.execute(select(FacetCount.facet, FacetCount.value, FacetCount.count))
+    grouped: dict[str, list[tuple[str, int]]] = {field: [] for field in FACET_FIELDS}
+    for facet, value, count in result.all():
+        if facet in grouped:
+            grouped[facet].append((value, count))
+    return {field: _top(values, limit) for field, values in grouped.items()}
+
+
+async def filtered_facets(db: AsyncSession, condition, limit: int = MAX_FACET_VALUES) -> dict:
+    """满足筛选条件的模型的分面计数"""
+    facets = {}
+    for field in ("category", "framework", "file_format"):
+        column = getattr(Model, field)
+        result = await db.execute(
+            select(column, func.count())
+            .where(condition, column.isnot(None))
+            .group_by(column)
+            .order_by(func.count().desc(), column)
+            .limit(limit)
+        )
+        facets[field] = [{"value": value, "count": count} for value, count in result.all()]
+
+    if db.bind.dialect.name == "postgresql":
+        tag = func.unnest(Model.tags).label("tag")
+        tags = select(Model.id, tag).where(condition).subquery()
+        result = await db.execute(
+            select(tags.c.tag, func.count(func.distinct(tags.c.id)))
+            .group_by(tags.c.tag)
+            .order_by(func.count(func.distinct(tags.c.id)).desc(), tags.c.tag)
+            .limit(limit)
+        )
+        facets["tags"] = [{"value": value, "count": count} for value, count in result.all()]
+    else:
+        result = await db.execute(select(Model.tags).where(condition))
+        counts = Counter()
+        for tags in result.scalars():
+            counts.update(facet_values("tags", tags))
+        facets["tags"] = _top(counts.items(), limit)
+    return facets
+
+
+async def rebuild_facet_counts(db: AsyncSession) -> int:
+    """按 models 表重新计算 facet_counts（修复计数漂移 / 初次部署回填），返回模型数"""
+    counts = Counter()
+    total = 0
+    result = await db.stream(select(Model.category, Model.framework, Model.file_format, Model.tags))
+    async for row in result:
+        total += 1
+        for field in FACET_FIELDS:
+            for value in facet_values(field, getattr(row, field)):
+                counts[(field, value)] += 1
+    await db.execute(FacetCount.__table__.delete())
+    if counts:
+        await db.execute(FacetCount.__table__.insert(), [
+            {"facet": facet, "value": value, "count": count} for (facet, value), count in counts.items()
+        ])
+    await db.commit()
+    return total
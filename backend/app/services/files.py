@@ -0,0 +1,189 @@
+"""模型文件下载：HTTP Range / 多区间、If-Range、零拷贝发送和分片清单
+
+- 支持单区间和多区间（multipart/byteranges）请求，If-Range 不匹配时返回完整文件
+- ASGI 服务器支持 http.response.zerocopysend 扩展时使用 sendfile 发送，否则按块 pread
+- 分片清单记录每个分片的 sha256，客户端可多连接并行下载并逐片校验
+- 文件是分块存储中按清单重组的文件（见 app.services.storage）
+"""
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.services.storage import ChunkStore, Manifest
+
+# 非零拷贝模式下每次读取的块大小
+SEND_BLOCK_SIZE = 1024 * 1024
+
+# 单个请求允许的最大区间数
+MAX_RANGES = 32
+
+
+class RangeNotSatisfiable(Exception):
+    """请求的区间超出文件范围"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[list[tuple[int, int]]]:
+    """解析 Range 头，返回按起点排序、合并后的闭区间列表；无 Range 或格式无法识别时返回 None"""
+    if not header or not header.startswith("bytes="):
+        return None
+    ranges = []
+    for spec in header[len("bytes="):].split(","):
+        start_text, sep, end_text = spec.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if start_text:
+                start = int(start_text)
+                end = int(end_text) if end_text else size - 1
+            else:
+                # 后缀区间：最后 N 个字节
+                start, end = max(0, size - int(end_text)), size - 1
+        except ValueError:
+            return None
+        if start > end and end_text:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if len(merged) > MAX_RANGES:
+        raise RangeNotSatisfiable()
+    return merged
+
+
+class ChunkedFileSource:
+    """分块存储中按清单重组的文件"""
+
+    def __init__(self, store: ChunkStore, manifest: Manifest):
+        self.store = store
+        self.manifest = manifest
+        self.size = manifest.size
+
+    def segments(self, start: int, length: int) -> Iterator[tuple[Path, int, int]]:
+        for chunk_hash, offset, count in self.manifest.locate(start, length):
+            yield self.store.chunk_path(chunk_hash), offset, count
+
+
+class RangeFileResponse(Response):
+    """按区间发送文件内容（支持零拷贝）"""
+
+    def __init__(
+        self,
+        source: ChunkedFileSource,
+        ranges: Optional[list[tuple[int, int]]],
+        media_type: str,
+        headers: dict[str, str],
+    ):
+        self.source = source
+        size = source.size
+        self.background = None
+        self.parts: list[tuple[bytes, int, int]] = []  # (分段头, 起点, 长度)
+        self.trailer = b""
+        headers = {**headers, "Accept-Ranges": "bytes"}
+
+        if ranges is None:
+            self.status_code = 200
+            self.parts.append((b"", 0, size))
+            headers["Content-Type"] = media_type
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.status_code = 206
+            self.parts.append((b"", start, end - start + 1))
+            headers["Content-Type"] = media_type
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            boundary = secrets.token_hex(16)
+            self.status_code = 206
+            for start, end in ranges:
+                part_header = (
+                    f"\r\n--{boundary}\r\nContent-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode()
+                self.parts.append((part_header, start, end - start + 1))
+            self.trailer = f"\r\n--{boundary}--\r\n".encode()
+            headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+
+        content_length = sum(len(h) + length for h, _, length in self.parts) + len(self.trailer)
+        headers["Content-Length"] = str(content_length)
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        for part_header, start, length in self.parts:
+            if part_header:
+                await send({"type": "http.response.body", "body": part_header, "more_body": True})
+            for path, offset, count in self.source.segments(start, length):
+                with open(path, "rb") as file:
+                    if zerocopy:
+                        await send({
+                            "type": "http.response.zerocopysend",
+                            "file": file,
+                            "offset": offset,
+                            "count": count,
+                            "more_body": True,
+                        })
+                        continue
+                    sent = 0
+                    while sent < count:
+                        block = await run_in_threadpool(
+                            os.pread, file.fileno(), min(SEND_BLOCK_SIZE, count - sent), offset + sent
+                        )
+                        if not block:
+                            break
+                        sent += len(block)
+                        await send({"type": "http.response.body", "body": block, "more_body": True})
+        await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+
+
+# ============ 分片清单 ============
+def chunked_manifest(manifest: Manifest, sha256: Optional[str]) -> dict:
+    """分块存储文件的下载清单（分块长度不固定）"""
+    chunks = []
+    for (chunk_hash, length), offset in zip(manifest.chunks, manifest.offsets):
+        chunks.append({"offset": offset, "length": length, "sha256": chunk_hash})
+    return {"size": manifest.size, "sha256": sha256, "manifest": manifest.id, "chunk_size": None, "chunks": chunks}
+
+
+# ============ 下载计数去重 ============
+class DownloadDeduper:
+    """同一客户端在时间窗口内对同一文件的多次请求（续传、并行分段）只计一次下载"""
+
+    def __init__(self, window: float, max_entries: int = 100000):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen: dict[str, float] = {}
+
+    def should_count(self, key: str) -> bool:
+        now = time.monotonic()
+        expires = self._seen.get(key)
+        if expires is not None and expires > now:
+            return False
+        if len(self._seen) >= self.max_entries:
+            self._seen = {k: v for k, v in self._seen.items() if v > now}
+            if len(self._seen) >= self.max_entries:
+                self._seen.clear()
+        self._seen[key] = now + self.window
+        return True
+
+
+download_deduper = DownloadDeduper(window=settings.DOWNLOAD_DEDUP_WINDOW)
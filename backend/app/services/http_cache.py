@@ -0,0 +1,62 @@
+"""HTTP 条件请求（ETag / If-None-Match）、Cache-Control 策略与表示形式协商
+
+缓存中只保存 JSON；请求 Accept: application/msgpack 时按需转换，并使用不同的 ETag。
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+from app.config import settings
+from app.services.serialization import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPES, to_msgpack, wants_msgpack
+
+
+def make_etag(*parts) -> str:
+    """由版本信息（如 updated_at、计数器）生成强 ETag"""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def body_etag(body: bytes) -> str:
+    """由响应体内容生成强 ETag"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（按 RFC 9110 使用弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cache_control(route: str) -> str:
+    """按路由名读取 Cache-Control 策略"""
+    return settings.CACHE_CONTROL_POLICIES.get(route, "no-cache")
+
+
+def variant_etag(etag: str, accept: Optional[str]) -> str:
+    """按表示形式区分 ETag（msgpack 响应体与 JSON 不同）"""
+    if wants_msgpack(accept):
+        return f'{etag[:-1]}-msgpack"'
+    return etag
+
+
+def not_modified(etag: str, route: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": cache_control(route), "Vary": "Accept"}
+    )
+
+
+def json_response(body: bytes, etag: str, route: str, accept: Optional[str] = None) -> Response:
+    """发送已编码的 JSON 响应体（客户端要求 msgpack 时转换）"""
+    media_type = JSON_MEDIA_TYPE
+    if wants_msgpack(accept):
+        body, media_type = to_msgpack(body), MSGPACK_MEDIA_TYPES[0]
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers={"ETag": etag, "Cache-Control": cache_control(route), "Vary": "Accept"},
+    )
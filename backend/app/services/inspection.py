@@ -0,0 +1,272 @@
+"""模型文件后台检查：有界队列 + 进程池
+
+托管文件上传完成后入队，由固定数量的调度任务交给进程池执行（app.services.inspectors），
+请求处理协程只负责入队，不会被检查阻塞。队列满时拒绝入队，由调用方提示稍后重试。
+工作进程通过 multiprocessing 队列上报已处理的字节数，进行中的任务可查询进度；
+结果和失败原因写回 Model（inspection_status / inspection / parameter_count）。
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.models import Model
+from app.services.cache import response_cache
+from app.services.inspectors import init_worker, run_inspection
+from app.services.storage import chunk_store
+
+logger = logging.getLogger(__name__)
+
+# 内存中保留的已结束任务数（供查询最近的进度 / 错误）
+MAX_FINISHED_JOBS = 1000
+
+
+class InspectionQueueFull(Exception):
+    """检查队列已满"""
+
+
+class InspectionJob:
+    """一次检查任务"""
+
+    def __init__(self, model_id: UUID, source: str, filename: str, segments: list[tuple[str, int, int]]):
+        self.model_id = model_id
+        self.source = source  # 文件标识（清单 id 或相对路径），结果写回时用于确认文件未被替换
+        self.filename = filename
+        self.segments = segments
+        self.total_bytes = sum(length for _, _, length in segments)
+        self.done_bytes = 0
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def progress(self) -> dict:
+        return {
+            "status": self.status,
+            "done_bytes": self.done_bytes,
+            "total_bytes": self.total_bytes,
+            "error": self.error,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+async def model_segments(model) -> tuple[str, list[tuple[str, int, int]]]:
+    """模型文件的 (文件标识, 分段列表)"""
+    manifest = await run_in_threadpool(chunk_store.load_manifest, model.file_manifest)
+    segments = [(str(chunk_store.chunk_path(h)), 0, length) for h, length in manifest.chunks]
+    return model.file_manifest, segments
+
+
+class InspectionPool:
+    """文件检查进程池"""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.jobs: dict[UUID, InspectionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._progress = None
+        self._progress_thread: Optional[threading.Thread] = None
+        self._tasks: list[asyncio.Task] = []
+        # spawn：工作进程不继承事件循环和数据库连接
+        self._context = multiprocessing.get_context("spawn")
+
+    def start(self) -> None:
+        """启动进程池、调度任务和进度接收线程"""
+        if self._executor is not None:
+            return
+        self._progress = self._context.Queue()
+        self._executor = self._create_executor()
+        self._queue = asyncio.Queue(maxsize=self.queue_limit)
+        self._progress_thread = threading.Thread(target=self._receive_progress, name="inspection-progress", daemon=True)
+        self._progress_thread.start()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self._context, initializer=init_worker, initargs=(self._progress,)
+        )
+
+    async def stop(self) -> None:
+        """停止调度并关闭进程池（未完成的任务保持 queued / running 状态，可重新提交）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._progress is not None:
+            self._progress.put(None)
+            self._progress = None
+
+    def submit(self, job: InspectionJob) -> InspectionJob:
+        """入队；同一模型已在排队或执行中时返回已有任务"""
+        current = self.jobs.get(job.model_id)
+        if current is not None and current.status in ("queued", "running") and current.source == job.source:
+            return current
+        if self._queue is None:
+            raise RuntimeError("检查进程池未启动")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise InspectionQueueFull()
+        self.jobs[job.model_id] = job
+        self._trim_jobs()
+        return job
+
+    def get(self, model_id: UUID) -> Optional[InspectionJob]:
+        return self.jobs.get(model_id)
+
+    def stats(self) -> dict:
+        running = sum(1 for job in self.jobs.values() if job.status == "running")
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_limit": self.queue_limit,
+            "running": running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _trim_jobs(self) -> None:
+        finished = [k for k, job in self.jobs.items() if job.status in ("done", "failed")]
+        for model_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[model_id]
+
+    def _receive_progress(self) -> None:
+        queue = self._progress
+        while True:
+            message = queue.get()
+            if message is None:
+                return
+            job_id, done = message
+            job = self.jobs.get(UUID(job_id))
+            if job is not None and job.status == "running":
+                job.done_bytes = done
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                await self._save_status(job, "running", None)
+                result = await loop.run_in_executor(
+                    self._executor, run_inspection, str(job.model_id), job.segments, job.filename
+                )
+            except asyncio.CancelledError:
+                raise
+            except BrokenProcessPool:
+                # 工作进程异常退出（如内存不足被杀）：重建进程池，本任务记为失败
+                job.status, job.error = "failed", "检查进程异常退出"
+                self.failed += 1
+                logger.error("模型 %s 文件检查进程异常退出，重建进程池", job.model_id)
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor()
+                await self._save_status(job, "failed", {"error": job.error})
+            except Exception as exc:
+                job.status, job.error = "failed", str(exc) or exc.__class__.__name__
+                self.failed += 1
+                logger.warning("模型 %s 文件检查失败: %s", job.model_id, job.error)
+                await self._save_status(job, "failed", {"error": job.error})
+            else:
+                job.status = "done"
+                job.done_bytes = job.total_bytes
+                self.completed += 1
+                await self._save_result(job, result)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    def _where(self, job: InspectionJob):
+        # 文件在检查期间被替换时不写回旧结果
+        return (Model.id == job.model_id) & (Model.file_manifest == job.source)
+
+    async def _save_status(self, job: InspectionJob, status: str, inspection: Optional[dict]) -> None:
+        values = {"inspection_status": status, "updated_at": Model.updated_at}
+        if inspection is not None:
+            values.update(inspection=inspection, inspected_at=datetime.utcnow())
+        await self._write(job, values)
+
+    async def _save_result(self, job: InspectionJob, result: dict) -> None:
+        # 通过 ORM 写回：补全的格式 / 框架需要触发分面计数等 mapper 事件
+        try:
+            async with async_session_maker() as session:
+                model = (await session.execute(select(Model).where(self._where(job)))).scalar_one_or_none()
+                if model is None:
+                    return
+                model.inspection_status = "done"
+                model.inspection = {k: v for k, v in result.items() if k != "size"}
+                model.inspected_at = datetime.utcnow()
+                model.parameter_count = result.get("parameter_count")
+                # 大小和校验和以实际文件为准；格式、框架只补全未填写的值（检测结果保留在 inspection 中）
+                model.file_size = result["size"]
+                model.file_sha256 = result["sha256"]
+                model.file_format = model.file_format or result.get("format")
+                model.framework = model.framework or result.get("framework")
+                await session.commit()
+        except Exception:
+            logger.exception("模型 %s 检查结果写回失败", job.model_id)
+            return
+        await response_cache.invalidate_model(job.model_id)
+
+    async def _write(self, job: InspectionJob, values: dict) -> None:
+        try:
+            async with async_session_maker() as session:
+                await session.execute(update(Model).where(self._where(job)).values(values))
+                await session.commit()
+        except Exception:
+            logger.exception("模型 %s 检查状态写回失败", job.model_id)
+            return
+        await response_cache.invalidate_model(job.model_id)
+
+
+inspection_pool = InspectionPool(
+    workers=settings.INSPECTION_WORKERS,
+    queue_limit=settings.INSPECTION_QUEUE_LIMIT,
+)
+
+
+def mark_queued(model: Model) -> None:
+    """模型文件变更时清除旧的检查结果（在提交文件变更的同一事务中调用）"""
+    model.inspection_status = "queued"
+    model.inspection = None
+    model.parameter_count = None
+    model.inspected_at = None
+
+
+async def request_inspection(db: AsyncSession, model: Model) -> Optional[InspectionJob]:
+    """文件变更提交后提交检查任务；队列已满时把状态记为 pending，可稍后重新提交"""
+    source, segments = await model_segments(model)
+    # 格式检测依赖原始文件名的后缀（如 .onnx）
+    filename = model.file_name or f"{model.id}{model.file_format or ''}"
+    try:
+        return inspection_pool.submit(InspectionJob(model.id, source, filename, segments))
+    except InspectionQueueFull:
+        model.inspection_status = "pending"
+        await db.commit()
+        return None
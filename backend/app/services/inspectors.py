@@ -0,0 +1,457 @@
+"""模型文件检查（在工作进程中运行）
+
+只读取文件头部 / 元数据，张量数据一律跳过（seek），不会把整个文件读入内存：
+- safetensors：8 字节头长度 + JSON 头
+- ONNX：按 protobuf 线格式遍历 ModelProto / GraphProto，只解析 initializer 的名称、类型和形状
+- PyTorch（torch.save 的 zip 格式）：用受限的 Unpickler 读取 data.pkl，不执行任何代码
+同时流式计算整文件 sha256。
+
+文件可能是普通文件，也可能是分块存储中的多个分块（见 app.services.storage），
+统一用 SegmentReader 把分段拼接成一个可 seek 的只读文件对象。
+本模块不依赖应用配置和数据库，便于在进程池中导入。
+"""
+import hashlib
+import io
+import json
+import math
+import mmap
+import pickle
+import struct
+import zipfile
+from bisect import bisect_right
+from typing import Callable, Optional
+
+# sha256 每次读取的块大小和进度上报间隔
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 64 * 1024 * 1024
+
+# 小块读取（protobuf 字段头等）时的预读大小
+READ_AHEAD = 64 * 1024
+
+# 结果中最多保留的张量明细条数（参数量、类型统计仍按全部张量计算）
+MAX_TENSORS = 256
+
+# safetensors 头部 / PyTorch data.pkl 的大小上限
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+
+class InspectionError(Exception):
+    """文件格式无法识别或已损坏"""
+
+
+class SegmentReader(io.RawIOBase):
+    """把若干文件分段 (路径, 偏移, 长度) 拼接成一个可 seek 的只读文件"""
+
+    def __init__(self, segments: list[tuple[str, int, int]]):
+        self.segments = segments
+        self.starts = []
+        position = 0
+        for _, _, length in segments:
+            self.starts.append(position)
+            position += length
+        self.size = position
+        self.position = 0
+        self._files: dict[str, object] = {}
+        self._cache_start = 0
+        self._cache = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def read(self, size: int = -1) -> bytes:
+        """读取 size 字节（跨分段时拼接，只在文件末尾返回不足 size 的数据）"""
+        if size is None or size < 0:
+            size = self.size - self.position
+        parts = []
+        while size > 0:
+            data = super().read(size)
+            if not data:
+                break
+            parts.append(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        cached = self.position - self._cache_start
+        if not 0 <= cached < len(self._cache):
+            if len(buffer) >= READ_AHEAD:
+                data = self._read_segment(self.position, len(buffer))
+                buffer[:len(data)] = data
+                self.position += len(data)
+                return len(data)
+            self._cache_start, self._cache = self.position, self._read_segment(self.position, READ_AHEAD)
+            cached = 0
+        data = self._cache[cached:cached + len(buffer)]
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def _read_segment(self, position: int, count: int) -> bytes:
+        """从 position 所在的分段读取最多 count 字节（不跨分段）"""
+        index = bisect_right(self.starts, position) - 1
+        path, offset, length = self.segments[index]
+        inner = position - self.starts[index]
+        file = self._files.get(path)
+        if file is None:
+            file = self._files[path] = open(path, "rb")
+        file.seek(offset + inner)
+        return file.read(min(count, length - inner))
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        super().close()
+
+
+def sha256_file(reader: SegmentReader, progress: Optional[Callable[[int], None]] = None) -> str:
+    """流式计算 sha256；单个普通文件时用 mmap 避免额外拷贝"""
+    digest = hashlib.sha256()
+    done = reported = 0
+    if len(reader.segments) == 1 and reader.size:
+        path, offset, length = reader.segments[0]
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                while done < length:
+                    block = view[offset + done:offset + min(done + HASH_BLOCK_SIZE, length)]
+                    digest.update(block)
+                    block.release()
+                    done = min(done + HASH_BLOCK_SIZE, length)
+                    if progress and done - reported >= PROGRESS_INTERVAL:
+                        progress(done)
+                        reported = done
+            finally:
+                view.release()
+    else:
+        reader.seek(0)
+        while block := reader.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+            done += len(block)
+            if progress and done - reported >= PROGRESS_INTERVAL:
+                progress(done)
+                reported = done
+    if progress:
+        progress(done)
+    return digest.hexdigest()
+
+
+class TensorStats:
+    """张量统计：参数量、各类型参数量和前 MAX_TENSORS 个张量的形状"""
+
+    def __init__(self):
+        self.parameter_count = 0
+        self.tensor_count = 0
+        self.dtypes: dict[str, int] = {}
+        self.tensors: list[dict] = []
+
+    def add(self, name: str, dtype: str, shape: list[int]) -> None:
+        count = math.prod(shape)
+        self.parameter_count += count
+        self.tensor_count += 1
+        self.dtypes[dtype] = self.dtypes.get(dtype, 0) + count
+        if len(self.tensors) < MAX_TENSORS:
+            self.tensors.append({"name": name, "dtype": dtype, "shape": list(shape)})
+
+    def result(self, file_format: str, framework: Optional[str], **extra) -> dict:
+        return {
+            "format": file_format,
+            "framework": framework,
+            "parameter_count": self.parameter_count,
+            "tensor_count": self.tensor_count,
+            "dtypes": self.dtypes,
+            "tensors": self.tensors,
+            **extra,
+        }
+
+
+# ============ safetensors ============
+def inspect_safetensors(reader: SegmentReader) -> dict:
+    reader.seek(0)
+    (header_size,) = struct.unpack("<Q", reader.read(8))
+    if header_size > min(MAX_HEADER_SIZE, reader.size - 8):
+        raise InspectionError("safetensors 头部长度无效")
+    try:
+        header = json.loads(reader.read(header_size))
+    except ValueError:
+        raise InspectionError("safetensors 头部不是有效的 JSON")
+
+    stats = TensorStats()
+    metadata = header.pop("__metadata__", None) or {}
+    for name, info in header.items():
+        stats.add(name, info["dtype"].lower(), info["shape"])
+    return stats.result(".safetensors", None, metadata=metadata)
+
+
+# ============ ONNX ============
+# TensorProto.DataType
+ONNX_DTYPES = {
+    1: "float32", 2: "uint8", 3: "int8", 4: "uint16", 5: "int16", 6: "int32", 7: "int64",
+    8: "string", 9: "bool", 10: "float16", 11: "float64", 12: "uint32", 13: "uint64",
+    14: "complex64", 15: "complex128", 16: "bfloat16",
+}
+
+
+def _read_varint(reader: SegmentReader) -> int:
+    result = shift = 0
+    while True:
+        byte = reader.read(1)
+        if not byte:
+            raise InspectionError("protobuf 数据意外结束")
+        result |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return result
+        shift += 7
+        if shift > 63:
+            raise InspectionError("protobuf varint 无效")
+
+
+def _iter_fields(reader: SegmentReader, end: int):
+    """遍历 [当前位置, end) 内的字段，产出 (字段号, 线类型, 值)
+
+    长度分隔字段的值是其内容的结束位置，调用方读取或直接 seek 到该位置跳过。
+    """
+    while reader.tell() < end:
+        key = _read_varint(reader)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            yield number, wire_type, _read_varint(reader)
+        elif wire_type == 1:
+            reader.seek(8, io.SEEK_CUR)
+        elif wire_type == 2:
+            length = _read_varint(reader)
+            field_end = reader.tell() + length
+            if field_end > end:
+                raise InspectionError("protobuf 字段长度超出范围")
+            yield number, wire_type, field_end
+            reader.seek(field_end)
+        elif wire_type == 5:
+            reader.seek(4, io.SEEK_CUR)
+        else:
+            raise InspectionError(f"不支持的 protobuf 线类型 {wire_type}")
+
+
+def _read_onnx_tensor(reader: SegmentReader, end: int) -> tuple[str, str, list[int]]:
+    name, dtype, dims = "", 0, []
+    for number, wire_type, value in _iter_fields(reader, end):
+        if number == 1:  # dims（可能是 packed）
+            if wire_type == 0:
+                dims.append(value)
+            else:
+                while reader.tell() < value:
+                    dims.append(_read_varint(reader))
+        elif number == 2 and wire_type == 0:
+            dtype = value
+        elif number == 8 and wire_type == 2:
+            name = reader.read(value - reader.tell()).decode("utf-8", "replace")
+        # 其余字段（raw_data 等张量数据）由 _iter_fields 直接跳过
+    return name, ONNX_DTYPES.get(dtype, str(dtype)), dims
+
+
+def inspect_onnx(reader: SegmentReader) -> dict:
+    stats = TensorStats()
+    info: dict = {"opset": {}}
+    found_graph = False
+    reader.seek(0)
+    for number, wire_type, value in _iter_fields(reader, reader.size):
+        if number == 1 and wire_type == 0:
+            info["ir_version"] = value
+        elif number == 2 and wire_type == 2:
+            info["producer"] = reader.read(value - reader.tell()).decode("utf-8", "replace")
+        elif number == 8 and wire_type == 2:  # opset_import
+            domain, version = "", 0
+            for sub, sub_type, sub_value in _iter_fields(reader, value):
+                if sub == 1 and sub_type == 2:
+                    domain = reader.read(sub_value - reader.tell()).decode("utf-8", "replace")
+                elif sub == 2 and sub_type == 0:
+                    version = sub_value
+            info["opset"][domain or "ai.onnx"] = version
+        elif number == 7 and wire_type == 2:  # graph
+            found_graph = True
+            node_count = 0
+            for sub, sub_type, sub_value in _iter_fields(reader, value):
+                if sub == 1:
+                    node_count += 1
+                elif sub == 5 and sub_type == 2:  # initializer
+                    stats.add(*_read_onnx_tensor(reader, sub_value))
+            info["node_count"] = node_count
+    if not found_graph:
+        raise InspectionError("不是有效的 ONNX 模型")
+    return stats.result(".onnx", "onnx", **info)
+
+
+# ============ PyTorch ============
+# 旧式 Storage 类名 -> dtype
+TORCH_STORAGE_DTYPES = {
+    "FloatStorage": "float32", "DoubleStorage": "float64", "HalfStorage": "float16",
+    "BFloat16Storage": "bfloat16", "LongStorage": "int64", "IntStorage": "int32",
+    "ShortStorage": "int16", "CharStorage": "int8", "ByteStorage": "uint8", "BoolStorage": "bool",
+    "ComplexFloatStorage": "complex64", "ComplexDoubleStorage": "complex128",
+}
+
+
+class _TensorRef:
+    def __init__(self, dtype: str, shape: tuple):
+        self.dtype = dtype
+        self.shape = [int(d) for d in shape]
+
+
+class _Opaque:
+    """未知对象的占位：接受任意构造参数和状态，不执行任何代码"""
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+
+    def __setstate__(self, state):
+        self.state = state
+
+    def __setitem__(self, key, value):
+        pass
+
+    def append(self, value):
+        pass
+
+    def extend(self, values):
+        pass
+
+
+def _rebuild_tensor(storage, storage_offset, size, *args, **kwargs):
+    return _TensorRef(storage, size)
+
+
+def _rebuild_parameter(data, *args, **kwargs):
+    return data
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    """只识别张量重建函数和 Storage 类型，其余类一律替换为 _Opaque"""
+
+    def find_class(self, module: str, name: str):
+        if module == "collections" and name == "OrderedDict":
+            return dict
+        if module == "torch._utils" and name in ("_rebuild_tensor", "_rebuild_tensor_v2"):
+            return _rebuild_tensor
+        if module == "torch._utils" and name == "_rebuild_parameter":
+            return _rebuild_parameter
+        if module == "torch" and name in TORCH_STORAGE_DTYPES:
+            return TORCH_STORAGE_DTYPES[name]
+        return _Opaque
+
+    def persistent_load(self, pid):
+        # ('storage', storage_type, key, location, numel)
+        if isinstance(pid, tuple) and pid and pid[0] == "storage":
+            return pid[1] if isinstance(pid[1], str) else "unknown"
+        return None
+
+
+def _walk_tensors(obj, prefix: str, stats: TensorStats, depth: int = 0) -> None:
+    if depth > 32:
+        return
+    if isinstance(obj, _TensorRef):
+        stats.add(prefix, obj.dtype, obj.shape)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            _walk_tensors(value, f"{prefix}.{key}" if prefix else str(key), stats, depth + 1)
+    elif isinstance(obj, (list, tuple)):
+        for i, value in enumerate(obj):
+            _walk_tensors(value, f"{prefix}.{i}" if prefix else str(i), stats, depth + 1)
+
+
+def inspect_pytorch(reader: SegmentReader) -> dict:
+    reader.seek(0)
+    try:
+        archive = zipfile.ZipFile(reader)
+    except zipfile.BadZipFile:
+        raise InspectionError("不是 zip 格式的 PyTorch 文件（不支持旧版序列化格式）")
+    with archive:
+        pickles = [info for info in archive.infolist() if info.filename.endswith("/data.pkl")]
+        if not pickles:
+            raise InspectionError("zip 中没有 data.pkl，不是 PyTorch 文件")
+        if pickles[0].file_size > MAX_HEADER_SIZE:
+            raise InspectionError("data.pkl 过大")
+        with archive.open(pickles[0]) as f:
+            try:
+                obj = _RestrictedUnpickler(f).load()
+            except InspectionError:
+                raise
+            except Exception as exc:
+                raise InspectionError(f"data.pkl 解析失败: {exc}")
+    stats = TensorStats()
+    if isinstance(obj, dict) and isinstance(obj.get("state_dict"), dict):
+        obj = obj["state_dict"]
+    _walk_tensors(obj, "", stats)
+    return stats.result(".pt", "pytorch")
+
+
+# ============ 入口 ============
+def detect_format(reader: SegmentReader, filename: str) -> Optional[str]:
+    reader.seek(0)
+    head = reader.read(9)
+    if head.startswith(b"PK\x03\x04"):
+        return "pytorch"
+    if len(head) == 9 and head[8:9] == b"{":
+        return "safetensors"
+    if filename.lower().endswith(".onnx"):
+        return "onnx"
+    return None
+
+
+INSPECTORS = {
+    "safetensors": inspect_safetensors,
+    "onnx": inspect_onnx,
+    "pytorch": inspect_pytorch,
+}
+
+
+def inspect_file(
+    segments: list[tuple[str, int, int]],
+    filename: str = "",
+    progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """检查文件：sha256 + 按格式解析张量信息（格式未知时只返回 sha256 和大小）"""
+    reader = SegmentReader(segments)
+    try:
+        result = {"size": reader.size, "sha256": sha256_file(reader, progress)}
+        kind = detect_format(reader, filename)
+        if kind is None:
+            return {**result, "format": None, "framework": None, "parameter_count": None}
+        try:
+            return {**result, **INSPECTORS[kind](reader)}
+        except (struct.error, KeyError, TypeError, ValueError, EOFError) as exc:
+            raise InspectionError(f"{kind} 文件解析失败: {exc}")
+    finally:
+        reader.close()
+
+
+# ============ 工作进程 ============
+_progress_queue = None
+
+
+def init_worker(progress_queue) -> None:
+    """进程池初始化：记录进度上报队列"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def run_inspection(job_id: str, segments: list[tuple[str, int, int]], filename: str) -> dict:
+    """进程池任务入口：检查文件并通过队列上报已处理的字节数"""
+    def report(done: int) -> None:
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, done))
+    return inspect_file(segments, filename, report)
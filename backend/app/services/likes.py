@@ -0,0 +1,113 @@
+"""点赞服务
+
+点赞 / 取消点赞与 likes_count 的调整在同一条语句中完成（PostgreSQL 使用可写 CTE）；
+SQLite 在同一个事务中先执行 INSERT … ON CONFLICT DO NOTHING RETURNING（或 DELETE … RETURNING），
+再按返回的行数调整计数。(model_id, user_id) 唯一约束保证并发下不会重复点赞。
+"""
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import Uuid, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import Like, Model
+from app.services import trending
+
+
+def _adjust_count(model_id: UUID, delta, score_delta):
+    """调整点赞计数和热度并返回新的点赞数（计数变化不更新 updated_at）"""
+    return (
+        update(Model)
+        .where(Model.id == model_id)
+        .values(
+            likes_count=Model.likes_count + delta,
+            trending_score=trending.score_after(score_delta),
+            updated_at=Model.updated_at,
+        )
+        .returning(Model.likes_count)
+    )
+
+
+def _insert_like(dialect_insert, model_id: UUID, user_id: UUID):
+    """插入点赞（模型不存在或已点赞时不插入），返回插入的行"""
+    return (
+        dialect_insert(Like)
+        .from_select(
+            ["id", "model_id", "user_id", "created_at"],
+            select(
+                literal(uuid.uuid4(), Uuid),
+                Model.id,
+                literal(user_id, Uuid),
+                literal(datetime.utcnow()),
+            ).where(Model.id == model_id),
+        )
+        .on_conflict_do_nothing(index_elements=["model_id", "user_id"])
+        .returning(Like.id)
+    )
+
+
+async def add_like(db: AsyncSession, model_id: UUID, user_id: UUID) -> Optional[int]:
+    """点赞（幂等），返回新的点赞数；模型不存在时返回 None"""
+    if db.bind.dialect.name == "postgresql":
+        inserted = _insert_like(pg_insert, model_id, user_id).cte("inserted")
+        delta = select(func.count()).select_from(inserted).scalar_subquery()
+        score_delta = trending.increment("likes", delta)
+        result = await db.execute(_adjust_count(model_id, delta, score_delta).add_cte(inserted))
+        count = result.scalar_one_or_none()
+        await db.commit()
+        return count
+
+    inserted = (await db.execute(_insert_like(sqlite_insert, model_id, user_id))).first()
+    delta = 1 if inserted else 0
+    return await _finish(db, model_id, delta, trending.increment("likes", delta))
+
+
+async def remove_like(db: AsyncSession, model_id: UUID, user_id: UUID) -> Optional[int]:
+    """取消点赞（幂等），返回新的点赞数；模型不存在时返回 None
+
+    热度按点赞发生的时间扣减，恰好抵消这次点赞当初加上的分数。
+    """
+    condition = (Like.model_id == model_id) & (Like.user_id == user_id)
+    weight = settings.TRENDING_WEIGHTS.get("likes", 0.0)
+    if db.bind.dialect.name == "postgresql":
+        deleted = delete(Like).where(condition).returning(Like.id, Like.created_at).cte("deleted")
+        delta = select(func.count()).select_from(deleted).scalar_subquery()
+        contribution = (
+            select(func.coalesce(func.sum(weight * trending.growth_column(deleted.c.created_at)), 0.0))
+            .scalar_subquery()
+        )
+        result = await db.execute(_adjust_count(model_id, -delta, -contribution).add_cte(deleted))
+        count = result.scalar_one_or_none()
+        await db.commit()
+        return count
+
+    created_at = (await db.execute(delete(Like).where(condition).returning(Like.created_at))).scalar_one_or_none()
+    if created_at is None:
+        return await _finish(db, model_id, 0, 0.0)
+    return await _finish(db, model_id, -1, trending.increment("likes", -1, at=created_at))
+
+
+async def _finish(db: AsyncSession, model_id: UUID, delta: int, score_delta: float) -> Optional[int]:
+    """SQLite：在点赞 / 取消点赞的同一事务中调整计数，模型不存在时回滚"""
+    count = (await db.execute(_adjust_count(model_id, delta, score_delta))).scalar_one_or_none()
+    if count is None:
+        await db.rollback()
+    else:
+        await db.commit()
+    return count
+
+
+async def liked_model_ids(db: AsyncSession, user_id: UUID, model_ids: Iterable[UUID]) -> set[UUID]:
+    """返回给定模型中用户已点赞的部分（走 (model_id, user_id) 唯一索引）"""
+    model_ids = list(model_ids)
+    if not model_ids:
+        return set()
+    result = await db.execute(
+        select(Like.model_id).where(Like.user_id == user_id, Like.model_id.in_(model_ids))
+    )
+    return set(result.scalars().all())
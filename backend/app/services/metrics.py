@@ -0,0 +1,256 @@
+"""请求与数据库指标（Prometheus 文本格式）
+
+- MetricsMiddleware（纯 ASGI）按路由模板 / 方法 / 状态码记录请求耗时直方图，
+  并记录每个请求执行的 SQL 语句数和数据库耗时。
+- SQLAlchemy 游标事件注册在 Engine 类上，覆盖主库和只读副本；语句耗时累加到当前请求的
+  RequestStats（通过 contextvars 传递，greenlet 中同样可见）。这是进程内唯一的语句计时钩子，
+  剖析器等通过 registry.add_statement_observer 复用同一次计时。
+- 直方图的桶在创建时确定，记录一次只是一次二分查找和几次加法；所有请求在同一事件循环线程中
+  处理，热路径上没有锁。
+
+render() 输出 /metrics 的内容，连接池指标来自 app.database.database_stats()；
+其他模块（响应缓存等）通过 registry.add_collector 注册自己的指标。
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+# 路由未匹配（404 等）时使用的标签，避免按原始路径产生无界的标签组合
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """固定分桶的直方图（桶为上界，最后隐含 +Inf）"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels.rstrip(',')}}} {self.sum}"
+        yield f"{name}_count{{{labels.rstrip(',')}}} {self.count}"
+
+
+class RequestStats:
+    """单个请求的数据库统计"""
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class MetricsRegistry:
+    """按标签组合保存直方图和计数"""
+
+    def __init__(self, latency_buckets, statement_buckets, db_time_buckets):
+        self.latency_buckets = tuple(latency_buckets)
+        self.statement_buckets = tuple(statement_buckets)
+        self.db_time_buckets = tuple(db_time_buckets)
+        self.latency: dict[tuple[str, str, str], Histogram] = {}
+        self.statements: dict[tuple[str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+        # 请求之外（后台任务、计数器写回等）执行的语句
+        self.background_statements = 0
+        self.background_db_time = 0.0
+        self.collectors: list[Callable[[], Iterable[str]]] = []
+        self.statement_observers: list[Callable[..., None]] = []
+
+    def add_collector(self, collect: Callable[[], Iterable[str]]) -> None:
+        """注册额外的指标来源（render 时调用，返回 Prometheus 文本行）"""
+        self.collectors.append(collect)
+
+    def add_statement_observer(self, observe: Callable[..., None]) -> None:
+        """每条语句执行后调用 observe(conn, statement, parameters, elapsed, rows, executemany)"""
+        self.statement_observers.append(observe)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route, str(status))
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(self.latency_buckets)
+        histogram.observe(seconds)
+
+        key = (method, route)
+        histogram = self.statements.get(key)
+        if histogram is None:
+            histogram = self.statements[key] = Histogram(self.statement_buckets)
+            self.db_time[key] = Histogram(self.db_time_buckets)
+        histogram.observe(stats.statements)
+        self.db_time[key].observe(stats.db_time)
+
+    def render(self, database: Optional[dict] = None) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds 请求耗时",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}",'
+            lines.extend(histogram.samples("http_request_duration_seconds", labels))
+
+        lines += [
+            "# HELP http_request_db_statements 每个请求执行的 SQL 语句数",
+            "# TYPE http_request_db_statements histogram",
+        ]
+        for (method, route), histogram in sorted(self.statements.items()):
+            lines.extend(histogram.samples("http_request_db_statements", f'method="{method}",route="{_escape(route)}",'))
+
+        lines += [
+            "# HELP http_request_db_seconds 每个请求的数据库耗时",
+            "# TYPE http_request_db_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.db_time.items()):
+            lines.extend(histogram.samples("http_request_db_seconds", f'method="{method}",route="{_escape(route)}",'))
+
+        lines += [
+            "# HELP http_requests_in_flight 正在处理的请求数",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP db_background_statements_total 请求之外执行的 SQL 语句数",
+            "# TYPE db_background_statements_total counter",
+            f"db_background_statements_total {self.background_statements}",
+            "# HELP db_background_seconds_total 请求之外的数据库耗时",
+            "# TYPE db_background_seconds_total counter",
+            f"db_background_seconds_total {self.background_db_time:.6f}",
+        ]
+        for collect in self.collectors:
+            lines.extend(collect())
+        if database is not None:
+            lines.extend(_pool_samples(database))
+        return "\n".join(lines) + "\n"
+
+
+# 连接池指标：database_stats() 中的字段 -> (指标名, 类型, 说明)
+POOL_METRICS = {
+    "size": ("db_pool_size", "gauge", "连接池大小"),
+    "checked_out": ("db_pool_checked_out", "gauge", "已借出的连接数"),
+    "overflow": ("db_pool_overflow", "gauge", "超出 pool_size 的连接数"),
+    "checkouts": ("db_pool_checkouts_total", "counter", "借出连接次数"),
+    "timeouts": ("db_pool_timeouts_total", "counter", "等待连接超时次数"),
+    "connects": ("db_pool_connects_total", "counter", "新建连接次数"),
+    "invalidated": ("db_pool_invalidated_total", "counter", "失效连接数"),
+    "wait_max_ms": ("db_pool_wait_max_milliseconds", "gauge", "获取连接的最长等待时间"),
+}
+
+
+def _pool_samples(database: dict) -> Iterable[str]:
+    for field, (name, kind, help_text) in POOL_METRICS.items():
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} {kind}"
+        for pool in database["pools"]:
+            if pool.get(field) is not None:
+                yield f'{name}{{engine="{pool["name"]}"}} {pool[field]}'
+    routing = database["routing"]
+    yield "# HELP db_replica_fallbacks_total 只读请求回退主库的次数"
+    yield "# TYPE db_replica_fallbacks_total counter"
+    yield f"db_replica_fallbacks_total {routing['fallbacks']}"
+
+
+def metric_lines(name: str, kind: str, help_text: str, samples: dict[str, float]) -> list[str]:
+    """一个指标的 HELP / TYPE 行和样本；samples 的键为标签串（如 'result="hit"'，无标签时为空串）"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples.items():
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = MetricsRegistry(
+    settings.METRICS_LATENCY_BUCKETS,
+    settings.METRICS_STATEMENT_BUCKETS,
+    settings.METRICS_DB_TIME_BUCKETS,
+)
+
+
+# ============ SQLAlchemy 事件 ============
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _request_stats.get()
+    if stats is None:
+        registry.background_statements += 1
+        registry.background_db_time += elapsed
+    else:
+        stats.statements += 1
+        stats.db_time += elapsed
+    for observe in registry.statement_observers:
+        observe(conn, statement, parameters, elapsed, cursor.rowcount, executemany)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # 出错的语句不会触发 after_cursor_execute，丢弃其开始时间
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+# ============ ASGI 中间件 ============
+class MetricsMiddleware:
+    """记录每个 HTTP 请求的耗时、状态码和数据库统计"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+        registry.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_flight -= 1
+            _request_stats.reset(token)
+            # 路由匹配后 FastAPI 会把 route 写入 scope，使用路径模板作为标签
+            route = scope.get("route")
+            registry.observe_request(
+                scope["method"],
+                getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status_code,
+                time.perf_counter() - start,
+                stats,
+            )
@@ -0,0 +1,147 @@
+"""数据库结构迁移（PostgreSQL / SQLite 通用，可重复执行）
+
+init_db（create_all）只创建不存在的表，不会修改已有的表。migrate 对照当前的模型定义补齐已有数据库：
+1. 创建新表：model_tags、facet_counts、storage_manifests、storage_chunks
+2. 给 models 补列（NOT NULL 列带默认值，已有行按默认值填充）
+3. likes 去重（同一用户对同一模型保留最早的一条）并按实际行数修正 likes_count，
+   再加唯一约束 uq_likes_model_user（SQLite 不能给已有的表加约束，改建同名唯一索引）
+4. 补建索引（GIN 索引只在 PostgreSQL 上创建）
+5. 有结构变更时回填：summary、标签规范化、搜索词元、评分聚合、分面计数、热度分数
+
+用法（在 backend 目录下）：python -m app.cli migrate
+"""
+import logging
+
+from sqlalchemy import Connection, delete, func, inspect, literal, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import AddConstraint, Column, CreateIndex
+
+from app.models.models import (
+    SUMMARY_LENGTH,
+    Comment,
+    FacetCount,
+    Like,
+    Model,
+    ModelTag,
+    StorageChunk,
+    StorageManifest,
+)
+from app.services.facets import rebuild_facet_counts
+from app.services.ratings import rebuild_rating_aggregates
+from app.services.search import rebuild_search_documents
+from app.services.tags import normalize_existing_tags
+from app.services.trending import rebuild_trending_scores
+
+logger = logging.getLogger(__name__)
+
+NEW_TABLES = (ModelTag, FacetCount, StorageManifest, StorageChunk)
+LIKES_UNIQUE = ("model_id", "user_id")
+
+# 结构变更后依次执行的回填（均为全量重算，可重复执行）
+BACKFILLS = (
+    normalize_existing_tags,
+    rebuild_search_documents,
+    rebuild_rating_aggregates,
+    rebuild_facet_counts,
+    rebuild_trending_scores,
+)
+
+
+def _column_ddl(column: Column, connection: Connection) -> str:
+    """ADD COLUMN 的列定义（NOT NULL 列以 Python 端默认值作为 DEFAULT，填充已有行）"""
+    dialect = connection.dialect
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    if not column.nullable:
+        default = literal(column.default.arg, column.type)
+        ddl += f" DEFAULT {default.compile(dialect=dialect, compile_kwargs={'literal_binds': True})} NOT NULL"
+    return ddl
+
+
+def _has_likes_unique(connection: Connection) -> bool:
+    inspector = inspect(connection)
+    wanted = set(LIKES_UNIQUE)
+    if any(set(c["column_names"]) == wanted for c in inspector.get_unique_constraints("likes")):
+        return True
+    return any(i["unique"] and set(i["column_names"]) == wanted for i in inspector.get_indexes("likes"))
+
+
+def _dedupe_likes(connection: Connection) -> int:
+    """删除重复点赞（保留最早的一条），有删除时按 likes 表重算 likes_count，返回删除的行数"""
+    likes, models = Like.__table__, Model.__table__
+    ranked = select(
+        likes.c.id,
+        func.row_number()
+        .over(partition_by=(likes.c.model_id, likes.c.user_id), order_by=(likes.c.created_at, likes.c.id))
+        .label("rn"),
+    ).subquery()
+    removed = connection.execute(
+        delete(likes).where(likes.c.id.in_(select(ranked.c.id).where(ranked.c.rn > 1)))
+    ).rowcount
+    if removed:
+        connection.execute(
+            update(models).values(
+                likes_count=select(func.count()).where(likes.c.model_id == models.c.id).scalar_subquery(),
+                updated_at=models.c.updated_at,
+            )
+        )
+    return removed
+
+
+def _upgrade_schema(connection: Connection) -> list[str]:
+    """执行缺少的结构变更，返回已执行步骤的说明"""
+    applied = []
+    dialect = connection.dialect.name
+
+    tables = set(inspect(connection).get_table_names())
+    for model in NEW_TABLES:
+        if model.__tablename__ not in tables:
+            model.__table__.create(connection)
+            applied.append(f"创建表 {model.__tablename__}")
+
+    columns = {c["name"] for c in inspect(connection).get_columns("models")}
+    for column in Model.__table__.columns:
+        if column.name not in columns:
+            connection.execute(text(f"ALTER TABLE models ADD COLUMN {_column_ddl(column, connection)}"))
+            applied.append(f"添加列 models.{column.name}")
+
+    if not _has_likes_unique(connection):
+        removed = _dedupe_likes(connection)
+        if dialect == "sqlite":
+            connection.execute(text(f"CREATE UNIQUE INDEX uq_likes_model_user ON likes ({', '.join(LIKES_UNIQUE)})"))
+        else:
+            constraint = next(c for c in Like.__table__.constraints if c.name == "uq_likes_model_user")
+            connection.execute(AddConstraint(constraint))
+        applied.append(f"删除 {removed} 条重复点赞并添加唯一约束 uq_likes_model_user")
+
+    for table in (Model.__table__, Comment.__table__):
+        indexes = {i["name"] for i in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in indexes:
+                continue
+            if index.dialect_kwargs.get("postgresql_using") and dialect != "postgresql":
+                continue
+            connection.execute(CreateIndex(index))
+            applied.append(f"创建索引 {index.name}")
+    return applied
+
+
+async def migrate(db: AsyncSession) -> int:
+    """把已有数据库补齐到当前模型定义，有变更时回填派生列，返回执行的结构变更数"""
+    connection = await db.connection()
+    applied = await connection.run_sync(_upgrade_schema)
+    await db.commit()
+    for step in applied:
+        logger.info("迁移：%s", step)
+    if not applied:
+        return 0
+
+    await db.execute(
+        update(Model)
+        .where(Model.summary.is_(None), Model.description.is_not(None))
+        .values(summary=func.substr(Model.description, 1, SUMMARY_LENGTH), updated_at=Model.updated_at)
+    )
+    await db.commit()
+    for backfill in BACKFILLS:
+        count = await backfill(db)
+        logger.info("回填 %s：%d 行", backfill.__name__, count)
+    return len(applied)
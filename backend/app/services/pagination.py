@@ -0,0 +1,97 @@
+"""分页工具（游标分页 / 总数估算）"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN 语句（保留原查询的绑定参数）"""
+    inherit_cache = False
+
+    def __init__(self, statement, options: str = "FORMAT JSON"):
+        self.statement = statement
+        self.options = options
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return f"EXPLAIN ({element.options}) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(sort: str, value: Any, row_id: UUID) -> str:
+    """把排序键和 id 编码为不透明游标"""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps({"s": sort, "v": value, "id": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, sort_column) -> tuple[Any, UUID]:
+    """解析游标，返回 (排序键, id)；排序键的类型须与 sort_column 一致，否则返回 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        value = _cursor_value(payload["v"], _value_type(sort_column))
+        row_id = UUID(payload["id"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    if payload.get("s") != sort:
+        raise HTTPException(status_code=400, detail="分页游标与排序方式不匹配")
+    return value, row_id
+
+
+def _value_type(sort_column) -> type:
+    """排序列的 Python 类型；无法确定类型的表达式（如相关度得分）按数值处理"""
+    try:
+        return sort_column.type.python_type
+    except NotImplementedError:
+        return float
+
+
+def _cursor_value(value: Any, value_type: type) -> Any:
+    if value_type is datetime:
+        return datetime.fromisoformat(value["dt"])
+    if isinstance(value, bool):
+        raise TypeError("cursor value")
+    if value_type is int and isinstance(value, int):
+        return value
+    if value_type is float and isinstance(value, (int, float)):
+        return value
+    if value_type is str and isinstance(value, str):
+        return value
+    raise TypeError("cursor value")
+
+
+def keyset_after(query, sort_column, id_column, value: Any, row_id: UUID):
+    """追加“位于游标之后”的条件（按 (排序键, id) 降序）
+
+    使用行值比较，可以直接在 (排序键, id) 复合索引上做范围扫描。
+    """
+    return query.where(tuple_(sort_column, id_column) < tuple_(value, row_id))
+
+
+async def count_rows(db: AsyncSession, query, mode: str) -> Optional[int]:
+    """按模式统计总数：exact 精确统计，estimate 用规划器估算，none 不统计"""
+    if mode == "none":
+        return None
+    if mode == "estimate" and db.bind.dialect.name == "postgresql":
+        return await estimate_rows(db, query)
+    count_query = select(func.count()).select_from(query.order_by(None).subquery())
+    return (await db.execute(count_query)).scalar()
+
+
+async def estimate_rows(db: AsyncSession, query) -> int:
+    """读取 PostgreSQL 规划器对查询结果行数的估算（不执行查询）"""
+    result = await db.execute(Explain(query.order_by(None)))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
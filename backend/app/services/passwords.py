@@ -0,0 +1,123 @@
+"""密码哈希工作池
+
+bcrypt 计算会阻塞事件循环，这里把它放到独立线程池执行（bcrypt 在计算时释放 GIL），
+并限制排队长度：队列已满时直接拒绝，由调用方返回 503。
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.config import settings
+from app.services.metrics import metric_lines, registry as metrics_registry
+
+T = TypeVar("T")
+
+
+class PoolSaturated(Exception):
+    """工作池排队已满"""
+
+
+class LatencyWindow:
+    """最近 N 次耗时的滑动窗口，按需计算分位数"""
+
+    def __init__(self, size: int = 1024):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentiles(self, *quantiles: float) -> dict[str, float]:
+        """返回各分位数（毫秒），无样本时为 0"""
+        ordered = sorted(self._samples)
+        result = {}
+        for q in quantiles:
+            key = f"p{round(q * 100)}"
+            if not ordered:
+                result[key] = 0.0
+                continue
+            index = min(len(ordered) - 1, int(q * len(ordered)))
+            result[key] = round(ordered[index] * 1000, 3)
+        return result
+
+
+class PasswordWorkPool:
+    """有界的密码哈希线程池"""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rejected = 0
+        self._inflight = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self.wait_latency = LatencyWindow()
+        self.hash_latency = LatencyWindow()
+
+    @property
+    def inflight(self) -> int:
+        """正在执行和排队中的任务数"""
+        return self._inflight
+
+    async def run(self, fn: Callable[..., T], *args) -> tuple[T, float]:
+        """在线程池中执行 fn，返回 (结果, 哈希耗时秒数)"""
+        if self._inflight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise PoolSaturated()
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            value = fn(*args)
+            return value, started, time.perf_counter()
+
+        self._inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            value, started, finished = await loop.run_in_executor(self._executor, timed)
+        finally:
+            self._inflight -= 1
+
+        self.wait_latency.add(started - submitted)
+        self.hash_latency.add(finished - started)
+        return value, finished - started
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "inflight": self._inflight,
+            "rejected": self.rejected,
+            "queue_wait_ms": self.wait_latency.percentiles(0.5, 0.95, 0.99),
+            "hash_ms": self.hash_latency.percentiles(0.5, 0.95, 0.99),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordWorkPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+
+
+def _password_pool_metrics():
+    stats = password_pool.stats()
+    lines = [
+        *metric_lines("password_hash_inflight", "gauge", "排队和执行中的密码哈希任务数", {"": stats["inflight"]}),
+        *metric_lines("password_hash_rejected_total", "counter", "队列已满被拒绝的密码哈希任务数", {"": stats["rejected"]}),
+    ]
+    for name, key, help_text in (
+        ("password_hash_queue_wait_ms", "queue_wait_ms", "密码哈希任务排队耗时分位数（毫秒，最近的样本）"),
+        ("password_hash_duration_ms", "hash_ms", "密码哈希计算耗时分位数（毫秒，最近的样本）"),
+    ):
+        lines.extend(metric_lines(
+            name, "gauge", help_text,
+            {f'quantile="{int(q[1:]) / 100}"': value for q, value in stats[key].items()},
+        ))
+    return lines
+
+
+metrics_registry.add_collector(_password_pool_metrics)
@@ -0,0 +1,97 @@
+"""数据库连接池指标
+
+每个引擎（主库 / 各只读副本）一份：当前借出的连接数、峰值、获取连接的等待时间、
+超时次数、新建连接数和溢出连接数，用于按数据库（如 Supabase）的连接数上限确定
+worker 数量和连接池大小。
+"""
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class PoolMetrics:
+    """单个连接池的累计指标"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[AsyncEngine] = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.acquires = 0  # 获取连接的次数（含失败）
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.acquires += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self) -> dict:
+        pool = self.engine.sync_engine.pool if self.engine is not None else None
+        size = pool.size() if hasattr(pool, "size") else None
+        overflow = pool.overflow() if hasattr(pool, "overflow") else None
+        return {
+            "name": self.name,
+            "pool": pool.__class__.__name__ if pool is not None else None,
+            "size": size,
+            "checked_out": self.in_use,
+            "peak_checked_out": self.peak_in_use,
+            # QueuePool 的 overflow() 在未用满 pool_size 时为负数，这里只统计实际的溢出连接
+            "overflow": max(overflow, 0) if overflow is not None else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidated": self.invalidated,
+            "wait_avg_ms": round(self.wait_total / self.acquires * 1000, 3) if self.acquires else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+class _MeteredPool:
+    """记录获取连接耗时（含排队等待和新建连接）的连接池"""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - start)
+
+
+def metered_pool_class(poolclass, metrics: PoolMetrics):
+    """带指标的连接池类（dispose 重建连接池时沿用同一个类，指标不丢失）"""
+    return type(f"Metered{poolclass.__name__}", (_MeteredPool, poolclass), {"metrics": metrics})
+
+
+def instrument(engine: AsyncEngine, metrics: PoolMetrics) -> None:
+    """在引擎的连接池上注册借出 / 归还 / 新建 / 失效事件"""
+    metrics.engine = engine
+    target = engine.sync_engine
+
+    @event.listens_for(target, "connect")
+    def _connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(target, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+        metrics.in_use += 1
+        metrics.peak_in_use = max(metrics.peak_in_use, metrics.in_use)
+
+    @event.listens_for(target, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        metrics.in_use = max(metrics.in_use - 1, 0)
+
+    @event.listens_for(target, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception: Optional[BaseException]):
+        metrics.invalidated += 1
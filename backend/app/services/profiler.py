@@ -0,0 +1,351 @@
+"""按请求的 SQL 剖析、慢查询日志与 EXPLAIN 采样
+
+- 剖析：请求带 X-Profile 头（同时需要管理令牌 X-Admin-Token）或按 PROFILER_SAMPLE_RATE 随机抽中时，
+  记录该请求执行的每条语句及耗时，响应头 X-Profile-Id 给出剖析记录 id，可在管理接口中查看。
+- 慢查询：任何语句超过 SLOW_QUERY_THRESHOLD_MS 时写入 app.slow_query 日志，
+  并按规范化后的 SQL 指纹（字面量、参数占位符、IN 列表归一）聚合次数和耗时。
+- EXPLAIN：慢查询中按 EXPLAIN_SAMPLE_RATE 抽样，由后台任务在新连接上以只读事务执行
+  EXPLAIN (ANALYZE, BUFFERS)，不占用原请求的时间。只对 PostgreSQL 的 SELECT 执行
+  （ANALYZE 会真正执行语句），同一指纹在 EXPLAIN_INTERVAL 秒内只执行一次。
+
+语句耗时来自 app.services.metrics 的计时钩子（Profiler.observe 注册为其观察者），不重复计时。
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.services.auth import is_admin_token
+from app.services.metrics import registry as metrics_registry
+from app.services.serialization import loads
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_query")
+
+# 剖析记录中保存的语句最大长度
+MAX_STATEMENT_LENGTH = 4000
+# 单个请求最多记录的语句数（超出后只计数）
+MAX_PROFILE_STATEMENTS = 1000
+# 同一指纹两次 EXPLAIN 的最小间隔（秒）
+EXPLAIN_INTERVAL = 300.0
+# 等待执行的 EXPLAIN 任务上限
+EXPLAIN_QUEUE_LIMIT = 20
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\?(?:\.\.\.)?\))(?:\s*,\s*\([?,\s.]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> tuple[str, str]:
+    """SQL 指纹：(摘要, 规范化语句)，参数值不同的同一语句得到相同指纹"""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    sql = _VALUES_LIST.sub(r"\1", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return hashlib.blake2b(sql.encode(), digest_size=8).hexdigest(), sql
+
+
+class QueryRecord:
+    """剖析中的一条语句"""
+    __slots__ = ("fingerprint", "statement", "duration", "rows", "offset")
+
+    def __init__(self, statement: str, duration: float, rows: int, offset: float):
+        self.fingerprint = fingerprint(statement)[0]
+        self.statement = statement[:MAX_STATEMENT_LENGTH]
+        self.duration = duration
+        self.rows = rows
+        self.offset = offset  # 相对请求开始的时间
+
+    def as_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "duration_ms": round(self.duration * 1000, 3),
+            "rows": self.rows,
+            "offset_ms": round(self.offset * 1000, 3),
+        }
+
+
+class RequestProfile:
+    """一个请求的剖析记录"""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason  # header / sample
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.statements: list[QueryRecord] = []
+        self.dropped = 0
+
+    def add(self, statement: str, duration: float, rows: int) -> None:
+        if len(self.statements) >= MAX_PROFILE_STATEMENTS:
+            self.dropped += 1
+            return
+        offset = time.perf_counter() - self.start - duration
+        self.statements.append(QueryRecord(statement, duration, rows, offset))
+
+    def summary(self) -> dict:
+        db_time = sum(q.duration for q in self.statements)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "db_time_ms": round(db_time * 1000, 3),
+            "statement_count": len(self.statements) + self.dropped,
+        }
+
+    def as_dict(self) -> dict:
+        data = self.summary()
+        data["statements"] = [q.as_dict() for q in self.statements]
+        return data
+
+
+class SlowQuery:
+    """按指纹聚合的慢查询"""
+    __slots__ = ("fingerprint", "sql", "count", "total", "max", "last_seen", "last_path")
+
+    def __init__(self, digest: str, sql: str):
+        self.fingerprint = digest
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_seen = 0.0
+        self.last_path: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "last_seen": self.last_seen,
+            "last_path": self.last_path,
+        }
+
+
+# 当前请求的剖析记录（未剖析时为 None）和请求标识（慢查询日志用）
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+_request_path: ContextVar[Optional[str]] = ContextVar("request_path", default=None)
+
+
+class Profiler:
+    """剖析记录、慢查询聚合和 EXPLAIN 结果（均只保存在本进程内存中）"""
+
+    def __init__(self):
+        self.sample_rate = settings.PROFILER_SAMPLE_RATE
+        self.slow_threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.explain_rate = settings.EXPLAIN_SAMPLE_RATE
+        self.explain_timeout_ms = settings.EXPLAIN_TIMEOUT_MS
+        self.max_fingerprints = settings.SLOW_QUERY_MAX_FINGERPRINTS
+        self.profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+        self.max_profiles = settings.PROFILER_MAX_PROFILES
+        self.slow_queries: OrderedDict[str, SlowQuery] = OrderedDict()
+        self.plans: deque[dict] = deque(maxlen=settings.EXPLAIN_MAX_PLANS)
+        self._explained_at: dict[str, float] = {}
+        self._async_engines: dict[Engine, AsyncEngine] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- 请求 ----------
+    def begin(self, scope) -> Optional[RequestProfile]:
+        """按请求头或采样率决定是否剖析该请求"""
+        headers = dict(scope["headers"]) if settings.ADMIN_TOKEN else {}
+        if b"x-profile" in headers and is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            reason = "header"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            reason = "sample"
+        else:
+            return None
+        return RequestProfile(scope["method"], scope["path"], reason)
+
+    def finish(self, profile: RequestProfile, route: Optional[str], status: int) -> None:
+        profile.duration = time.perf_counter() - profile.start
+        profile.route = route
+        profile.status = status
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+
+    # ---------- 语句 ----------
+    def observe(self, conn, statement: str, parameters, elapsed: float, rows: int, executemany: bool) -> None:
+        profile = _profile.get()
+        if profile is not None:
+            profile.add(statement, elapsed, rows)
+        if self.slow_threshold and elapsed >= self.slow_threshold:
+            self._record_slow(conn, statement, parameters, elapsed, executemany)
+
+    def _record_slow(self, conn, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+        digest, sql = fingerprint(statement)
+        if sql[:7].upper() == "EXPLAIN":
+            return
+        path = _request_path.get()
+        slow_query_logger.warning("慢查询 %.1fms [%s] %s %s", elapsed * 1000, digest, path or "-", sql)
+
+        entry = self.slow_queries.get(digest)
+        if entry is None:
+            entry = self.slow_queries[digest] = SlowQuery(digest, sql)
+            while len(self.slow_queries) > self.max_fingerprints:
+                self.slow_queries.popitem(last=False)
+        else:
+            self.slow_queries.move_to_end(digest)
+        entry.count += 1
+        entry.total += elapsed
+        entry.max = max(entry.max, elapsed)
+        entry.last_seen = time.time()
+        entry.last_path = path
+
+        if self._should_explain(conn, sql, digest, executemany):
+            self._explained_at[digest] = time.monotonic()
+            try:
+                self._queue.put_nowait((conn.engine, statement, parameters, digest, sql, elapsed))
+            except asyncio.QueueFull:
+                pass
+
+    def _should_explain(self, conn, sql: str, digest: str, executemany: bool) -> bool:
+        if self._queue is None or executemany or conn.dialect.name != "postgresql":
+            return False
+        if not sql[:6].upper() == "SELECT":
+            return False
+        if time.monotonic() - self._explained_at.get(digest, float("-inf")) < EXPLAIN_INTERVAL:
+            return False
+        return random.random() < self.explain_rate
+
+    # ---------- EXPLAIN ----------
+    def start(self) -> None:
+        """启动后台 EXPLAIN 任务"""
+        if self._task is not None or not self.explain_rate:
+            return
+        self._queue = asyncio.Queue(maxsize=EXPLAIN_QUEUE_LIMIT)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._queue = None
+
+    async def _run(self) -> None:
+        while True:
+            sync_engine, statement, parameters, digest, sql, elapsed = await self._queue.get()
+            try:
+                plan = await self._explain(sync_engine, statement, parameters)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("慢查询 [%s] EXPLAIN 失败: %s", digest, exc)
+                plan, error = None, str(exc) or exc.__class__.__name__
+            else:
+                error = None
+            self.plans.append({
+                "fingerprint": digest,
+                "sql": sql,
+                "duration_ms": round(elapsed * 1000, 3),
+                "explained_at": time.time(),
+                "plan": plan,
+                "error": error,
+            })
+
+    async def _explain(self, sync_engine: Engine, statement: str, parameters):
+        engine = self._async_engines.get(sync_engine)
+        if engine is None:
+            engine = self._async_engines[sync_engine] = AsyncEngine(sync_engine)
+        async with engine.connect() as conn:
+            # 只读事务 + 超时，结束后回滚
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+            )
+            plan = result.scalar()
+            await conn.rollback()
+        return loads(plan) if isinstance(plan, (str, bytes)) else plan
+
+    # ---------- 管理接口 ----------
+    def slow_query_list(self, limit: int) -> list[dict]:
+        entries = sorted(self.slow_queries.values(), key=lambda e: e.total, reverse=True)
+        return [e.as_dict() for e in entries[:limit]]
+
+    def profile_list(self, limit: int) -> list[dict]:
+        return [p.summary() for p in reversed(list(self.profiles.values())[-limit:])]
+
+    def reset(self) -> None:
+        self.profiles.clear()
+        self.slow_queries.clear()
+        self.plans.clear()
+        self._explained_at.clear()
+
+
+profiler = Profiler()
+metrics_registry.add_statement_observer(profiler.observe)
+
+
+# ============ ASGI 中间件 ============
+class ProfilerMiddleware:
+    """为抽中的请求开启 SQL 剖析，并为慢查询日志提供请求路径"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path_token = _request_path.set(f"{scope['method']} {scope['path']}")
+        profile = profiler.begin(scope)
+        if profile is None:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _request_path.reset(path_token)
+            return
+
+        profile_token = _profile.set(profile)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(profile_token)
+            _request_path.reset(path_token)
+            route = scope.get("route")
+            profiler.finish(profile, getattr(route, "path_format", None), status_code)
@@ -0,0 +1,112 @@
+"""查询投影与关联对象的加载策略
+
+- 列表 / 详情中内嵌的作者、评论者只需要 id、用户名和头像：用 joinedload + load_only
+  在主查询中一次取回（多对一关系 JOIN 不会放大行数），不会逐行触发懒加载，
+  在 AsyncSession 下也不会因为隐式 IO 报错。
+- 模型列表按 fields 只 SELECT 需要的列；默认的卡片字段不含 description / api_docs 等
+  大文本列，描述以 summary 列代替（写入时截取 description 的开头，列表查询不读取完整描述）。
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+
+from app.models.models import SUMMARY_LENGTH, Comment, Model, User
+
+# 内嵌用户信息需要的列（对应 schemas.AuthorSummary）
+AUTHOR_COLUMNS = (User.id, User.username, User.avatar)
+
+
+def with_author():
+    """Model.author 的加载选项（author_id 非空，使用内连接）"""
+    return joinedload(Model.author, innerjoin=True).load_only(*AUTHOR_COLUMNS)
+
+
+def with_comment_user():
+    """Comment.user 的加载选项"""
+    return joinedload(Comment.user, innerjoin=True).load_only(*AUTHOR_COLUMNS)
+
+
+# ============ 模型列表字段 ============
+# 可选字段 -> SELECT 表达式（author 为内嵌对象，单独处理）
+LIST_FIELDS = {
+    "id": Model.id,
+    "name": Model.name,
+    "summary": Model.summary,
+    "description": Model.description,
+    "category": Model.category,
+    "tags": Model.tags,
+    "framework": Model.framework,
+    "version": Model.version,
+    "file_url": Model.file_url,
+    "file_size": Model.file_size,
+    "file_format": Model.file_format,
+    "file_sha256": Model.file_sha256,
+    "downloads": Model.downloads,
+    "likes_count": Model.likes_count,
+    "comments_count": Model.comments_count,
+    "views": Model.views,
+    "rating_avg": Model.rating_avg,
+    "rating_count": Model.rating_count,
+    "parameter_count": Model.parameter_count,
+    "inspection_status": Model.inspection_status,
+    "api_endpoint": Model.api_endpoint,
+    "api_docs": Model.api_docs,
+    "author_id": Model.author_id,
+    "created_at": Model.created_at,
+    "updated_at": Model.updated_at,
+}
+AUTHOR_FIELD = "author"
+
+# 默认字段：模型卡片需要的内容
+DEFAULT_LIST_FIELDS = (
+    "id", "name", "summary", "category", "tags", "framework", "file_format", "file_size",
+    "downloads", "likes_count", "comments_count", "views", "rating_avg", "rating_count",
+    "parameter_count", "author_id", "author", "created_at", "updated_at",
+)
+
+
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    """解析 fields 参数（逗号分隔），返回规范化的字段元组；id 总是包含"""
+    if not fields:
+        return DEFAULT_LIST_FIELDS
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - set(LIST_FIELDS) - {AUTHOR_FIELD}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知字段: {', '.join(sorted(unknown))}")
+    wanted.add("id")
+    return tuple(sorted(wanted))
+
+
+def list_columns(fields: tuple[str, ...]) -> list:
+    """字段对应的 SELECT 列（作者列以 author__ 前缀命名）"""
+    columns = [LIST_FIELDS[f].label(f) for f in fields if f in LIST_FIELDS]
+    if AUTHOR_FIELD in fields:
+        columns += [column.label(f"author__{column.key}") for column in AUTHOR_COLUMNS]
+    return columns
+
+
+def row_to_item(row, fields: tuple[str, ...]) -> dict:
+    """查询结果行 -> 列表条目"""
+    mapping = row._mapping
+    item = {f: mapping[f] for f in fields if f in LIST_FIELDS}
+    if AUTHOR_FIELD in fields:
+        item[AUTHOR_FIELD] = {column.key: mapping[f"author__{column.key}"] for column in AUTHOR_COLUMNS}
+    return item
+
+
+def summarize(description: Optional[str]) -> Optional[str]:
+    return description[:SUMMARY_LENGTH] if description else None
+
+
+@event.listens_for(Model, "before_insert")
+def _set_summary(mapper, connection, target):
+    target.summary = summarize(target.description)
+
+
+@event.listens_for(Model, "before_update")
+def _update_summary(mapper, connection, target):
+    # 只在 description 变化时重算（不触发未加载列的读取）
+    if inspect(target).attrs.description.history.has_changes():
+        target.summary = summarize(target.description)
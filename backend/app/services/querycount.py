@@ -0,0 +1,45 @@
+"""SQL 语句计数
+
+用于断言某个操作执行的语句数是常数（例如列表页不随 page_size 增加而产生 N+1 查询）：
+
+    with count_queries() as counter:
+        await client.get("/api/models?page_size=50")
+    counter.assert_at_most(3)
+"""
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import engine as default_engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def assert_at_most(self, limit: int) -> None:
+        if self.count > limit:
+            listing = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(self.statements))
+            raise AssertionError(f"执行了 {self.count} 条 SQL，超过上限 {limit}：\n{listing}")
+
+
+@contextmanager
+def count_queries(engine: Optional[AsyncEngine] = None) -> Iterator[QueryCounter]:
+    """统计上下文中在 engine 上执行的 SQL 语句"""
+    sync_engine = (engine or default_engine).sync_engine
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
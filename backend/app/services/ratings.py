@@ -0,0 +1,63 @@
+"""评分聚合（总分、人数、各星级人数、平均分）
+
+聚合值反规范化存储在 models 表上，发表 / 删除评论时在调整 comments_count 的同一条
+UPDATE 中原子地更新；平均分也一并写入，sort=rating 直接走 (rating_avg, id) 索引。
+计数出现偏差（如手工改库）时用 rebuild_rating_aggregates 按 comments 表重算。
+"""
+from sqlalchemy import Float, case, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Comment, Model
+
+RATING_LEVELS = (1, 2, 3, 4, 5)
+
+
+def rating_column(rating: int):
+    return getattr(Model, f"rating_{rating}")
+
+
+def rating_values(rating: int, delta: int) -> dict:
+    """评分 rating 增加（delta=1）或移除（delta=-1）一次时的 UPDATE 赋值"""
+    total = Model.rating_sum + rating * delta
+    count = Model.rating_count + delta
+    return {
+        "rating_sum": total,
+        "rating_count": count,
+        f"rating_{rating}": rating_column(rating) + delta,
+        "rating_avg": case((count > 0, cast(total, Float) / cast(count, Float)), else_=0.0),
+    }
+
+
+async def rebuild_rating_aggregates(db: AsyncSession) -> int:
+    """按 comments 表重新计算所有模型的评分聚合，返回有评分的模型数
+
+    rating 为空的旧评论不计入（与删除评论时的处理一致）。
+    """
+    stats = (
+        select(
+            Comment.model_id,
+            func.count(Comment.rating).label("count"),
+            func.coalesce(func.sum(Comment.rating), 0).label("total"),
+            *(func.sum(case((Comment.rating == r, 1), else_=0)).label(f"r{r}") for r in RATING_LEVELS),
+        )
+        .where(Comment.rating.is_not(None))
+        .group_by(Comment.model_id)
+        .subquery()
+    )
+    zero = {f"rating_{r}": 0 for r in RATING_LEVELS}
+    await db.execute(
+        update(Model).values(rating_sum=0, rating_count=0, rating_avg=0.0, updated_at=Model.updated_at, **zero)
+    )
+    result = await db.execute(
+        update(Model)
+        .where(Model.id == stats.c.model_id)
+        .values(
+            rating_sum=stats.c.total,
+            rating_count=stats.c.count,
+            rating_avg=cast(stats.c.total, Float) / cast(stats.c.count, Float),
+            updated_at=Model.updated_at,
+            **{f"rating_{r}": stats.c[f"r{r}"] for r in RATING_LEVELS},
+        )
+    )
+    await db.commit()
+    return result.rowcount
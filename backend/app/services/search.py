@@ -0,0 +1,245 @@
+"""全文搜索服务
+
+分词规则（中英文混排）：
+- 英文 / 数字：按字母数字串切分并转小写
+- 中文（CJK）：输出单字和相邻二元组，查询时使用二元组（单字查询用单字）
+
+PostgreSQL 下使用 search_document 列上的 tsvector GIN 索引并按 ts_rank_cd 排序；
+其他数据库（嵌入式 / 测试）使用进程内倒排索引。
+
+进程内索引的限制：
+- 只返回相关度最高的 MAX_CANDIDATES 个候选，超出时结果带 truncated 标记（total 仍是完整的匹配数）；
+- 只在本进程第一次搜索时从数据库加载，之后只跟踪本进程的写入，
+  看不到其他进程（多 worker）的修改，因此只适用于单进程部署；
+- 本进程的修改在事务提交后才更新索引，回滚的修改不会进入索引。
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Iterable, NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import case, event, false, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.models.models import Model, TS_CONFIG
+from app.services.tags import normalize_tags
+
+# 字母数字串，或连续的 CJK 字符
+_TOKEN_RE = re.compile(r"[0-9a-z]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_ASCII_RE = re.compile(r"[0-9a-z]+")
+
+# 名称和标签在文档中重复出现，提高其权重
+NAME_WEIGHT = 2
+TAG_WEIGHT = 2
+
+# 进程内索引返回的最大候选数（在分类 / 标签筛选之后截断）
+MAX_CANDIDATES = 1000
+
+
+def _cjk_tokens(run: str, for_query: bool) -> list[str]:
+    if len(run) == 1:
+        return [run]
+    bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+    return bigrams if for_query else list(run) + bigrams
+
+
+def tokenize(text: Optional[str], for_query: bool = False) -> list[str]:
+    """把中英文混排文本切分为词元"""
+    if not text:
+        return []
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _ASCII_RE.fullmatch(run):
+            tokens.append(run)
+        else:
+            tokens.extend(_cjk_tokens(run, for_query))
+    return tokens
+
+
+def build_document(name: Optional[str], description: Optional[str], tags: Optional[Iterable[str]]) -> list[str]:
+    """生成模型的检索词元（含权重重复）"""
+    tag_tokens = [t for tag in tags or [] for t in tokenize(tag)]
+    return tokenize(name) * NAME_WEIGHT + tag_tokens * TAG_WEIGHT + tokenize(description)
+
+
+def query_tokens(search: str) -> list[str]:
+    """查询词元（去重，保持顺序）"""
+    return list(dict.fromkeys(tokenize(search, for_query=True)))
+
+
+class InvertedIndex:
+    """进程内倒排索引（嵌入式 / 测试模式的后备实现）"""
+
+    def __init__(self):
+        self.loaded = False
+        self._postings: dict[str, dict[UUID, int]] = defaultdict(dict)
+        self._docs: dict[UUID, Counter] = {}
+        # 用于在截断候选之前筛选：model_id -> (分类, 标签集合)
+        self._facets: dict[UUID, tuple[Optional[str], frozenset[str]]] = {}
+
+    def add(self, model_id: UUID, tokens: list[str], category: Optional[str], tags: Optional[Iterable[str]]) -> None:
+        self.remove(model_id)
+        doc = self._docs[model_id] = Counter(tokens)
+        self._facets[model_id] = (category, frozenset(tags or ()))
+        for token, tf in doc.items():
+            self._postings[token][model_id] = tf
+
+    def remove(self, model_id: UUID) -> None:
+        doc = self._docs.pop(model_id, None)
+        if doc is None:
+            return
+        del self._facets[model_id]
+        for token in doc:
+            del self._postings[token][model_id]
+            if not self._postings[token]:
+                del self._postings[token]
+
+    async def load(self, db: AsyncSession) -> None:
+        """从数据库全量构建索引"""
+        result = await db.execute(select(Model.id, Model.name, Model.description, Model.tags, Model.category))
+        for model_id, name, description, tags, category in result:
+            self.add(model_id, build_document(name, description, tags), category, tags)
+        self.loaded = True
+
+    def search(
+        self,
+        tokens: list[str],
+        category: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        tag_match: str = "all",
+        limit: int = MAX_CANDIDATES,
+    ) -> tuple[dict[UUID, float], int]:
+        """返回同时包含所有词元、且满足分类 / 标签筛选的模型的 TF-IDF 得分（最多 limit 个）和匹配总数"""
+        postings = [self._postings.get(t) for t in tokens]
+        if not tokens or not all(postings):
+            return {}, 0
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if category or tags:
+            candidates = {m for m in candidates if self._accepts(m, category, tags, tag_match)}
+        total = len(self._docs)
+        scores = {}
+        for model_id in candidates:
+            length = sum(self._docs[model_id].values())
+            scores[model_id] = sum(
+                (p[model_id] / length) * math.log(1 + total / len(p)) for p in postings
+            )
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return dict(top), len(scores)
+
+    def _accepts(self, model_id: UUID, category: Optional[str], tags: Optional[list[str]], tag_match: str) -> bool:
+        model_category, model_tags = self._facets[model_id]
+        if category and model_category != category:
+            return False
+        if not tags:
+            return True
+        return model_tags.issuperset(tags) if tag_match == "all" else not model_tags.isdisjoint(tags)
+
+
+memory_index = InvertedIndex()
+
+
+def document_vector():
+    """search_document 的 tsvector 表达式（与 GIN 索引表达式一致）"""
+    return func.to_tsvector(TS_CONFIG, Model.search_document)
+
+
+class Match(NamedTuple):
+    """搜索条件
+
+    total / truncated 只由进程内索引给出：total 为完整的匹配数，truncated 表示
+    condition 只包含相关度最高的 MAX_CANDIDATES 个候选。
+    """
+    condition: Any
+    rank: Any
+    total: Optional[int] = None
+    truncated: bool = False
+
+
+NO_MATCH = Match(false(), literal_column("0.0"), 0)
+
+
+async def match(
+    db: AsyncSession,
+    search: str,
+    category: Optional[str] = None,
+    tags: Optional[list[str]] = None,
+    tag_match: str = "all",
+) -> Match:
+    """返回搜索的筛选条件和相关度表达式；搜索词无有效词元时不匹配任何模型
+
+    category / tags 供进程内索引在截断候选前筛选（调用方仍需在查询上应用同样的条件）。
+    """
+    tokens = query_tokens(search)
+    if not tokens:
+        return NO_MATCH
+
+    if db.bind.dialect.name == "postgresql":
+        tsquery = func.to_tsquery(TS_CONFIG, " & ".join(f"'{t}'" for t in tokens))
+        vector = document_vector()
+        return Match(vector.op("@@")(tsquery), func.ts_rank_cd(vector, tsquery))
+
+    if not memory_index.loaded:
+        await memory_index.load(db)
+    scores, total = memory_index.search(tokens, category, normalize_tags(tags) if tags else None, tag_match)
+    if not scores:
+        return NO_MATCH
+    return Match(Model.id.in_(scores), case(scores, value=Model.id, else_=0.0), total, total > len(scores))
+
+
+async def rebuild_search_documents(db: AsyncSession) -> int:
+    """为已有数据回填 search_document，返回处理的行数"""
+    result = await db.execute(select(Model))
+    models = result.scalars().all()
+    for model in models:
+        _set_document(model)
+    await db.commit()
+    return len(models)
+
+
+def _set_document(target: Model) -> None:
+    target.search_document = " ".join(build_document(target.name, target.description, target.tags))
+
+
+@event.listens_for(Model, "before_insert")
+@event.listens_for(Model, "before_update")
+def _update_document(mapper, connection, target):
+    _set_document(target)
+
+
+# 进程内索引的修改暂存在会话中，提交后才应用，回滚时丢弃
+def _queue_index_change(target: Model, change: Optional[tuple]) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault("search_index", {})[target.id] = change
+
+
+@event.listens_for(Model, "after_insert")
+@event.listens_for(Model, "after_update")
+def _index_model(mapper, connection, target):
+    _queue_index_change(target, (target.search_document.split(), target.category, target.tags))
+
+
+@event.listens_for(Model, "after_delete")
+def _unindex_model(mapper, connection, target):
+    _queue_index_change(target, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_changes(session):
+    changes = session.info.pop("search_index", None)
+    if not changes or not memory_index.loaded:
+        return
+    for model_id, change in changes.items():
+        if change is None:
+            memory_index.remove(model_id)
+        else:
+            memory_index.add(model_id, *change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_index_changes(session):
+    session.info.pop("search_index", None)
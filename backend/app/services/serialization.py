@@ -0,0 +1,95 @@
+"""响应序列化快速路径
+
+- JSON 编码优先使用 orjson（直接输出 bytes，原生支持 UUID / datetime），未安装时退回标准库 json。
+- ORM 对象只经过一次 pydantic 校验（from_attributes），由 pydantic-core 直接输出 JSON bytes，
+  不再经过 response_model 的二次校验、jsonable_encoder 和 json.dumps。
+- 列表查询的结果行本身已是确定类型的列值，直接编码，不逐条构造 pydantic 对象。
+- 内部调用方可通过 Accept: application/msgpack 获取 msgpack 响应（可选依赖 msgpack）。
+"""
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """编码为 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def encode(value: Any) -> bytes:
+    """pydantic 对象用其自身的 JSON 序列化，其余（dict / list）用 dumps"""
+    if isinstance(value, BaseModel):
+        return value.model_dump_json().encode()
+    return dumps(value)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def dump_orm(schema, obj: Any) -> bytes:
+    """ORM 对象 -> JSON bytes（按 schema 校验一次，直接输出 JSON）"""
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """客户端是否明确要求 msgpack（且已安装 msgpack）"""
+    if msgpack is None or not accept:
+        return False
+    return any(media.split(";")[0].strip() in MSGPACK_MEDIA_TYPES for media in accept.split(","))
+
+
+def to_msgpack(body: bytes) -> bytes:
+    """JSON 响应体 -> msgpack（缓存中只保存 JSON，按需转换）"""
+    return msgpack.packb(loads(body), use_bin_type=True)
+
+
+class FastJSONResponse(Response):
+    """使用 dumps 编码的 JSON 响应；内容已是 bytes 时原样发送"""
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def orm_response(schema, obj: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """按 schema 序列化 ORM 对象的响应（路由的 response_model 仍用于文档）"""
+    return FastJSONResponse(dump_orm(schema, obj), status_code=status_code, headers=headers)
@@ -0,0 +1,417 @@
+"""内容寻址、分块去重的模型文件存储
+
+文件按内容定义分块（content-defined chunking）切分，每个分块以 sha256 命名只存一份：
+    UPLOAD_DIR/chunks/ab/cd/<sha256>
+文件本身是一份分块清单（manifest）：
+    UPLOAD_DIR/manifests/<manifest id>.json   {"size": ..., "chunks": [[sha256, length], ...]}
+manifest id 是清单内容（各行 “sha256:length”）的 sha256，由分块校验和推导，无法伪造。
+
+分块边界：从分块起点 MIN_CHUNK_SIZE 之后开始，遇到任一锚点（ANCHORS 中的 3 字节序列）
+即在锚点之后切分，最长不超过 MAX_CHUNK_SIZE。边界只取决于局部内容，插入 / 修改只影响
+附近的分块。锚点查找由 re 在 C 层完成，速度接近顺序读盘。客户端按同样的规则切分后，
+可以先询问缺失的分块，只上传变化的部分。
+
+引用计数：storage_chunks.refcount 记录引用该分块的清单数；清单的引用方是 Model.file_manifest。
+模型删除或更换文件时释放清单，分块计数减为 0 的行保留，提交后由 purge 删除。
+
+删除与重新引用的并发：purge / collect_garbage 先用 DELETE ... WHERE refcount = 0 删除分块行
+（持有行锁）、删除文件，然后才提交；register 对同一行的 upsert 会等到其提交之后，
+并在登记后确认分块文件仍然存在，否则抛出 ChunksMissing。清单文件的删除与登记用
+_lock_manifest 串行化。
+
+上传后从未被清单引用的分块（以及提交失败留下的清单文件）由 collect_garbage 在
+STORAGE_GC_GRACE 秒后清理。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, false, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.models import Model, StorageChunk, StorageManifest
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 16 个 3 字节锚点：任意位置命中的概率约 2^-20，平均分块约 1MB
+ANCHORS = [hashlib.sha256(b"ai-model-hub-cdc-%d" % i).digest()[:3] for i in range(16)]
+_ANCHOR_RE = re.compile(b"|".join(re.escape(anchor) for anchor in ANCHORS))
+ANCHOR_LENGTH = 3
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+# 批量更新引用计数时每条语句的行数
+REF_BATCH_SIZE = 1000
+
+
+class ChunksMissing(Exception):
+    """登记清单时分块文件已被清理（并发的 purge / collect_garbage），需要重新上传"""
+
+    def __init__(self, hashes: list[str]):
+        super().__init__(f"{len(hashes)} 个分块不存在")
+        self.hashes = hashes
+
+
+def cut_point(buffer: bytes) -> int:
+    """返回 buffer 中第一个分块的长度"""
+    if len(buffer) <= MIN_CHUNK_SIZE:
+        return len(buffer)
+    match = _ANCHOR_RE.search(buffer, MIN_CHUNK_SIZE - ANCHOR_LENGTH, MAX_CHUNK_SIZE)
+    if match:
+        return match.end()
+    return min(len(buffer), MAX_CHUNK_SIZE)
+
+
+def iter_chunks(stream: BinaryIO) -> Iterator[bytes]:
+    """按内容定义分块流式切分（内存占用不超过 MAX_CHUNK_SIZE 量级）"""
+    buffer = b""
+    eof = False
+    while True:
+        while not eof and len(buffer) < MAX_CHUNK_SIZE:
+            block = stream.read(READ_BLOCK_SIZE)
+            if not block:
+                eof = True
+            buffer += block
+        if not buffer:
+            return
+        cut = cut_point(buffer)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+def manifest_id(chunks: list[tuple[str, int]]) -> str:
+    """清单 id：由分块列表推导"""
+    digest = hashlib.sha256()
+    for chunk_hash, length in chunks:
+        digest.update(f"{chunk_hash}:{length}\n".encode())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """文件清单：分块列表及其在文件中的偏移"""
+
+    def __init__(self, manifest_id: str, chunks: list[tuple[str, int]]):
+        self.id = manifest_id
+        self.chunks = chunks
+        self.offsets = []
+        offset = 0
+        for _, length in chunks:
+            self.offsets.append(offset)
+            offset += length
+        self.size = offset
+
+    def locate(self, start: int, length: int) -> Iterator[tuple[str, int, int]]:
+        """把文件区间映射为 (分块 sha256, 分块内偏移, 长度) 序列"""
+        index = bisect_right(self.offsets, start) - 1
+        end = start + length
+        while start < end and index < len(self.chunks):
+            chunk_hash, chunk_length = self.chunks[index]
+            inner = start - self.offsets[index]
+            count = min(chunk_length - inner, end - start)
+            yield chunk_hash, inner, count
+            start += count
+            index += 1
+
+
+class ChunkStore:
+    """分块存储"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def chunk_path(self, chunk_hash: str) -> Path:
+        return self.root / "chunks" / chunk_hash[:2] / chunk_hash[2:4] / chunk_hash
+
+    def manifest_path(self, manifest_id: str) -> Path:
+        return self.root / "manifests" / f"{manifest_id}.json"
+
+    def has_chunk(self, chunk_hash: str) -> bool:
+        return self.chunk_path(chunk_hash).exists()
+
+    def missing_chunks(self, chunks: list[tuple[str, int]]) -> list[str]:
+        """返回不存在（或长度不符）的分块"""
+        missing = []
+        for chunk_hash, length in chunks:
+            path = self.chunk_path(chunk_hash)
+            if not path.exists() or path.stat().st_size != length:
+                missing.append(chunk_hash)
+        return missing
+
+    def write_chunk(self, chunk_hash: str, data: bytes) -> bool:
+        """写入分块（已存在则跳过），返回是否新写入；先写临时文件再原子改名"""
+        path = self.chunk_path(chunk_hash)
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return True
+
+    def write_manifest(self, chunks: list[tuple[str, int]]) -> Manifest:
+        manifest = Manifest(manifest_id(chunks), chunks)
+        path = self.manifest_path(manifest.id)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"size": manifest.size, "chunks": chunks}))
+            os.replace(tmp, path)
+        return manifest
+
+    @lru_cache(maxsize=128)
+    def load_manifest(self, manifest_id: str) -> Manifest:
+        """读取清单（内容不可变，可以安全缓存）"""
+        data = json.loads(self.manifest_path(manifest_id).read_text())
+        return Manifest(manifest_id, [tuple(chunk) for chunk in data["chunks"]])
+
+    def ingest_file(self, path: Path) -> tuple[Manifest, str, int]:
+        """把普通文件切分入库，返回 (清单, 整文件 sha256, 新写入的字节数)"""
+        whole = hashlib.sha256()
+        chunks = []
+        written = 0
+        with open(path, "rb") as f:
+            for data in iter_chunks(f):
+                whole.update(data)
+                chunk_hash = hashlib.sha256(data).hexdigest()
+                if self.write_chunk(chunk_hash, data):
+                    written += len(data)
+                chunks.append((chunk_hash, len(data)))
+        return self.write_manifest(chunks), whole.hexdigest(), written
+
+    def read(self, manifest: Manifest) -> Iterator[bytes]:
+        """按顺序重组文件内容"""
+        for chunk_hash, _ in manifest.chunks:
+            with open(self.chunk_path(chunk_hash), "rb") as f:
+                while block := f.read(READ_BLOCK_SIZE):
+                    yield block
+
+    # ============ 引用计数 ============
+    async def _lock_manifest(self, db: AsyncSession, manifest_id: str) -> None:
+        """在当前事务内串行化同一清单的登记与删除"""
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(manifest_id))))
+        else:
+            # SQLite 整库只有一个写者：任意写语句（即使不影响行）即取得写锁直到事务结束
+            await db.execute(delete(StorageManifest).where(false()))
+
+    async def register(self, db: AsyncSession, manifest: Manifest) -> None:
+        """登记清单；首次出现时为其分块增加引用（调用方负责提交事务）
+
+        登记后确认分块和清单文件仍然存在：分块已被并发清理时抛出 ChunksMissing。
+        """
+        insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        await self._lock_manifest(db, manifest.id)
+        result = await db.execute(
+            insert(StorageManifest)
+            .values(id=manifest.id, size=manifest.size, chunk_count=len(manifest.chunks))
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        if result.rowcount == 0:
+            return
+
+        sizes = dict(manifest.chunks)
+        hashes = list(sizes)
+        for i in range(0, len(hashes), REF_BATCH_SIZE):
+            batch = hashes[i:i + REF_BATCH_SIZE]
+            stmt = insert(StorageChunk).values([{"hash": h, "size": sizes[h], "refcount": 1} for h in batch])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=["hash"],
+                set_={"refcount": StorageChunk.refcount + 1},
+            ))
+        # 分块行已被本事务锁定 / 计数大于 0，此后不会再被清理
+        missing = await run_in_threadpool(self.missing_chunks, manifest.chunks)
+        if missing:
+            raise ChunksMissing(missing)
+        await run_in_threadpool(self.write_manifest, manifest.chunks)
+
+    async def attach(
+        self, db: AsyncSession, model: Model, manifest: Manifest, sha256: Optional[str], filename: Optional[str]
+    ) -> Optional[tuple[str, list[str]]]:
+        """把清单设为模型文件（替换旧文件），返回需在提交后 purge 的释放结果"""
+        await self.register(db, manifest)
+        released = None
+        if model.file_manifest != manifest.id:
+            released = await self.release(db, model.file_manifest, model.id)
+        model.file_manifest = manifest.id
+        model.file_name = filename
+        model.file_size = manifest.size
+        model.file_sha256 = sha256
+        return released
+
+    async def release(
+        self, db: AsyncSession, manifest_id: Optional[str], model_id: UUID
+    ) -> Optional[tuple[str, list[str]]]:
+        """模型不再引用该清单时释放；没有其他模型引用时减少分块引用。
+
+        返回 (清单 id, 引用归零的分块)，由调用方在事务提交后传给 purge。
+        """
+        if not manifest_id:
+            return None
+        others = await db.execute(
+            select(func.count()).select_from(Model)
+            .where(Model.file_manifest == manifest_id, Model.id != model_id)
+        )
+        if others.scalar():
+            return None
+
+        manifest = await run_in_threadpool(self.load_manifest, manifest_id)
+        await db.execute(delete(StorageManifest).where(StorageManifest.id == manifest_id))
+        hashes = list(dict(manifest.chunks))
+        garbage = []
+        for i in range(0, len(hashes), REF_BATCH_SIZE):
+            batch = hashes[i:i + REF_BATCH_SIZE]
+            await db.execute(
+                update(StorageChunk)
+                .where(StorageChunk.hash.in_(batch))
+                .values(refcount=StorageChunk.refcount - 1)
+            )
+            result = await db.execute(
+                select(StorageChunk.hash).where(StorageChunk.hash.in_(batch), StorageChunk.refcount <= 0)
+            )
+            garbage.extend(result.scalars().all())
+        return manifest_id, garbage
+
+    async def purge(self, db: AsyncSession, released: Optional[tuple[str, list[str]]]) -> None:
+        """删除已释放的清单和分块文件（提交后调用，在独立事务中完成）"""
+        if not released:
+            return
+        manifest_id, hashes = released
+        await self._lock_manifest(db, manifest_id)
+        if await db.get(StorageManifest, manifest_id) is None:
+            self.load_manifest.cache_clear()
+            self.manifest_path(manifest_id).unlink(missing_ok=True)
+        await self._delete_unreferenced(db, hashes)
+        await db.commit()
+
+    async def _delete_unreferenced(self, db: AsyncSession, hashes: list[str]) -> int:
+        """删除计数为 0（或没有记录）的分块行和文件，返回删除的分块数（调用方负责提交）
+
+        先补上占位行再按 refcount = 0 删除，删除的行在提交前一直被锁定；
+        文件在提交前删除，并发的 register 会在提交后看到文件已不存在。
+        """
+        insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        deleted = 0
+        for i in range(0, len(hashes), REF_BATCH_SIZE):
+            batch = hashes[i:i + REF_BATCH_SIZE]
+            await db.execute(
+                insert(StorageChunk)
+                .values([{"hash": h, "size": 0, "refcount": 0} for h in batch])
+                .on_conflict_do_nothing(index_elements=["hash"])
+            )
+            result = await db.execute(
+                delete(StorageChunk)
+                .where(StorageChunk.hash.in_(batch), StorageChunk.refcount <= 0)
+                .returning(StorageChunk.hash)
+            )
+            garbage = result.scalars().all()
+            await run_in_threadpool(self._unlink_chunks, garbage)
+            deleted += len(garbage)
+        return deleted
+
+    def _unlink_chunks(self, hashes: list[str]) -> None:
+        for chunk_hash in hashes:
+            self.chunk_path(chunk_hash).unlink(missing_ok=True)
+
+    # ============ 垃圾回收 ============
+    def _stale_files(self, directory: str, suffix: str, grace: float) -> list[str]:
+        """directory 下修改时间早于 grace 秒前的文件名（去掉 suffix）"""
+        root = self.root / directory
+        deadline = time.time() - grace
+        names = []
+        for path, _, files in os.walk(root):
+            for name in files:
+                if name.startswith(".tmp") or not name.endswith(suffix):
+                    continue
+                try:
+                    if os.stat(os.path.join(path, name)).st_mtime < deadline:
+                        names.append(name[:len(name) - len(suffix)])
+                except FileNotFoundError:
+                    continue
+        return names
+
+    async def collect_garbage(self, db: AsyncSession, grace: Optional[float] = None) -> int:
+        """清理超过 grace 秒仍未被引用的分块和清单文件，返回删除的文件数"""
+        grace = settings.STORAGE_GC_GRACE if grace is None else grace
+        removed = 0
+
+        hashes = await run_in_threadpool(self._stale_files, "chunks", "", grace)
+        for i in range(0, len(hashes), REF_BATCH_SIZE):
+            batch = hashes[i:i + REF_BATCH_SIZE]
+            referenced = set((await db.execute(
+                select(StorageChunk.hash).where(StorageChunk.hash.in_(batch), StorageChunk.refcount > 0)
+            )).scalars())
+            removed += await self._delete_unreferenced(db, [h for h in batch if h not in referenced])
+            await db.commit()
+
+        manifest_ids = await run_in_threadpool(self._stale_files, "manifests", ".json", grace)
+        for manifest_id in manifest_ids:
+            await self._lock_manifest(db, manifest_id)
+            if await db.get(StorageManifest, manifest_id) is None:
+                self.manifest_path(manifest_id).unlink(missing_ok=True)
+                removed += 1
+            await db.commit()
+        if manifest_ids:
+            self.load_manifest.cache_clear()
+        return removed
+
+
+class StorageCollector:
+    """定期运行 collect_garbage 的后台任务"""
+
+    def __init__(self, store: ChunkStore, interval: float):
+        self.store = store
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with async_session_maker() as session:
+                    removed = await self.store.collect_garbage(session)
+                if removed:
+                    logger.info("存储清理删除了 %d 个未引用的文件", removed)
+            except Exception:
+                logger.exception("存储清理失败")
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+chunk_store = ChunkStore(Path(settings.UPLOAD_DIR))
+storage_collector = StorageCollector(chunk_store, settings.STORAGE_GC_INTERVAL)
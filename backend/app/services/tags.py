@@ -0,0 +1,90 @@
+"""标签规范化与标签筛选
+
+标签在写入时规范化：NFKC、去首尾空白、合并连续空白、转小写，再按 TAG_ALIASES 映射别名
+（如 "PyTorch" / "torch" -> "pytorch"），同一模型内去重并保持顺序。查询参数使用同样的规则。
+
+筛选：
+- PostgreSQL：tags 列上的 GIN 索引，all 用 @>（包含全部），any 用 &&（有交集）
+- 其他数据库（嵌入式 / SQLite）：没有数组类型和 GIN 索引，改用 model_tags 侧表
+  （主键 (tag, model_id)），由 mapper 事件在同一事务中与 models 同步
+"""
+import re
+import unicodedata
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import Model, ModelTag
+
+MAX_TAG_LENGTH = 50
+MAX_FILTER_TAGS = 10
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_tag(tag: str) -> str:
+    tag = _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", tag)).strip().lower()
+    return settings.TAG_ALIASES.get(tag, tag)[:MAX_TAG_LENGTH]
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> list[str]:
+    """规范化并去重（保持原顺序），丢弃空标签"""
+    return list(dict.fromkeys(t for t in (normalize_tag(tag) for tag in tags or ()) if t))
+
+
+def tag_condition(db: AsyncSession, tags: list[str], mode: str = "all"):
+    """标签筛选条件：mode=all 要求包含全部标签，any 包含任一标签
+
+    规范化后没有有效标签时不筛选（两种后端结果一致）。
+    """
+    wanted = normalize_tags(tags)
+    if not wanted:
+        return true()
+    if db.bind.dialect.name == "postgresql":
+        return Model.tags.contains(wanted) if mode == "all" else Model.tags.overlap(wanted)
+
+    matched = select(ModelTag.model_id).where(ModelTag.tag.in_(wanted))
+    if mode == "all":
+        matched = matched.group_by(ModelTag.model_id).having(func.count() == len(wanted))
+    return Model.id.in_(matched)
+
+
+# ============ 侧表同步（非 PostgreSQL） ============
+def _sync_side_table(connection, target: Model, tags: Optional[list[str]]) -> None:
+    if connection.dialect.name == "postgresql":
+        return
+    connection.execute(delete(ModelTag).where(ModelTag.model_id == target.id))
+    rows = [{"model_id": target.id, "tag": tag} for tag in dict.fromkeys(tags or ())]
+    if rows:
+        connection.execute(insert(ModelTag), rows)
+
+
+@event.listens_for(Model, "after_insert")
+def _insert_tags(mapper, connection, target):
+    _sync_side_table(connection, target, target.tags)
+
+
+@event.listens_for(Model, "after_update")
+def _update_tags(mapper, connection, target):
+    if inspect(target).attrs.tags.history.has_changes():
+        _sync_side_table(connection, target, target.tags)
+
+
+@event.listens_for(Model, "after_delete")
+def _delete_tags(mapper, connection, target):
+    _sync_side_table(connection, target, None)
+
+
+async def normalize_existing_tags(db: AsyncSession) -> int:
+    """规范化已有模型的标签（经 ORM 写入，分面计数、搜索词元、侧表随之更新），返回修改的行数"""
+    changed = 0
+    result = await db.execute(select(Model))
+    for model in result.scalars():
+        tags = normalize_tags(model.tags)
+        if tags != list(model.tags or ()):
+            model.tags = tags
+            changed += 1
+    await db.commit()
+    return changed
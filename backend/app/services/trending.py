@@ -0,0 +1,90 @@
+"""时间衰减的热度分数（trending）
+
+热度 = Σ 权重 × 2^(-(当前时间 - 事件时间) / 半衰期)
+
+所有模型在同一时刻乘以相同的衰减因子，不影响排序，因此存储按 2^((当前时间 - EPOCH) / 半衰期)
+放大后的值：每个事件只需把 trending_score 加上 权重 × growth(事件时间)，已有的分数永远不用重算。
+排行榜就是 (trending_score, id) / (category, trending_score, id) 索引，取前 N 名是一次 N 行的索引扫描。
+
+growth 随时间指数增长，约 1000 个半衰期后超出 float 范围（默认 72 小时半衰期约 8 年），
+届时调大 TRENDING_EPOCH 并用 rebase 按比例缩小已有分数即可。
+初次部署或调整权重 / 半衰期后，用 rebuild_trending_scores（python -m app.cli rebuild-trending）按历史事件重算。
+"""
+from datetime import datetime
+from typing import Optional, Union
+
+from sqlalchemy import Float, Uuid, bindparam, case, cast, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.config import settings
+from app.models.models import Comment, Like, Model
+
+EPOCH = datetime.fromisoformat(settings.TRENDING_EPOCH)
+
+
+def growth(at: Optional[datetime] = None) -> float:
+    """时间点 at 的放大系数 2^((at - EPOCH) / 半衰期)"""
+    hours = ((at or datetime.utcnow()) - EPOCH).total_seconds() / 3600
+    return 2.0 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def growth_column(at: ColumnElement) -> ColumnElement:
+    """growth 的 SQL 表达式（PostgreSQL），用于按行内的事件时间计算增量"""
+    hours = cast(func.extract("epoch", at - literal(EPOCH)), Float) / 3600.0
+    return func.power(2.0, hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def increment(field: str, amount: Union[int, ColumnElement] = 1, at: Optional[datetime] = None):
+    """field（likes / downloads / views / comments）变化 amount 次对应的分数增量"""
+    return amount * (settings.TRENDING_WEIGHTS.get(field, 0.0) * growth(at))
+
+
+def score_after(delta) -> ColumnElement:
+    """加上增量后的分数（下限为 0，防止浮点误差产生负数）
+
+    撤销事件（取消点赞、删除评论）时应按事件发生时间计算增量（increment 的 at 参数），
+    这样减去的恰好是当初加上的贡献。
+    """
+    new_score = Model.trending_score + delta
+    return case((new_score < 0, 0.0), else_=new_score)
+
+
+async def rebase(db: AsyncSession, old_epoch: datetime, new_epoch: datetime) -> None:
+    """更换 EPOCH 时按比例缩放所有分数（排序不变）"""
+    hours = (new_epoch - old_epoch).total_seconds() / 3600
+    factor = 2.0 ** (-hours / settings.TRENDING_HALF_LIFE_HOURS)
+    await db.execute(
+        update(Model).values(trending_score=Model.trending_score * factor, updated_at=Model.updated_at)
+    )
+    await db.commit()
+
+
+async def rebuild_trending_scores(db: AsyncSession) -> int:
+    """按点赞 / 评论的时间和累计下载 / 浏览数重算所有模型的 trending_score，返回模型数
+
+    下载和浏览没有逐次的时间记录，按模型的创建时间计入。
+    """
+    weights = settings.TRENDING_WEIGHTS
+    scores = {}
+    result = await db.stream(select(Model.id, Model.created_at, Model.downloads, Model.views))
+    async for model_id, created_at, downloads, views in result:
+        counted = (downloads or 0) * weights.get("downloads", 0.0) + (views or 0) * weights.get("views", 0.0)
+        scores[model_id] = counted * growth(created_at)
+    for field, table in (("likes", Like), ("comments", Comment)):
+        weight = weights.get(field, 0.0)
+        result = await db.stream(select(table.model_id, table.created_at))
+        async for model_id, created_at in result:
+            if model_id in scores:
+                scores[model_id] += weight * growth(created_at)
+
+    if scores:
+        table = Model.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("model_id", type_=Uuid))
+            .values(trending_score=bindparam("score", type_=Float), updated_at=table.c.updated_at),
+            [{"model_id": model_id, "score": score} for model_id, score in scores.items()],
+        )
+    await db.commit()
+    return len(scores)
@@ -0,0 +1,327 @@
+"""可续传的分片上传
+
+每个上传会话的状态全部保存在磁盘上（UPLOAD_DIR/sessions/<id>/），进程重启后可继续：
+- meta.json   会话信息（文件名、大小、分片大小、所属用户等）
+- data        预分配的稀疏文件，分片按偏移直接写入
+- chunks.log  已确认的分片（追加写入，每行 “分片序号 sha256”；“分片序号 -” 撤销该分片的确认）
+
+分片可以乱序、并行上传；请求体按块流式写盘，内存占用与文件大小无关。
+整个文件的 sha256 在已连续到达的前缀上增量计算，完成上传时只需补算剩余部分。
+重传已确认的分片时先撤销确认再写入，写入失败的分片会重新计为缺失。
+超过 UPLOAD_SESSION_TTL 秒没有活动的会话由 UploadSweeper 定期删除。
+会话文件的读写都在线程池中执行，不阻塞事件循环。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 流式写盘 / 读盘的缓冲大小
+IO_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadSession:
+    """单个上传会话"""
+
+    def __init__(self, directory: Path, meta: dict):
+        self.directory = directory
+        self.meta = meta
+        self._hasher = hashlib.sha256()
+        self._hashed_upto = 0
+        self._hash_lock = asyncio.Lock()
+        # 正在写入的分片数，清理过期会话时跳过
+        self.writing = 0
+
+    @property
+    def id(self) -> str:
+        return self.meta["id"]
+
+    @property
+    def size(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def chunk_size(self) -> int:
+        return self.meta["chunk_size"]
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    @property
+    def data_path(self) -> Path:
+        return self.directory / "data"
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / "chunks.log"
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    async def received(self) -> dict[int, str]:
+        """已确认的分片：序号 -> sha256"""
+        return await run_in_threadpool(self._read_log)
+
+    def _read_log(self) -> dict[int, str]:
+        if not self.log_path.exists():
+            return {}
+        chunks = {}
+        for line in self.log_path.read_text().splitlines():
+            index, digest = line.split()
+            if digest == "-":
+                chunks.pop(int(index), None)
+            else:
+                chunks[int(index)] = digest
+        return chunks
+
+    async def _append_log(self, index: int, digest: str) -> None:
+        def append():
+            with open(self.log_path, "a") as log:
+                log.write(f"{index} {digest}\n")
+
+        await run_in_threadpool(append)
+
+    def received_ranges(self, received: dict[int, str]) -> list[list[int]]:
+        """已接收的字节区间（左闭右开，相邻区间合并）"""
+        ranges: list[list[int]] = []
+        for index in sorted(received):
+            start = index * self.chunk_size
+            end = start + self.chunk_length(index)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        return ranges
+
+    async def write_chunk(self, offset: int, body: AsyncIterator[bytes], expected_sha256: Optional[str]) -> str:
+        """流式写入一个分片，校验长度和可选的分片 sha256，返回分片 sha256"""
+        if offset % self.chunk_size or not 0 <= offset < max(self.size, 1):
+            raise HTTPException(status_code=400, detail="分片偏移必须是分片大小的整数倍且在文件范围内")
+        index = offset // self.chunk_size
+        self.writing += 1
+        try:
+            return await self._write_chunk(index, body, expected_sha256)
+        finally:
+            self.writing -= 1
+
+    async def _write_chunk(self, index: int, body: AsyncIterator[bytes], expected_sha256: Optional[str]) -> str:
+        offset = index * self.chunk_size
+        length = self.chunk_length(index)
+        if index in await self.received():
+            # 重传已确认的分片：先撤销确认，写入中途失败时该分片重新计为缺失
+            await self._append_log(index, "-")
+            await self._rewind_hash(offset)
+
+        hasher = hashlib.sha256()
+        written = 0
+        buffer = bytearray()
+        fd = await run_in_threadpool(os.open, self.data_path, os.O_WRONLY)
+        try:
+            async for piece in body:
+                if written + len(buffer) + len(piece) > length:
+                    raise HTTPException(status_code=400, detail=f"分片长度超出 {length} 字节")
+                hasher.update(piece)
+                buffer += piece
+                if len(buffer) >= IO_BLOCK_SIZE:
+                    await run_in_threadpool(os.pwrite, fd, bytes(buffer), offset + written)
+                    written += len(buffer)
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(os.pwrite, fd, bytes(buffer), offset + written)
+                written += len(buffer)
+            if written != length:
+                raise HTTPException(status_code=400, detail=f"分片长度应为 {length} 字节，实际 {written} 字节")
+            digest = hasher.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != digest:
+                raise HTTPException(status_code=400, detail="分片校验和不匹配")
+            # 数据落盘后再记录分片，保证日志中的分片一定完整
+            await run_in_threadpool(os.fsync, fd)
+        finally:
+            os.close(fd)
+
+        await self._append_log(index, digest)
+        await self.advance_hash()
+        return digest
+
+    async def _rewind_hash(self, offset: int) -> None:
+        """offset 处的数据将被改写：已计算到其后的整文件 sha256 需从头重算"""
+        async with self._hash_lock:
+            if offset < self._hashed_upto:
+                self._hasher = hashlib.sha256()
+                self._hashed_upto = 0
+
+    async def advance_hash(self) -> int:
+        """把整文件 sha256 推进到已连续接收的末尾，返回已计算的字节数"""
+        async with self._hash_lock:
+            received = await self.received()
+            target = self._hashed_upto
+            while target < self.size and target // self.chunk_size in received:
+                target += self.chunk_length(target // self.chunk_size)
+            if target > self._hashed_upto:
+                await run_in_threadpool(self._hash_range, self._hashed_upto, target)
+                self._hashed_upto = target
+            return self._hashed_upto
+
+    def _hash_range(self, start: int, end: int) -> None:
+        with open(self.data_path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining:
+                block = f.read(min(IO_BLOCK_SIZE, remaining))
+                self._hasher.update(block)
+                remaining -= len(block)
+
+    async def verify(self, expected_sha256: Optional[str]) -> str:
+        """校验所有分片已到达且整文件校验和一致，返回 sha256（不改动会话，失败后可继续上传或重试）"""
+        received = await self.received()
+        missing = [i for i in range(self.chunk_count) if i not in received]
+        if self.size and missing:
+            raise HTTPException(status_code=409, detail=f"还有 {len(missing)} 个分片未上传")
+        await self.advance_hash()
+        digest = self._hasher.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            raise HTTPException(status_code=400, detail="文件校验和不匹配")
+        return digest
+
+class UploadManager:
+    """上传会话管理"""
+
+    def __init__(self, root: Path, chunk_size: int, max_file_size: int):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_file_size = max_file_size
+        self._sessions: dict[str, UploadSession] = {}
+
+    async def create(self, user_id: UUID, filename: str, size: int, model_id: Optional[UUID] = None) -> UploadSession:
+        if size > self.max_file_size:
+            raise HTTPException(status_code=413, detail=f"文件超过 {self.max_file_size} 字节上限")
+        upload_id = uuid.uuid4().hex
+        directory = self.root / upload_id
+        meta = {
+            "id": upload_id,
+            "user_id": str(user_id),
+            "model_id": str(model_id) if model_id else None,
+            "filename": Path(filename).name,
+            "size": size,
+            "chunk_size": self.chunk_size,
+        }
+        await run_in_threadpool(self._create_files, directory, meta)
+        session = self._sessions[upload_id] = UploadSession(directory, meta)
+        return session
+
+    @staticmethod
+    def _create_files(directory: Path, meta: dict) -> None:
+        directory.mkdir(parents=True)
+        (directory / "meta.json").write_text(json.dumps(meta))
+        # 预分配稀疏文件，分片直接按偏移写入
+        with open(directory / "data", "wb") as f:
+            f.truncate(meta["size"])
+
+    async def get(self, upload_id: str, user_id: UUID) -> UploadSession:
+        session = self._sessions.get(upload_id)
+        if session is None:
+            directory = self.root / upload_id
+            meta = await run_in_threadpool(self._read_meta, directory) if upload_id.isalnum() else None
+            if meta is None:
+                raise HTTPException(status_code=404, detail="上传会话不存在")
+            session = self._sessions[upload_id] = UploadSession(directory, meta)
+        if session.meta["user_id"] != str(user_id):
+            raise HTTPException(status_code=403, detail="无权访问此上传会话")
+        return session
+
+    @staticmethod
+    def _read_meta(directory: Path) -> Optional[dict]:
+        meta_path = directory / "meta.json"
+        return json.loads(meta_path.read_text()) if meta_path.exists() else None
+
+    def forget(self, upload_id: str) -> None:
+        self._sessions.pop(upload_id, None)
+
+    async def discard(self, upload_id: str) -> None:
+        """删除会话及其已接收的数据"""
+        self.forget(upload_id)
+        await run_in_threadpool(shutil.rmtree, self.root / upload_id, True)
+
+    async def sweep(self, ttl: float) -> int:
+        """删除超过 ttl 秒没有活动（创建、写入分片）的会话，返回删除的会话数"""
+        removed = 0
+        for upload_id in await run_in_threadpool(self._idle_sessions, time.time() - ttl):
+            session = self._sessions.get(upload_id)
+            if session is not None and session.writing:
+                continue
+            await self.discard(upload_id)
+            removed += 1
+        return removed
+
+    def _idle_sessions(self, cutoff: float) -> list[str]:
+        if not self.root.exists():
+            return []
+        idle = []
+        for directory in self.root.iterdir():
+            try:
+                last_active = max(
+                    path.stat().st_mtime
+                    for path in (directory, directory / "data", directory / "chunks.log")
+                    if path.exists()
+                )
+            except (FileNotFoundError, ValueError):
+                continue  # 会话正被完成或删除
+            if last_active < cutoff:
+                idle.append(directory.name)
+        return idle
+
+
+class UploadSweeper:
+    """定期删除过期上传会话的后台任务"""
+
+    def __init__(self, manager: UploadManager, ttl: float, interval: float):
+        self.manager = manager
+        self.ttl = ttl
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed = await self.manager.sweep(self.ttl)
+                if removed:
+                    logger.info("删除了 %d 个过期的上传会话", removed)
+            except Exception:
+                logger.exception("清理上传会话失败")
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+upload_manager = UploadManager(
+    root=Path(settings.UPLOAD_DIR) / "sessions",
+    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    max_file_size=settings.MAX_FILE_SIZE,
+)
+upload_sweeper = UploadSweeper(upload_manager, settings.UPLOAD_SESSION_TTL, settings.UPLOAD_SWEEP_INTERVAL)
@@ -0,0 +1,7 @@
+"""性能基准脚本（不随应用部署，在 backend 目录下以 python -m benchmarks.<name> 运行）
+
+- seed：生成合成模型目录（10^4 - 10^6 个模型及评论、点赞）
+- load：并发负载测试，输出各接口吞吐和延迟分位数（JSON）
+- compare：比较两次 load 结果，判断回归
+- serialization：列表序列化微基准
+"""
@@ -0,0 +1,43 @@
+"""基准测试用的完整应用：挂载 app/api 下的全部路由（前缀 /api）
+
+    uvicorn benchmarks.app:app --workers 4     # 作为独立服务压测
+load 驱动默认在进程内通过 ASGI 直接调用 create_app() 的应用。
+"""
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.database import close_db, database_stats
+from app.main import ROUTERS
+from app.services.counters import counter_buffer
+from app.services.metrics import MetricsMiddleware
+from app.services.profiler import ProfilerMiddleware, profiler
+from app.services.serialization import FastJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """计数器写回和慢查询 EXPLAIN 任务（场景中没有上传，不启动文件检查进程池）"""
+    counter_buffer.start()
+    profiler.start()
+    yield
+    await profiler.stop()
+    await counter_buffer.stop()
+    await close_db()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="AI Model Hub (benchmark)", lifespan=lifespan, default_response_class=FastJSONResponse)
+    for module in ROUTERS:
+        app.include_router(module.router, prefix="/api")
+    app.add_middleware(ProfilerMiddleware)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "database": database_stats()}
+
+    return app
+
+
+app = create_app()
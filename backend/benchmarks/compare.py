@@ -0,0 +1,62 @@
+"""比较两次负载测试结果（benchmarks.load 的 JSON 输出）
+
+    python -m benchmarks.compare results/base.json results/head.json [--threshold 10]
+
+逐个接口列出吞吐和 p50 / p95 / p99 的变化；任一接口的 p95 变慢或吞吐下降超过阈值（百分比）时
+以退出码 1 结束，便于在脚本中判断回归。
+"""
+import argparse
+import json
+import sys
+
+
+def change(before: float, after: float) -> float:
+    """相对变化（百分比）"""
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[str], list[str]]:
+    lines = [f"{'接口':<32}{'req/s':>18}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}"]
+    regressions = []
+    for name in sorted(set(base["endpoints"]) | set(head["endpoints"])):
+        before, after = base["endpoints"].get(name), head["endpoints"].get(name)
+        if before is None or after is None:
+            lines.append(f"{name:<32}{'（仅在一侧出现）':>18}")
+            continue
+        cells = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            delta = change(before[key], after[key])
+            cells.append(f"{after[key]:>9.1f} {delta:>+7.1f}%")
+        lines.append(f"{name:<32}" + "".join(f"{c:>18}" for c in cells))
+        if change(before["p95_ms"], after["p95_ms"]) > threshold:
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {after['p95_ms']} ms")
+        if change(before["rps"], after["rps"]) < -threshold:
+            regressions.append(f"{name}: 吞吐 {before['rps']} -> {after['rps']} req/s")
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比较两次负载测试结果")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="判定为回归的变化百分比")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+
+    print(f"base: {base['meta'].get('revision')}  head: {head['meta'].get('revision')}")
+    lines, regressions = compare(base, head, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n超过 {args.threshold}% 的回归：")
+        print("\n".join(f"  {r}" for r in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""并发负载驱动：多个虚拟用户按场景权重混合读写，输出每个接口的吞吐和延迟分位数（JSON）
+
+    python -m benchmarks.load --users 50 --duration 60 --output results/HEAD.json
+    python -m benchmarks.load --base-url http://localhost:8000/api ...   # 压测已启动的服务
+
+默认在进程内通过 ASGI 调用 benchmarks.app 的完整应用（与 seed 使用同一个 DATABASE_URL），
+不经过网络，客户端与服务端共用一个事件循环。虚拟用户使用 seed 生成的账号（userN@bench.example.com）。
+
+场景：
+- browse：按最新 / 热门 / 热度 / 评分翻页（游标翻到下一页），打开详情和评论
+- search：中英文搜索词
+- filter：按分类和标签筛选，读取分面计数
+- like：点赞，半数随后取消
+- comment：发表评论
+- login_burst：若干用户同时登录
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Optional
+
+import httpx
+
+from benchmarks.seed import BASE_TAGS, CATEGORIES, CJK_PHRASES, EMAIL_DOMAIN, NAME_STEMS, PASSWORD, WORDS
+
+DEFAULT_MIX = {"browse": 45, "search": 20, "filter": 15, "like": 10, "comment": 5, "login_burst": 5}
+SORTS = ("latest", "popular", "trending", "rating")
+LOGIN_BURST_SIZE = 5
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """最近秩法分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """按接口名记录延迟和状态码"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.enabled = True
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            status = exc.__class__.__name__
+            response = None
+        else:
+            status = str(response.status_code)
+        if self.enabled:
+            self.latencies[name].append(time.perf_counter() - start)
+            self.statuses[name][status] += 1
+        return response if response is not None and response.status_code < 400 else None
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            statuses = self.statuses[name]
+            errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400)
+            endpoints[name] = {
+                "count": len(values),
+                "errors": errors,
+                "rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+                "statuses": dict(sorted(statuses.items())),
+            }
+        total = sum(e["count"] for e in endpoints.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    """一个虚拟用户（已登录）"""
+
+    def __init__(self, index: int, client: httpx.AsyncClient, recorder: Recorder, model_ids: list[str],
+                 user_count: int, seed: int):
+        self.index = index
+        self.client = client
+        self.recorder = recorder
+        self.model_ids = model_ids
+        self.user_count = user_count
+        self.rng = random.Random(seed * 100_003 + index)
+        self.headers: dict[str, str] = {}
+
+    async def get(self, name: str, url: str, **kwargs):
+        return await self.recorder.request(self.client, name, "GET", url, headers=self.headers, **kwargs)
+
+    async def login(self, user: int, name: str = "POST /auth/login"):
+        return await self.recorder.request(
+            self.client, name, "POST", "/auth/login",
+            json={"email": f"user{user}@{EMAIL_DOMAIN}", "password": PASSWORD},
+        )
+
+    async def sign_in(self) -> None:
+        response = await self.login(self.index % self.user_count)
+        if response is not None:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def model_id(self) -> str:
+        # 热门模型被访问得更多：偏向列表前部
+        return self.model_ids[min(int(self.rng.paretovariate(1.2)) - 1, len(self.model_ids) - 1)]
+
+    async def browse(self) -> None:
+        params = {"sort": self.rng.choice(SORTS), "page_size": 20}
+        response = await self.get("GET /models", "/models", params=params)
+        if response is not None and response.json().get("next_cursor") and self.rng.random() < 0.5:
+            params["cursor"] = response.json()["next_cursor"]
+            await self.get("GET /models (cursor)", "/models", params=params)
+        model_id = self.model_id()
+        await self.get("GET /models/{id}", f"/models/{model_id}")
+        if self.rng.random() < 0.5:
+            await self.get("GET /models/{id}/comments", f"/models/{model_id}/comments")
+
+    async def search(self) -> None:
+        term = self.rng.choice([
+            self.rng.choice(CJK_PHRASES),
+            self.rng.choice(WORDS),
+            f"{self.rng.choice(NAME_STEMS)} {self.rng.choice(WORDS)}",
+        ])
+        params = {"search": term, "sort": self.rng.choice(("relevance", "latest"))}
+        await self.get("GET /models (search)", "/models", params=params)
+
+    async def filter(self) -> None:
+        category = self.rng.choice(list(CATEGORIES))
+        tags = self.rng.sample(BASE_TAGS[:20], self.rng.randint(1, 2))
+        params = {"category": category, "tags": tags, "tag_match": self.rng.choice(("all", "any"))}
+        await self.get("GET /models (tags)", "/models", params=params)
+        await self.get("GET /models/facets", "/models/facets", params={"category": category})
+
+    async def like(self) -> None:
+        model_id = self.model_id()
+        await self.recorder.request(
+            self.client, "POST /models/{id}/like", "POST", f"/models/{model_id}/like", headers=self.headers
+        )
+        if self.rng.random() < 0.5:
+            await self.recorder.request(
+                self.client, "DELETE /models/{id}/like", "DELETE", f"/models/{model_id}/like", headers=self.headers
+            )
+
+    async def comment(self) -> None:
+        model_id = self.model_id()
+        await self.recorder.request(
+            self.client, "POST /models/{id}/comments", "POST", f"/models/{model_id}/comments",
+            headers=self.headers,
+            json={"content": f"benchmark comment {self.rng.random():.6f}", "rating": self.rng.randint(1, 5)},
+        )
+
+    async def login_burst(self) -> None:
+        users = [self.rng.randrange(self.user_count) for _ in range(LOGIN_BURST_SIZE)]
+        await asyncio.gather(*(self.login(user, "POST /auth/login (burst)") for user in users))
+
+    async def run(self, mix: dict[str, int], deadline: float) -> None:
+        scenarios = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        while time.perf_counter() < deadline:
+            await self.rng.choices(scenarios, weights=weights)[0]()
+
+
+async def collect_model_ids(client: httpx.AsyncClient, recorder: Recorder, limit: int) -> list[str]:
+    """按热度取前 limit 个模型 id（虚拟用户按热度偏向访问）"""
+    ids, cursor = [], None
+    while len(ids) < limit:
+        params = {"sort": "popular", "page_size": 100, "fields": "id"}
+        if cursor:
+            params["cursor"] = cursor
+        response = await recorder.request(client, "setup", "GET", "/models", params=params)
+        if response is None:
+            break
+        body = response.json()
+        ids += [item["id"] for item in body["items"]]
+        cursor = body.get("next_cursor")
+        if not cursor:
+            break
+    return ids[:limit]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value: Optional[str]) -> dict[str, int]:
+    """--mix browse=60,search=40"""
+    if not value:
+        return DEFAULT_MIX
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"未知场景: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        database = None
+        lifespan = None
+    else:
+        from benchmarks.app import app
+        from app.database import engine
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark/api", timeout=args.timeout
+        )
+        database = engine.url.render_as_string(hide_password=True)
+        lifespan = app.router.lifespan_context(app)
+
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            setup = Recorder()
+            model_ids = await collect_model_ids(client, setup, args.hot_models)
+            if not model_ids:
+                raise SystemExit("没有可用的模型数据，请先运行 python -m benchmarks.seed")
+            recorder = Recorder()
+            users = [
+                VirtualUser(i, client, recorder, model_ids, args.accounts, args.seed) for i in range(args.users)
+            ]
+            # 登录不计入结果
+            recorder.enabled = False
+            await asyncio.gather(*(user.sign_in() for user in users))
+            recorder.enabled = True
+
+            if args.warmup:
+                recorder.enabled = False
+                deadline = time.perf_counter() + args.warmup
+                await asyncio.gather(*(user.run(args.mix, deadline) for user in users))
+                recorder.enabled = True
+
+            start = time.perf_counter()
+            await asyncio.gather(*(user.run(args.mix, start + args.duration) for user in users))
+            elapsed = time.perf_counter() - start
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    result = recorder.report(elapsed)
+    result["meta"] = {
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+        "database": database,
+        "users": args.users,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "mix": args.mix,
+        "seed": args.seed,
+        "python": platform.python_version(),
+    }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="并发负载测试")
+    parser.add_argument("--users", type=int, default=20, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=30.0, help="秒")
+    parser.add_argument("--warmup", type=float, default=5.0, help="预热秒数（不计入结果）")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="场景权重，如 browse=60,search=40")
+    parser.add_argument("--accounts", type=int, default=100, help="seed 生成的用户数（虚拟用户从中选取账号）")
+    parser.add_argument("--hot-models", type=int, default=1000, help="访问的模型集合大小（按热度）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-url", default=None, help="压测已启动的服务，如 http://localhost:8000/api")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default=None, help="结果 JSON 文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    body = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(body + "\n")
+        print(f"{result['requests']} 个请求，{result['rps']} req/s，{result['errors']} 个错误 -> {args.output}")
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""合成模型目录生成器：用户、模型、评论、点赞
+
+    python -m benchmarks.seed --models 100000 [--users N] [--seed 42] [--reset]
+
+使用当前 DATABASE_URL（本地 PostgreSQL 或嵌入式后端）。同一 --seed 生成完全相同的数据。
+分布：
+- 分类、框架、文件格式按固定权重；标签取自约 500 个标签的词表，按 Zipf 分布抽取 1-6 个
+- 热度（点赞、评论、下载、浏览）服从 Pareto 分布，少数模型占大部分互动
+- 评分偏向 4-5 星；描述长度 100-1500 字，中英文混排
+
+模型的计数、评分聚合、热度分数和检索词元在生成时直接算好；分面计数最后按模型表重算。
+所有用户的密码都是 benchmark（见 PASSWORD）。
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import insert, select
+
+from app.database import Base, async_session_maker, close_db, engine
+from app.models.models import Category, Comment, Like, Model, ModelTag, User
+from app.services import trending
+from app.services.auth import get_password_hash
+from app.services.facets import rebuild_facet_counts
+from app.services.search import build_document
+from app.services.tags import normalize_tags
+
+PASSWORD = "benchmark"
+EMAIL_DOMAIN = "bench.example.com"  # .local 等保留域名不能通过 EmailStr 校验
+
+CATEGORIES = {
+    "nlp": ("自然语言处理", 0.45),
+    "cv": ("计算机视觉", 0.30),
+    "audio": ("语音与音频", 0.10),
+    "multimodal": ("多模态", 0.15),
+}
+FRAMEWORKS = {"pytorch": 0.6, "tensorflow": 0.15, "onnx": 0.1, "jax": 0.05, None: 0.1}
+FILE_FORMATS = {".safetensors": 0.5, ".bin": 0.2, ".pt": 0.15, ".onnx": 0.1, ".gguf": 0.05}
+
+BASE_TAGS = [
+    "llm", "transformer", "pytorch", "text generation", "chat", "instruct", "code", "translation",
+    "summarization", "embedding", "bert", "gpt", "llama", "mistral", "qwen", "chinese", "multilingual",
+    "image classification", "object detection", "segmentation", "stable diffusion", "image generation",
+    "vit", "clip", "ocr", "speech recognition", "text to speech", "whisper", "audio classification",
+    "lora", "quantized", "gguf", "int8", "fp16", "rlhf", "rag", "agent", "vision language", "video",
+    "medical", "finance", "legal", "education",
+]
+TAG_VOCABULARY = BASE_TAGS + [f"topic-{i}" for i in range(500 - len(BASE_TAGS))]
+
+NAME_PREFIXES = ["swift", "tiny", "deep", "open", "mega", "nano", "bright", "quantum", "neural", "smart", "lite"]
+NAME_STEMS = ["llama", "falcon", "phoenix", "panda", "vision", "whisper", "coder", "painter", "scribe", "echo"]
+NAME_SIZES = ["1b", "3b", "7b", "13b", "34b", "70b", "base", "large", "xl", "mini"]
+WORDS = (
+    "model trained on large scale data with strong performance for reasoning retrieval dialogue "
+    "vision speech benchmark fine tuned efficient inference quantization context window tokens "
+    "multilingual instruction alignment safety evaluation dataset open source license"
+).split()
+CJK_PHRASES = [
+    "大语言模型", "中文对话", "图像生成", "语音识别", "文本分类", "机器翻译", "代码生成", "知识问答",
+    "多模态理解", "高效推理", "指令微调", "长上下文", "开源许可", "目标检测", "情感分析",
+]
+COMMENT_TEXTS = ["效果很好", "推理速度快", "中文表现不错", "文档清晰", "显存占用偏高", "great model", "works well", "needs docs"]
+RATING_WEIGHTS = [0.05, 0.05, 0.15, 0.35, 0.40]
+
+
+class Catalog:
+    """按种子生成确定的合成数据"""
+
+    def __init__(self, seed: int, users: int, likes_mean: float, comments_mean: float, anchor: datetime):
+        self.rng = random.Random(seed)
+        self.user_count = users
+        self.likes_mean = likes_mean
+        self.comments_mean = comments_mean
+        self.anchor = anchor
+        self.user_ids = [self.uuid() for _ in range(users)]
+        tag_weights = [1 / (rank + 1) ** 1.1 for rank in range(len(TAG_VOCABULARY))]
+        self.tag_cum_weights = list(accumulate(tag_weights))
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def choice(self, weights: dict):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def pareto(self, mean: float, cap: int) -> int:
+        # alpha=1.5 的 Pareto 分布均值为 3 × xm
+        return min(cap, int(self.rng.paretovariate(1.5) * mean / 3))
+
+    def moment(self, after: datetime) -> datetime:
+        """after 与 anchor 之间的随机时刻"""
+        span = (self.anchor - after).total_seconds()
+        return after + timedelta(seconds=self.rng.random() * max(span, 1))
+
+    def users(self, password_hash: str) -> list[dict]:
+        created = self.anchor - timedelta(days=730)
+        return [
+            {
+                "id": user_id, "email": f"user{i}@{EMAIL_DOMAIN}", "username": f"user{i}",
+                "hashed_password": password_hash, "is_active": 1,
+                "created_at": created, "updated_at": created,
+            }
+            for i, user_id in enumerate(self.user_ids)
+        ]
+
+    def description(self) -> str:
+        parts = []
+        length = self.rng.randint(100, 1500)
+        while sum(map(len, parts)) < length:
+            if self.rng.random() < 0.4:
+                parts.append(self.rng.choice(CJK_PHRASES))
+            else:
+                parts.append(" ".join(self.rng.choices(WORDS, k=self.rng.randint(4, 12))))
+        return "，".join(parts)
+
+    def model(self, index: int) -> tuple[dict, list[dict], list[dict], list[dict]]:
+        """一个模型及其标签侧表行、评论和点赞"""
+        rng = self.rng
+        model_id = self.uuid()
+        created = self.anchor - timedelta(seconds=rng.random() * 365 * 86400)
+        name = f"{rng.choice(NAME_PREFIXES)}-{rng.choice(NAME_STEMS)}-{rng.choice(NAME_SIZES)}-{index}"
+        tags = normalize_tags(
+            TAG_VOCABULARY[i] for i in self._tag_indexes(rng.randint(1, 6))
+        )
+        description = self.description()
+
+        like_users = rng.sample(self.user_ids, self.pareto(self.likes_mean, self.user_count))
+        likes = [
+            {"id": self.uuid(), "model_id": model_id, "user_id": user_id, "created_at": self.moment(created)}
+            for user_id in like_users
+        ]
+        comments = []
+        ratings = [0] * 5
+        for _ in range(self.pareto(self.comments_mean, 10000)):
+            rating = rng.choices(range(1, 6), weights=RATING_WEIGHTS)[0]
+            ratings[rating - 1] += 1
+            at = self.moment(created)
+            comments.append({
+                "id": self.uuid(), "model_id": model_id, "user_id": rng.choice(self.user_ids),
+                "content": rng.choice(COMMENT_TEXTS), "rating": rating, "created_at": at, "updated_at": at,
+            })
+
+        downloads = self.pareto(max(self.likes_mean, 1) * 20, 10_000_000)
+        views = downloads * rng.randint(3, 20)
+        score = sum(trending.increment("likes", at=like["created_at"]) for like in likes)
+        score += sum(trending.increment("comments", at=comment["created_at"]) for comment in comments)
+        # 下载和浏览不逐条生成，按发生在创建到现在之间的均匀时刻近似
+        score += trending.increment("downloads", downloads, at=self.moment(created))
+        score += trending.increment("views", views, at=self.moment(created))
+
+        rating_count = sum(ratings)
+        rating_sum = sum((i + 1) * n for i, n in enumerate(ratings))
+        row = {
+            "id": model_id, "name": name, "description": description,
+            "category": self.choice({k: w for k, (_, w) in CATEGORIES.items()}),
+            "tags": tags, "framework": self.choice(FRAMEWORKS), "version": "1.0.0",
+            "file_url": None, "file_size": rng.randint(10, 140_000) * 1_000_000,
+            "file_format": self.choice(FILE_FORMATS),
+            "downloads": downloads, "likes_count": len(likes), "comments_count": len(comments), "views": views,
+            "trending_score": score,
+            "rating_sum": rating_sum, "rating_count": rating_count,
+            "rating_avg": rating_sum / rating_count if rating_count else 0.0,
+            **{f"rating_{i + 1}": n for i, n in enumerate(ratings)},
+            "api_endpoint": None,
+            "api_docs": "## 调用示例\n" + "curl -X POST ...\n" * rng.randint(1, 50) if rng.random() < 0.3 else None,
+            "search_document": " ".join(build_document(name, description, tags)),
+            "author_id": rng.choice(self.user_ids),
+            "created_at": created, "updated_at": created,
+        }
+        tag_rows = [{"tag": tag, "model_id": model_id} for tag in tags]
+        return row, tag_rows, comments, likes
+
+    def _tag_indexes(self, count: int) -> set[int]:
+        picked = set()
+        while len(picked) < count:
+            picked.add(self.rng.choices(range(len(TAG_VOCABULARY)), cum_weights=self.tag_cum_weights)[0])
+        return picked
+
+
+async def seed(args) -> dict:
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        if args.reset:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    catalog = Catalog(args.seed, args.users, args.likes, args.comments, datetime.fromisoformat(args.anchor))
+    counts = {"users": args.users, "models": 0, "comments": 0, "likes": 0}
+    async with async_session_maker() as session:
+        side_table = session.bind.dialect.name != "postgresql"
+        # 所有用户共用同一个密码哈希（只计算一次 bcrypt）
+        users = catalog.users(get_password_hash(PASSWORD))
+        for start in range(0, len(users), args.batch):
+            await session.execute(insert(User.__table__), users[start:start + args.batch])
+
+        existing = set((await session.execute(select(Category.slug))).scalars())
+        categories = [
+            {"id": catalog.uuid(), "name": name, "slug": slug, "sort_order": i}
+            for i, (slug, (name, _)) in enumerate(CATEGORIES.items()) if slug not in existing
+        ]
+        if categories:
+            await session.execute(insert(Category.__table__), categories)
+
+        for start in range(0, args.models, args.batch):
+            models, tag_rows, comments, likes = [], [], [], []
+            for index in range(start, min(start + args.batch, args.models)):
+                row, tags, model_comments, model_likes = catalog.model(index)
+                models.append(row)
+                tag_rows += tags
+                comments += model_comments
+                likes += model_likes
+            await session.execute(insert(Model.__table__), models)
+            if side_table and tag_rows:
+                await session.execute(insert(ModelTag.__table__), tag_rows)
+            for table, rows in ((Comment.__table__, comments), (Like.__table__, likes)):
+                for offset in range(0, len(rows), args.batch):
+                    await session.execute(insert(table), rows[offset:offset + args.batch])
+            await session.commit()
+            counts["models"] += len(models)
+            counts["comments"] += len(comments)
+            counts["likes"] += len(likes)
+            if not args.quiet:
+                print(f"已写入 {counts['models']}/{args.models} 个模型", flush=True)
+
+        await rebuild_facet_counts(session)
+
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    counts["database"] = engine.url.render_as_string(hide_password=True)
+    counts["seed"] = args.seed
+    # 退出前关闭连接池（否则连接在事件循环关闭后才被回收）
+    await close_db()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成合成模型目录")
+    parser.add_argument("--models", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=None, help="默认为模型数的 1/10（至少 100）")
+    parser.add_argument("--likes", type=float, default=10.0, help="每个模型的平均点赞数")
+    parser.add_argument("--comments", type=float, default=3.0, help="每个模型的平均评论数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", default="2025-06-01T00:00:00", help="数据的“当前时间”（保证可复现）")
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--reset", action="store_true", help="先删除并重建所有表")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    if args.users is None:
+        args.users = max(100, args.models // 10)
+    print(json.dumps(asyncio.run(seed(args)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
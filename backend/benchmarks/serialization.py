@@ -0,0 +1,132 @@
+"""模型列表序列化微基准：100 条一页，比较每条的序列化耗时
+
+    python -m benchmarks.serialization [--items 100] [--rounds 200]
+
+- response_model：原路径，ORM 对象 -> ModelResponse 列表，经 FastAPI response_model
+  再校验、转换为 JSON 兼容对象后由标准库 json 编码
+- single_pass：ORM 对象按 ModelResponse 校验一次，pydantic-core 直接输出 JSON
+- slim_rows：列表实际使用的路径，默认卡片字段的结果行直接编码
+- msgpack：slim_rows 的 JSON 再转换为 msgpack（需要安装 msgpack）
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from app.models.models import Model, User
+from app.schemas.schemas import ModelResponse
+from app.services import serialization
+from app.services.projections import AUTHOR_COLUMNS, DEFAULT_LIST_FIELDS, SUMMARY_LENGTH, row_to_item
+
+
+class FullListResponse(BaseModel):
+    """原列表响应结构（条目为完整的 ModelResponse）"""
+    items: List[ModelResponse]
+    total: Optional[int] = None
+    page: int
+    page_size: int
+    next_cursor: Optional[str] = None
+
+
+def make_models(count: int) -> list[Model]:
+    """构造内存中的模型对象（描述和 API 文档使用接近真实的长度）"""
+    now = datetime(2024, 6, 1)
+    author = User(id=uuid.uuid4(), username="benchmark", email="bench@example.com", avatar="https://example.com/a.png")
+    models = []
+    for i in range(count):
+        model = Model(
+            id=uuid.uuid4(), name=f"model-{i}", description="这是一个用于基准测试的模型描述。" * 60,
+            category="nlp", tags=["llm", "pytorch", "transformer"], framework="pytorch", version="1.0.0",
+            file_url=None, file_size=1 << 30, file_format=".safetensors", file_sha256="0" * 64,
+            downloads=1000 + i, likes_count=i, comments_count=i % 7, views=10 * i,
+            rating_sum=4 * i, rating_count=i, rating_avg=4.0, rating_1=0, rating_2=0, rating_3=0,
+            rating_4=i, rating_5=0, parameter_count=7_000_000_000, inspection_status="done",
+            inspection=None, api_endpoint="https://example.com/v1/infer", api_docs="## 调用示例\n" * 200,
+            author_id=author.id, created_at=now - timedelta(hours=i), updated_at=now,
+        )
+        model.author = author
+        models.append(model)
+    return models
+
+
+def make_rows(models: list[Model]) -> list:
+    """默认字段的结果行（与 list_columns 的列名一致）"""
+    rows = []
+    for model in models:
+        mapping = {
+            field: getattr(model, field) for field in DEFAULT_LIST_FIELDS if field not in ("summary", "author")
+        }
+        mapping["summary"] = model.description[:SUMMARY_LENGTH]
+        for column in AUTHOR_COLUMNS:
+            mapping[f"author__{column.key}"] = getattr(model.author, column.key)
+        rows.append(SimpleNamespace(_mapping=mapping))
+    return rows
+
+
+def bench(fn, rounds: int) -> float:
+    """多轮中取最快一轮的耗时（秒）"""
+    fn()
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    models = make_models(args.items)
+    rows = make_rows(models)
+    field = create_response_field(name="bench", type_=FullListResponse)
+    loop = asyncio.new_event_loop()
+
+    def response_model_path() -> bytes:
+        content = FullListResponse(items=models, total=len(models), page=1, page_size=len(models))
+        data = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(data).body
+
+    def single_pass() -> bytes:
+        items = serialization.dump_orm(list[ModelResponse], models)
+        return b'{"items":' + items + b',"total":%d,"page":1,"page_size":%d,"next_cursor":null}' % (
+            len(models), len(models)
+        )
+
+    def slim_rows() -> bytes:
+        return serialization.dumps({
+            "items": [row_to_item(row, DEFAULT_LIST_FIELDS) for row in rows],
+            "total": len(rows), "page": 1, "page_size": len(rows), "next_cursor": None,
+        })
+
+    cases = [("response_model", response_model_path), ("single_pass", single_pass), ("slim_rows", slim_rows)]
+    if serialization.msgpack is not None:
+        body = slim_rows()
+        cases.append(("msgpack", lambda: serialization.to_msgpack(body)))
+
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"{args.items} 条 / 页，{args.rounds} 轮取最快，JSON 编码器：{encoder}")
+    print(f"{'路径':<16}{'每页 ms':>10}{'每条 µs':>10}{'响应字节':>12}")
+    baseline = None
+    for name, fn in cases:
+        seconds = bench(fn, args.rounds)
+        baseline = baseline or seconds
+        size = len(fn())
+        print(f"{name:<16}{seconds * 1000:>10.2f}{seconds / args.items * 1e6:>10.1f}{size:>12}"
+              f"  ({baseline / seconds:.1f}x)")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""测试使用嵌入式 SQLite 内存库运行完整 API（在导入 app 之前设置环境变量）"""
+import os
+import tempfile
+import uuid
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DATABASE_REPLICA_URLS"] = "[]"
+os.environ["CACHE_BACKEND"] = "none"  # 每次请求都查询数据库
+os.environ["METRICS_ENABLED"] = "false"
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="hub-test-uploads-"))
+os.environ["UPLOAD_CHUNK_SIZE"] = str(64 * 1024)  # 小分片，测试多分片续传
+
+import httpx
+import pytest
+
+from app.main import app as embedded_app
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def app():
+    async with embedded_app.router.lifespan_context(embedded_app):
+        yield embedded_app
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test/api") as client:
+        yield client
+
+
+@pytest.fixture
+async def auth_headers(client):
+    """新注册用户的认证头（每个测试一个用户）"""
+    name = f"user{uuid.uuid4().hex[:12]}"
+    credentials = {"email": f"{name}@example.com", "password": "secret123"}
+    response = await client.post("/auth/register", json={**credentials, "username": name})
+    assert response.status_code == 201, response.text
+    token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def create_model(client, auth_headers):
+    """通过 API 创建模型，返回响应 JSON"""
+
+    async def create(**fields) -> dict:
+        body = {"name": "model", "category": "nlp", **fields}
+        response = await client.post("/models", json=body, headers=auth_headers)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return create
@@ -0,0 +1,111 @@
+"""响应缓存：single-flight 合并并发加载，命名空间版本号提升使旧键失效"""
+import asyncio
+
+import pytest
+
+from app.services.cache import LIST_NAMESPACE, MemoryBackend, ResponseCache, detail_namespace
+
+pytestmark = pytest.mark.anyio
+
+
+def make_cache() -> ResponseCache:
+    return ResponseCache(MemoryBackend(max_entries=100), ttl=60)
+
+
+async def test_concurrent_misses_load_once():
+    cache = make_cache()
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"value": calls}
+
+    waiters = [asyncio.create_task(cache.get_or_load(LIST_NAMESPACE, {"page": 1}, loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    bodies = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert set(bodies) == {b'{"value":1}'}
+    assert cache.stats() == {"hits": 0, "misses": 1, "coalesced": 4}
+
+
+async def test_cancelled_loader_hands_over_to_waiter():
+    cache = make_cache()
+    started = asyncio.Event()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            started.set()
+            await asyncio.sleep(3600)
+        return {"value": calls}
+
+    first = asyncio.create_task(cache.get_or_load(LIST_NAMESPACE, {}, loader))
+    await started.wait()
+    second = asyncio.create_task(cache.get_or_load(LIST_NAMESPACE, {}, loader))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == b'{"value":2}'
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_loader_error_reaches_waiters_and_is_not_cached():
+    cache = make_cache()
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("boom")
+
+    waiters = [asyncio.create_task(cache.get_or_load(LIST_NAMESPACE, {}, failing)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def ok():
+        return {"ok": True}
+
+    assert await cache.get_or_load(LIST_NAMESPACE, {}, ok) == b'{"ok":true}'
+
+
+async def test_invalidate_bumps_only_the_given_namespaces():
+    cache = make_cache()
+    version = 0
+
+    async def loader():
+        return {"version": version}
+
+    model_id = "6F9619FF-8B86-D011-B42D-00CFB0000001"
+    detail = detail_namespace(model_id)
+    assert await cache.get_or_load(LIST_NAMESPACE, {}, loader) == b'{"version":0}'
+    assert await cache.get_or_load(detail, {}, loader) == b'{"version":0}'
+    assert await cache.get_or_load("categories", {}, loader) == b'{"version":0}'
+
+    version = 1
+    await cache.invalidate_model(model_id.lower())
+    assert await cache.get_or_load(LIST_NAMESPACE, {}, loader) == b'{"version":1}'
+    assert await cache.get_or_load(detail, {}, loader) == b'{"version":1}'
+    assert await cache.get_or_load("categories", {}, loader) == b'{"version":0}'
+
+
+async def test_params_are_normalized():
+    cache = make_cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return []
+
+    await cache.get_or_load(LIST_NAMESPACE, {"page": 1, "search": None, "sort": "latest"}, loader)
+    await cache.get_or_load(LIST_NAMESPACE, {"sort": "latest", "page": 1}, loader)
+    assert calls == 1
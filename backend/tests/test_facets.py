@@ -0,0 +1,60 @@
+"""分面计数表随模型的新增 / 修改 / 删除维护，并与直接聚合的结果一致"""
+import uuid
+
+import pytest
+from sqlalchemy import true
+
+from app.database import async_session_maker
+from app.services.facets import filtered_facets, maintained_facets
+
+pytestmark = pytest.mark.anyio
+
+LIMIT = 1000
+
+
+def counts(body: dict, field: str) -> dict[str, int]:
+    return {item["value"]: item["count"] for item in body[field]}
+
+
+async def maintained() -> dict:
+    async with async_session_maker() as session:
+        return await maintained_facets(session, LIMIT)
+
+
+async def aggregated() -> dict:
+    async with async_session_maker() as session:
+        return await filtered_facets(session, true(), LIMIT)
+
+
+async def test_facets_follow_writes(client, create_model, auth_headers):
+    old, new, tag = (f"facet-{uuid.uuid4().hex[:8]}" for _ in range(3))
+    first = await create_model(name="facet a", category=old, tags=[tag, "facet-shared"], framework="onnx")
+    await create_model(name="facet b", category=old, tags=[tag])
+    facets = await maintained()
+    assert counts(facets, "category")[old] == 2
+    assert counts(facets, "tags")[tag] == 2
+
+    await client.put(f"/models/{first['id']}", json={"category": new, "tags": ["facet-shared"]}, headers=auth_headers)
+    facets = await maintained()
+    assert counts(facets, "category")[old] == 1
+    assert counts(facets, "category")[new] == 1
+    assert counts(facets, "tags")[tag] == 1
+
+    await client.delete(f"/models/{first['id']}", headers=auth_headers)
+    facets = await maintained()
+    assert new not in counts(facets, "category")
+    assert counts(facets, "category")[old] == 1
+    assert facets == await aggregated()
+
+
+async def test_facets_endpoint(client, create_model):
+    category = f"facet-{uuid.uuid4().hex[:8]}"
+    await create_model(name="facet api", category=category, framework="pytorch")
+
+    body = (await client.get("/models/facets", params={"limit": 200})).json()
+    assert counts(body, "category")[category] == 1
+    assert body["truncated"] is False
+
+    filtered = (await client.get("/models/facets", params={"category": category})).json()
+    assert counts(filtered, "category") == {category: 1}
+    assert counts(filtered, "framework") == {"pytorch": 1}
@@ -0,0 +1,65 @@
+"""条件请求（ETag / 304）和 Range 头解析"""
+import pytest
+
+from app.services.files import MAX_RANGES, RangeNotSatisfiable, parse_range
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_model_detail_not_modified(client, create_model, auth_headers):
+    model = await create_model(name="etag detail", category="etag-test")
+    url = f"/models/{model['id']}"
+
+    first = await client.get(url)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    cached = await client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    await client.put(url, json={"description": "changed"}, headers=auth_headers)
+    changed = await client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["description"] == "changed"
+
+
+async def test_model_list_not_modified(client, create_model):
+    await create_model(name="etag list", category="etag-list")
+    params = {"category": "etag-list"}
+
+    first = await client.get("/models", params=params)
+    etag = first.headers["etag"]
+    assert (await client.get("/models", params=params, headers={"If-None-Match": f'"other", {etag}'})).status_code == 304
+
+    await create_model(name="etag list 2", category="etag-list")
+    second = await client.get("/models", params=params, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.json()["total"] == 2
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("items=0-1", None),
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=10-", [(10, 99)]),
+    ("bytes=-10", [(90, 99)]),
+    ("bytes=-1000", [(0, 99)]),
+    ("bytes=50-1000", [(50, 99)]),
+    ("bytes=20-29, 0-9, 5-15", [(0, 15), (20, 29)]),
+    ("bytes=0-9,10-19", [(0, 19)]),
+    ("bytes=0-9, 200-300", [(0, 9)]),
+    ("bytes=9-0", None),
+    ("bytes=a-b", None),
+    ("bytes=10", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=200-300", f"bytes={','.join(f'{i * 3}-{i * 3}' for i in range(MAX_RANGES + 1))}"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 100)
@@ -0,0 +1,197 @@
+"""文件检查：safetensors / ONNX / PyTorch 头部解析，受限 Unpickler 不执行任何代码"""
+import hashlib
+import io
+import json
+import pickle
+import struct
+import sys
+import types
+import zipfile
+from collections import OrderedDict
+
+import pytest
+
+from app.services.inspectors import InspectionError, _Opaque, _RestrictedUnpickler, inspect_file
+
+
+def write_segments(tmp_path, data: bytes, parts: int = 3) -> list[tuple[str, int, int]]:
+    """把数据拆成几个文件分段（与分块存储的读取方式相同）"""
+    step = max(1, len(data) // parts)
+    segments = []
+    for i, start in enumerate(range(0, len(data), step)):
+        path = tmp_path / f"segment{i}"
+        piece = data[start:start + step]
+        path.write_bytes(b"padding" + piece)
+        segments.append((str(path), len(b"padding"), len(piece)))
+    return segments
+
+
+# ============ safetensors ============
+def safetensors_file(header: dict, payload: bytes) -> bytes:
+    encoded = json.dumps(header).encode()
+    return struct.pack("<Q", len(encoded)) + encoded + payload
+
+
+def test_safetensors(tmp_path):
+    data = safetensors_file({
+        "__metadata__": {"format": "pt"},
+        "embed.weight": {"dtype": "F16", "shape": [10, 4], "data_offsets": [0, 80]},
+        "head.bias": {"dtype": "F32", "shape": [4], "data_offsets": [80, 96]},
+    }, bytes(96))
+    result = inspect_file(write_segments(tmp_path, data), "model.safetensors")
+
+    assert result["format"] == ".safetensors"
+    assert result["sha256"] == hashlib.sha256(data).hexdigest()
+    assert result["size"] == len(data)
+    assert result["parameter_count"] == 44
+    assert result["dtypes"] == {"f16": 40, "f32": 4}
+    assert result["metadata"] == {"format": "pt"}
+
+
+def test_safetensors_bad_header(tmp_path):
+    data = struct.pack("<Q", 10 ** 9) + b"{" + bytes(20)
+    with pytest.raises(InspectionError):
+        inspect_file(write_segments(tmp_path, data), "model.safetensors")
+
+
+# ============ ONNX ============
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+def field(number: int, payload) -> bytes:
+    if isinstance(payload, int):
+        return varint(number << 3) + varint(payload)
+    return varint(number << 3 | 2) + varint(len(payload)) + payload
+
+
+def onnx_file() -> bytes:
+    weight = field(1, varint(2) + varint(3)) + field(2, 1) + field(8, b"fc.weight") + field(9, bytes(24))
+    bias = field(1, 3) + field(2, 10) + field(8, b"fc.bias") + field(9, bytes(6))
+    graph = field(1, field(4, b"Gemm")) + field(5, weight) + field(5, bias) + field(2, b"graph")
+    return field(1, 8) + field(2, b"test") + field(8, field(1, b"") + field(2, 17)) + field(7, graph)
+
+
+def test_onnx(tmp_path):
+    result = inspect_file(write_segments(tmp_path, onnx_file()), "net.onnx")
+
+    assert result["format"] == ".onnx"
+    assert result["ir_version"] == 8
+    assert result["producer"] == "test"
+    assert result["opset"] == {"ai.onnx": 17}
+    assert result["node_count"] == 1
+    assert result["parameter_count"] == 9
+    assert result["tensors"] == [
+        {"name": "fc.weight", "dtype": "float32", "shape": [2, 3]},
+        {"name": "fc.bias", "dtype": "float16", "shape": [3]},
+    ]
+
+
+def test_onnx_is_detected_by_file_name(tmp_path):
+    result = inspect_file(write_segments(tmp_path, onnx_file()), "net.bin")
+    assert result["format"] is None
+    assert result["parameter_count"] is None
+
+
+# ============ PyTorch ============
+@pytest.fixture
+def fake_torch(monkeypatch):
+    """最小的 torch 模块替身：只用于生成与 torch.save 结构相同的 pickle"""
+    torch = types.ModuleType("torch")
+    utils = types.ModuleType("torch._utils")
+
+    class FloatStorage:
+        pass
+
+    def _rebuild_tensor_v2(*args):
+        raise AssertionError("不应被调用")
+
+    FloatStorage.__module__ = torch.__name__
+    FloatStorage.__qualname__ = "FloatStorage"
+    _rebuild_tensor_v2.__module__ = utils.__name__
+    _rebuild_tensor_v2.__qualname__ = "_rebuild_tensor_v2"
+    torch.FloatStorage = FloatStorage
+    utils._rebuild_tensor_v2 = _rebuild_tensor_v2
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    monkeypatch.setitem(sys.modules, "torch._utils", utils)
+    return types.SimpleNamespace(FloatStorage=FloatStorage, rebuild=_rebuild_tensor_v2)
+
+
+def torch_file(fake_torch, state_dict: dict) -> bytes:
+    class Storage:
+        def __init__(self, key):
+            self.key = key
+
+    class Tensor:
+        def __init__(self, key, shape):
+            self.key, self.shape = key, shape
+
+        def __reduce__(self):
+            return fake_torch.rebuild, (Storage(self.key), 0, self.shape, (1,) * len(self.shape), False, OrderedDict())
+
+    class Pickler(pickle.Pickler):
+        def persistent_id(self, obj):
+            if isinstance(obj, Storage):
+                return ("storage", fake_torch.FloatStorage, obj.key, "cpu", 0)
+            return None
+
+    pkl = io.BytesIO()
+    Pickler(pkl, protocol=2).dump(OrderedDict(
+        (name, Tensor(str(i), shape)) for i, (name, shape) in enumerate(state_dict.items())
+    ))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("archive/data.pkl", pkl.getvalue())
+        zf.writestr("archive/data/0", bytes(64))
+    return archive.getvalue()
+
+
+def test_pytorch(tmp_path, fake_torch):
+    data = torch_file(fake_torch, {"conv.weight": (8, 3, 3, 3), "conv.bias": (8,)})
+    result = inspect_file(write_segments(tmp_path, data), "model.pt")
+
+    assert result["format"] == ".pt"
+    assert result["parameter_count"] == 8 * 27 + 8
+    assert result["dtypes"] == {"float32": 224}
+    assert [t["name"] for t in result["tensors"]] == ["conv.weight", "conv.bias"]
+
+
+class Exploit:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return exec, (f"open({str(self.path)!r}, 'w').write('owned')",)
+
+
+def test_restricted_unpickler_does_not_run_code(tmp_path):
+    marker = tmp_path / "owned"
+    payload = pickle.dumps({"weights": Exploit(marker)})
+
+    loaded = _RestrictedUnpickler(io.BytesIO(payload)).load()
+    assert isinstance(loaded["weights"], _Opaque)
+    assert not marker.exists()
+
+
+def test_pytorch_with_malicious_pickle(tmp_path):
+    marker = tmp_path / "owned"
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("archive/data.pkl", pickle.dumps({"state_dict": {"w": Exploit(marker)}}))
+    result = inspect_file(write_segments(tmp_path, archive.getvalue()), "model.pt")
+
+    assert result["parameter_count"] == 0
+    assert not marker.exists()
+
+
+def test_pytorch_without_pickle(tmp_path):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("readme.txt", "not a model")
+    with pytest.raises(InspectionError):
+        inspect_file(write_segments(tmp_path, archive.getvalue()), "model.pt")
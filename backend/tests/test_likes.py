@@ -0,0 +1,72 @@
+"""点赞 / 取消点赞幂等；撤销点赞和评论时热度分数恰好扣回"""
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models.models import Like, Model
+from app.services import trending
+
+pytestmark = pytest.mark.anyio
+
+
+async def trending_score(model_id: str) -> float:
+    async with async_session_maker() as session:
+        return (await session.execute(select(Model.trending_score).where(Model.id == uuid.UUID(model_id)))).scalar_one()
+
+
+async def like_rows(model_id: str) -> int:
+    async with async_session_maker() as session:
+        result = await session.execute(select(Like.id).where(Like.model_id == uuid.UUID(model_id)))
+        return len(result.all())
+
+
+async def test_like_and_unlike_are_idempotent(client, create_model, auth_headers):
+    model = await create_model(name="likes")
+    url = f"/models/{model['id']}/like"
+
+    for _ in range(2):
+        response = await client.post(url, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == {"liked": True, "likes_count": 1}
+    assert await like_rows(model["id"]) == 1
+    status = await client.get("/likes/status", params={"model_ids": [model["id"]]}, headers=auth_headers)
+    assert status.json() == {"liked": [model["id"]]}
+
+    for _ in range(2):
+        response = await client.delete(url, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == {"liked": False, "likes_count": 0}
+    assert await like_rows(model["id"]) == 0
+
+
+async def test_like_missing_model(client, auth_headers):
+    url = f"/models/{uuid.uuid4()}/like"
+    assert (await client.post(url, headers=auth_headers)).status_code == 404
+    assert (await client.delete(url, headers=auth_headers)).status_code == 404
+
+
+async def test_unlike_restores_trending_score(client, create_model, auth_headers):
+    model = await create_model(name="trending likes")
+    url = f"/models/{model['id']}/like"
+
+    await client.post(url, headers=auth_headers)
+    await client.post(url, headers=auth_headers)
+    liked = await trending_score(model["id"])
+    assert liked == pytest.approx(trending.increment("likes"), rel=1e-3)
+
+    await client.delete(url, headers=auth_headers)
+    assert await trending_score(model["id"]) == pytest.approx(0.0, abs=liked * 1e-6)
+
+
+async def test_deleted_comment_restores_trending_score(client, create_model, auth_headers):
+    model = await create_model(name="trending comments")
+    response = await client.post(
+        f"/models/{model['id']}/comments", json={"content": "nice", "rating": 5}, headers=auth_headers
+    )
+    commented = await trending_score(model["id"])
+    assert commented > 0
+
+    await client.delete(f"/comments/{response.json()['id']}", headers=auth_headers)
+    assert await trending_score(model["id"]) == pytest.approx(0.0, abs=commented * 1e-6)
@@ -0,0 +1,77 @@
+"""游标分页：逐页遍历不重复、不遗漏；格式或类型错误的游标返回 400"""
+import base64
+import json
+import uuid
+
+import pytest
+
+from app.services.pagination import encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def catalog(create_model) -> tuple[str, set[str]]:
+    """独立分类下的 7 个模型（下载数、评分、热度都相同，只能靠 id 区分先后）"""
+    category = f"cursor-{uuid.uuid4().hex[:8]}"
+    return category, {(await create_model(name=f"cursor {i}", category=category))["id"] for i in range(7)}
+
+
+async def walk(client, category: str, sort: str) -> list[str]:
+    seen, cursor = [], None
+    while True:
+        params = {"category": category, "sort": sort, "page_size": 3, "count": "none"}
+        if cursor:
+            params["cursor"] = cursor
+        body = (await client.get("/models", params=params)).json()
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize("sort", ["latest", "downloads", "rating", "trending"])
+async def test_cursor_walk_returns_every_model_once(client, catalog, sort):
+    category, ids = catalog
+    seen = await walk(client, category, sort)
+    assert len(seen) == len(set(seen))
+    assert set(seen) == ids
+
+
+async def test_comment_cursor(client, create_model, auth_headers):
+    model = await create_model(name="cursor comments")
+    url = f"/models/{model['id']}/comments"
+    for i in range(5):
+        await client.post(url, json={"content": f"comment {i}", "rating": 4}, headers=auth_headers)
+
+    first = await client.get(url, params={"page_size": 3})
+    second = await client.get(url, params={"page_size": 3, "cursor": first.headers["x-next-cursor"]})
+    contents = [c["content"] for c in first.json() + second.json()]
+    assert contents == [f"comment {i}" for i in reversed(range(5))]
+    assert "x-next-cursor" not in second.headers
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("latest", "not-a-cursor"),
+    ("latest", raw_cursor(["list"])),
+    ("latest", raw_cursor({"s": "latest", "v": 5, "id": str(uuid.uuid4())})),
+    ("latest", raw_cursor({"s": "latest", "v": {"dt": "yesterday"}, "id": str(uuid.uuid4())})),
+    ("latest", raw_cursor({"s": "latest", "v": {"dt": "2024-01-01T00:00:00"}, "id": "nope"})),
+    ("downloads", raw_cursor({"s": "downloads", "v": "10", "id": str(uuid.uuid4())})),
+    ("downloads", raw_cursor({"s": "downloads", "v": True, "id": str(uuid.uuid4())})),
+    ("downloads", raw_cursor({"s": "downloads", "v": 1.5, "id": str(uuid.uuid4())})),
+    ("rating", raw_cursor({"s": "rating", "v": [1], "id": str(uuid.uuid4())})),
+    ("downloads", encode_cursor("latest", 10, uuid.uuid4())),
+])
+async def test_bad_cursor_is_rejected(client, sort, cursor):
+    response = await client.get("/models", params={"sort": sort, "cursor": cursor})
+    assert response.status_code == 400, response.text
+
+
+async def test_bad_comment_cursor_is_rejected(client):
+    cursor = raw_cursor({"s": "latest", "v": 1, "id": str(uuid.uuid4())})
+    response = await client.get(f"/models/{uuid.uuid4()}/comments", params={"cursor": cursor})
+    assert response.status_code == 400
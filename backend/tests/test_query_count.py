@@ -0,0 +1,59 @@
+"""列表页执行的 SQL 语句数不随 page_size 变化（没有逐行懒加载 / N+1 查询）"""
+import uuid
+
+import pytest
+
+from app.database import async_session_maker
+from app.models.models import Comment, Model, User
+from app.services.querycount import count_queries
+
+pytestmark = pytest.mark.anyio
+
+PAGE_SIZES = (5, 50)
+
+
+@pytest.fixture(scope="module")
+async def catalog(app):
+    """10 个用户轮流作为作者 / 评论者：60 个模型，第一个模型有 60 条评论"""
+    async with async_session_maker() as session:
+        users = [
+            User(id=uuid.uuid4(), email=f"qc{i}@example.com", username=f"qc{i}", hashed_password="x")
+            for i in range(10)
+        ]
+        session.add_all(users)
+        models = [
+            Model(
+                id=uuid.uuid4(), name=f"model {i}", description="query count", category="nlp",
+                tags=["llm", f"tag{i % 3}"], author_id=users[i % len(users)].id,
+            )
+            for i in range(60)
+        ]
+        session.add_all(models)
+        session.add_all(
+            Comment(model_id=models[0].id, user_id=users[i % len(users)].id, content=f"comment {i}", rating=5)
+            for i in range(60)
+        )
+        await session.commit()
+        return models[0].id
+
+
+async def statements_per_page(client, url: str, **params) -> dict[int, int]:
+    counts = {}
+    for page_size in PAGE_SIZES:
+        with count_queries() as counter:
+            response = await client.get(url, params={**params, "page_size": page_size})
+        assert response.status_code == 200, response.text
+        assert len(response.json()["items"] if url == "/models" else response.json()) == page_size
+        counts[page_size] = counter.count
+    return counts
+
+
+@pytest.mark.parametrize("params", [{}, {"fields": "id,name,author"}, {"tags": "llm"}])
+async def test_list_models_constant_queries(client, catalog, params):
+    counts = await statements_per_page(client, "/models", **params)
+    assert len(set(counts.values())) == 1, counts
+
+
+async def test_list_comments_constant_queries(client, catalog):
+    counts = await statements_per_page(client, f"/models/{catalog}/comments")
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,57 @@
+"""评分聚合：随评论增删维护；rating 为空的旧评论不计入，重算结果与增量维护一致"""
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from app.database import async_session_maker
+from app.models.models import Comment
+from app.services.ratings import rebuild_rating_aggregates
+
+pytestmark = pytest.mark.anyio
+
+
+def aggregates(body: dict) -> tuple:
+    return body["rating_count"], body["rating_avg"], body["rating_histogram"]
+
+
+async def test_comments_maintain_aggregates(client, create_model, auth_headers):
+    model = await create_model(name="ratings")
+    url = f"/models/{model['id']}"
+    ids = []
+    for rating in (5, 4, 4):
+        response = await client.post(f"{url}/comments", json={"content": "ok", "rating": rating}, headers=auth_headers)
+        ids.append(response.json()["id"])
+    assert aggregates((await client.get(url)).json()) == (3, pytest.approx(13 / 3), [0, 0, 0, 2, 1])
+
+    await client.delete(f"/comments/{ids[0]}", headers=auth_headers)
+    assert aggregates((await client.get(url)).json()) == (2, 4.0, [0, 0, 0, 2, 0])
+
+    sort = await client.get("/models", params={"sort": "rating", "category": "nlp", "page_size": 100})
+    assert model["id"] in [item["id"] for item in sort.json()["items"]]
+
+
+async def test_null_ratings_are_ignored(client, create_model, auth_headers):
+    rated = await create_model(name="rated")
+    unrated = await create_model(name="unrated")
+    await client.post(f"/models/{rated['id']}/comments", json={"content": "good", "rating": 4}, headers=auth_headers)
+    me = (await client.get("/auth/me", headers=auth_headers)).json()
+
+    # 旧数据：没有评分的评论（ORM 会给 None 套用默认值 5，直接插入 NULL）
+    legacy_id = uuid.uuid4()
+    async with async_session_maker() as session:
+        await session.execute(insert(Comment.__table__), [
+            {"id": comment_id, "model_id": uuid.UUID(m["id"]), "user_id": uuid.UUID(me["id"]),
+             "content": "legacy", "rating": None}
+            for comment_id, m in ((legacy_id, rated), (uuid.uuid4(), unrated))
+        ])
+        await session.commit()
+
+    async with async_session_maker() as session:
+        await rebuild_rating_aggregates(session)
+    assert aggregates((await client.get(f"/models/{rated['id']}")).json()) == (1, 4.0, [0, 0, 0, 1, 0])
+    assert aggregates((await client.get(f"/models/{unrated['id']}")).json()) == (0, 0.0, [0, 0, 0, 0, 0])
+
+    # 删除没有评分的评论不影响聚合
+    assert (await client.delete(f"/comments/{legacy_id}", headers=auth_headers)).status_code == 200
+    assert aggregates((await client.get(f"/models/{rated['id']}")).json()) == (1, 4.0, [0, 0, 0, 1, 0])
@@ -0,0 +1,51 @@
+"""标签规范化（NFKC、空白、大小写、别名）和标签筛选"""
+import uuid
+
+import pytest
+
+from app.services.tags import MAX_TAG_LENGTH, normalize_tag, normalize_tags
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("PyTorch", "pytorch"),
+    ("  Torch ", "pytorch"),
+    ("ＴＦ", "tensorflow"),
+    ("Large \t Language\nModel", "llm"),
+    ("Hugging  Face", "huggingface"),
+    ("Computer Vision", "computer vision"),
+    ("x" * 80, "x" * MAX_TAG_LENGTH),
+])
+def test_normalize_tag(raw, expected):
+    assert normalize_tag(raw) == expected
+
+
+def test_normalize_tags_dedupes_and_drops_empty():
+    assert normalize_tags(["PyTorch", "torch", " ", "", "LLM", "llms"]) == ["pytorch", "llm"]
+    assert normalize_tags(None) == []
+
+
+async def test_tags_are_normalized_on_write(client, create_model, auth_headers):
+    model = await create_model(name="tagged", tags=["PyTorch", "torch", "Large Language Model"])
+    assert model["tags"] == ["pytorch", "llm"]
+
+    response = await client.put(f"/models/{model['id']}", json={"tags": ["TF", " Hugging Face "]}, headers=auth_headers)
+    assert response.json()["tags"] == ["tensorflow", "huggingface"]
+
+
+async def test_tag_filter_uses_normalized_values(client, create_model):
+    category = f"tags-{uuid.uuid4().hex[:8]}"
+    both = await create_model(name="both", category=category, tags=["pytorch", "llm"])
+    only = await create_model(name="only", category=category, tags=["pytorch"])
+
+    async def ids(**params) -> set[str]:
+        body = (await client.get("/models", params={"category": category, **params})).json()
+        return {item["id"] for item in body["items"]}
+
+    assert await ids(tags="Torch") == {both["id"], only["id"]}
+    assert await ids(tags=["torch", "LLMs"]) == {both["id"]}
+    assert await ids(tags="torch,llms") == {both["id"]}
+    assert await ids(tags=["tf", "llm"], tag_match="any") == {both["id"]}
+    assert await ids(tags=" , ") == {both["id"], only["id"]}
+    assert (await client.get("/models", params={"tags": "llm", "tag_match": "some"})).status_code == 422
@@ -0,0 +1,141 @@
+"""可续传上传（乱序分片、断点查询、校验、完成）和分块存储的引用计数 / 垃圾回收"""
+import hashlib
+import os
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models.models import StorageChunk, StorageManifest
+from app.services.storage import chunk_store
+from app.services.uploads import upload_manager
+
+pytestmark = pytest.mark.anyio
+
+CHUNK = upload_manager.chunk_size
+
+
+async def start_upload(client, headers, model_id: str, data: bytes, filename: str = "weights.bin") -> dict:
+    response = await client.post(
+        "/uploads", json={"filename": filename, "size": len(data), "model_id": model_id}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def put_chunk(client, headers, upload_id: str, data: bytes, index: int, **extra):
+    piece = data[index * CHUNK:(index + 1) * CHUNK]
+    return await client.put(f"/uploads/{upload_id}/chunks/{index * CHUNK}", content=piece, headers={**headers, **extra})
+
+
+async def upload_file(client, headers, model_id: str, data: bytes, filename: str = "weights.bin") -> dict:
+    upload = await start_upload(client, headers, model_id, data, filename)
+    for index in range(upload["chunk_count"]):
+        assert (await put_chunk(client, headers, upload["id"], data, index)).status_code == 200
+    response = await client.post(f"/uploads/{upload['id']}/complete", json={}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def chunk_rows(hashes) -> dict[str, int]:
+    async with async_session_maker() as session:
+        result = await session.execute(select(StorageChunk.hash, StorageChunk.refcount).where(StorageChunk.hash.in_(hashes)))
+        return dict(result.all())
+
+
+async def test_resumable_upload(client, create_model, auth_headers):
+    model = await create_model(name="upload")
+    data = os.urandom(3 * CHUNK + 100)
+    upload = await start_upload(client, auth_headers, model["id"], data, "net.onnx")
+    upload_id = upload["id"]
+    assert upload["chunk_count"] == 4
+
+    # 乱序上传一部分后查询进度
+    for index in (2, 0):
+        assert (await put_chunk(client, auth_headers, upload_id, data, index)).status_code == 200
+    status = (await client.get(f"/uploads/{upload_id}", headers=auth_headers)).json()
+    assert status["missing_chunks"] == [1, 3]
+    assert status["received"] == [[0, CHUNK], [2 * CHUNK, 3 * CHUNK]]
+
+    complete = f"/uploads/{upload_id}/complete"
+    assert (await client.post(complete, json={}, headers=auth_headers)).status_code == 409
+
+    bad = await put_chunk(client, auth_headers, upload_id, data, 1, **{"X-Chunk-SHA256": "0" * 64})
+    assert bad.status_code == 400
+    assert (await client.get(f"/uploads/{upload_id}", headers=auth_headers)).json()["missing_chunks"] == [1, 3]
+    for index in (1, 3):
+        assert (await put_chunk(client, auth_headers, upload_id, data, index)).status_code == 200
+
+    # 校验和错误不丢弃会话，可以带正确的校验和重试
+    assert (await client.post(complete, json={"sha256": "0" * 64}, headers=auth_headers)).status_code == 400
+    response = await client.post(complete, json={"sha256": hashlib.sha256(data).hexdigest()}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["size"] == len(data)
+    assert (await client.get(f"/uploads/{upload_id}", headers=auth_headers)).status_code == 404
+
+    detail = (await client.get(f"/models/{model['id']}")).json()
+    assert detail["file_name"] == "net.onnx"
+    download = await client.get(f"/models/{model['id']}/file")
+    assert download.content == data
+    partial = await client.get(f"/models/{model['id']}/file", headers={"Range": f"bytes={CHUNK - 5}-{CHUNK + 4}"})
+    assert partial.status_code == 206
+    assert partial.content == data[CHUNK - 5:CHUNK + 5]
+    assert partial.headers["content-range"] == f"bytes {CHUNK - 5}-{CHUNK + 4}/{len(data)}"
+
+
+async def test_upload_requires_own_model(client, auth_headers):
+    body = {"filename": "x.bin", "size": 10, "model_id": str(uuid.uuid4())}
+    assert (await client.post("/uploads", json=body, headers=auth_headers)).status_code == 404
+    assert (await client.post("/uploads", json={"filename": "x.bin", "size": 10}, headers=auth_headers)).status_code == 422
+
+
+async def test_shared_file_is_released_with_last_reference(client, create_model, auth_headers):
+    data = os.urandom(CHUNK)
+    first = await create_model(name="storage a")
+    second = await create_model(name="storage b")
+    manifest_id = (await upload_file(client, auth_headers, first["id"], data))["manifest"]
+    result = await upload_file(client, auth_headers, second["id"], data)
+    assert result["manifest"] == manifest_id
+    assert result["stored_bytes"] == 0
+
+    hashes = [h for h, _ in chunk_store.load_manifest(manifest_id).chunks]
+    assert await chunk_rows(hashes) == {h: 1 for h in hashes}
+
+    await client.delete(f"/models/{first['id']}", headers=auth_headers)
+    assert await chunk_rows(hashes) == {h: 1 for h in hashes}
+    assert chunk_store.manifest_path(manifest_id).exists()
+
+    await client.delete(f"/models/{second['id']}", headers=auth_headers)
+    assert await chunk_rows(hashes) == {}
+    assert not any(chunk_store.has_chunk(h) for h in hashes)
+    assert not chunk_store.manifest_path(manifest_id).exists()
+    async with async_session_maker() as session:
+        assert await session.get(StorageManifest, manifest_id) is None
+
+
+async def test_replacing_file_releases_unshared_chunks(client, create_model, auth_headers):
+    model = await create_model(name="storage replace")
+    old = await upload_file(client, auth_headers, model["id"], os.urandom(CHUNK))
+    old_hashes = [h for h, _ in chunk_store.load_manifest(old["manifest"]).chunks]
+    await upload_file(client, auth_headers, model["id"], os.urandom(CHUNK))
+
+    assert await chunk_rows(old_hashes) == {}
+    assert not any(chunk_store.has_chunk(h) for h in old_hashes)
+
+
+async def test_collect_garbage_keeps_referenced_chunks(client, create_model, auth_headers):
+    model = await create_model(name="storage gc")
+    kept = await upload_file(client, auth_headers, model["id"], os.urandom(CHUNK))
+    kept_hashes = [h for h, _ in chunk_store.load_manifest(kept["manifest"]).chunks]
+
+    orphan = os.urandom(1000)
+    orphan_hash = hashlib.sha256(orphan).hexdigest()
+    chunk_store.write_chunk(orphan_hash, orphan)
+
+    async with async_session_maker() as session:
+        assert await chunk_store.collect_garbage(session, grace=0) >= 1
+    assert not chunk_store.has_chunk(orphan_hash)
+    assert all(chunk_store.has_chunk(h) for h in kept_hashes)
+    assert chunk_store.manifest_path(kept["manifest"]).exists()
+    assert (await client.get(f"/models/{model['id']}/file")).status_code == 200
@@ -57,7 +57,11 @@ export const interactionAPI = {
   // 点赞
   like: (modelId) => api.post(`/models/${modelId}/like`),
   unlike: (modelId) => api.delete(`/models/${modelId}/like`),
-  checkLike: (modelId) => api.get(`/models/${modelId}/like/status`)
+  checkLike: (modelId) => api.get(`/models/${modelId}/like/status`),
+  checkLikes: (modelIds) => api.get('/likes/status', {
+    params: { model_ids: modelIds },
+    paramsSerializer: { indexes: null }
+  })
 }
 
 export default api